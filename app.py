@@ -9,13 +9,43 @@ Projet: Deep Learning - Classification des maladies des feuilles de café
 """
 
 import streamlit as st
-import tensorflow as tf
-from tensorflow.keras.models import load_model
-from tensorflow.keras.preprocessing.image import img_to_array, load_img
 import numpy as np
-from PIL import Image
 import io
+import logging
 import os
+from collections import OrderedDict
+from concurrent.futures import wait
+
+from cache import PredictionCache, content_digest
+from dashboard import EXPORT_FORMATS, BatchSummary, parquet_available
+from inference import MODEL_PATH, load_classifier_in_background
+from metrics import RequestTrace, span, start_metrics_server, start_request
+from ood import AUTOENCODER_PATH, OUT_OF_DISTRIBUTION, OutOfDistributionGate, configured_threshold
+from preprocessing import allocate_batch, decode_upload, open_image, preprocess_batch, preprocess_into
+from registry import MODEL_DIR, NON_CLASSIFIER_MODELS, ModelRegistry, model_name
+from rendering import (
+    APP_STYLE, CLASS_LABELS, DIAGNOSTIC_CARDS, batch_report_html, confidence_card, pathology_card, recommendation_card,
+)
+from tiling import analyze_tiles, severity_overlay
+from tta import available_views, build_views
+from worker import WORKER_INTER_OP_THREADS, WORKER_INTRA_OP_THREADS, InferenceWorker, collect
+
+# Taille du cache des prédictions et base SQLite optionnelle (persistance entre redémarrages)
+PREDICTION_CACHE_SIZE = int(os.environ.get("COFFEE_CACHE_SIZE", "256"))
+PREDICTION_CACHE_DB = os.environ.get("COFFEE_CACHE_DB") or None
+
+# Export local des métriques Prometheus (COFFEE_METRICS_PORT=0 pour le désactiver)
+METRICS_HOST = os.environ.get("COFFEE_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.environ.get("COFFEE_METRICS_PORT", "9108"))
+
+# Intervalle (secondes) entre deux consultations des analyses en file
+JOB_POLL_INTERVAL_S = 0.1
+
+# Fichiers téléchargés dont l'état (aperçu, tenseurs, diagnostics) est conservé par session
+MAX_SESSION_UPLOADS = 4
+
+# Feuilles à faible confiance listées dans le tableau de bord d'un lot
+MAX_LOW_CONFIDENCE_ROWS = 50
 
 # Configuration de la page Streamlit
 st.set_page_config(
@@ -25,695 +55,438 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# CSS personnalisé pour une interface ultra-moderne et premium
-st.markdown("""
-    <style>
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800;900&family=Poppins:wght@300;400;500;600;700;800&display=swap');
-    
-    /* Variables CSS pour cohérence */
-    :root {
-        --primary-gradient: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        --success-gradient: linear-gradient(135deg, #11998e 0%, #38ef7d 100%);
-        --danger-gradient: linear-gradient(135deg, #eb3349 0%, #f45c43 100%);
-        --card-shadow: 0 20px 60px rgba(0,0,0,0.12);
-        --card-hover-shadow: 0 30px 80px rgba(0,0,0,0.18);
-        --border-radius: 24px;
-        --transition: all 0.4s cubic-bezier(0.4, 0, 0.2, 1);
-    }
-    
-    /* Style global avec animation de fond */
-    .stApp {
-        font-family: 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif;
-        background: linear-gradient(135deg, #0f0c29 0%, #302b63 50%, #24243e 100%);
-        background-size: 400% 400%;
-        animation: gradientShift 15s ease infinite;
-    }
-    
-    @keyframes gradientShift {
-        0% { background-position: 0% 50%; }
-        50% { background-position: 100% 50%; }
-        100% { background-position: 0% 50%; }
-    }
-    
-    /* Conteneur principal avec effet glassmorphism */
-    .main {
-        background: rgba(255, 255, 255, 0.03);
-        backdrop-filter: blur(10px);
-        border-radius: var(--border-radius);
-        padding: 2rem;
-        margin: 1rem;
-    }
-    
-    /* En-tête avec animation */
-    .main-title {
-        font-family: 'Poppins', sans-serif;
-        font-size: 4rem;
-        font-weight: 900;
-        text-align: center;
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 50%, #f093fb 100%);
-        background-size: 200% auto;
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        background-clip: text;
-        margin-bottom: 0.5rem;
-        padding: 1.5rem;
-        animation: shimmer 3s linear infinite;
-        letter-spacing: -1px;
-        text-shadow: 0 0 30px rgba(102, 126, 234, 0.5);
-    }
-    
-    @keyframes shimmer {
-        0% { background-position: 0% center; }
-        100% { background-position: 200% center; }
-    }
-    
-    /* Sous-titre premium */
-    .subtitle {
-        font-family: 'Inter', sans-serif;
-        font-size: 1.4rem;
-        text-align: center;
-        color: rgba(255, 255, 255, 0.9);
-        margin-bottom: 2.5rem;
-        font-weight: 400;
-        letter-spacing: 0.5px;
-        text-shadow: 0 2px 10px rgba(0,0,0,0.3);
-    }
-    
-    /* Carte glassmorphism premium */
-    .result-card {
-        background: rgba(255, 255, 255, 0.95);
-        backdrop-filter: blur(20px);
-        border-radius: var(--border-radius);
-        padding: 2.5rem;
-        box-shadow: var(--card-shadow);
-        margin: 1.5rem 0;
-        border: 1px solid rgba(255, 255, 255, 0.2);
-        transition: var(--transition);
-        position: relative;
-        overflow: hidden;
-    }
-    
-    .result-card::before {
-        content: '';
-        position: absolute;
-        top: 0;
-        left: -100%;
-        width: 100%;
-        height: 100%;
-        background: linear-gradient(90deg, transparent, rgba(255,255,255,0.3), transparent);
-        transition: left 0.5s;
-    }
-    
-    .result-card:hover {
-        transform: translateY(-8px) scale(1.01);
-        box-shadow: var(--card-hover-shadow);
-        border: 1px solid rgba(102, 126, 234, 0.3);
-    }
-    
-    .result-card:hover::before {
-        left: 100%;
-    }
-    
-    /* Badge de statut animé */
-    .status-badge {
-        display: inline-block;
-        padding: 0.8rem 2rem;
-        border-radius: 60px;
-        font-size: 1.3rem;
-        font-weight: 800;
-        margin: 1.5rem 0;
-        text-transform: uppercase;
-        letter-spacing: 2px;
-        font-family: 'Poppins', sans-serif;
-        animation: pulseGlow 2s ease-in-out infinite;
-        position: relative;
-        overflow: hidden;
-    }
-    
-    @keyframes pulseGlow {
-        0%, 100% { transform: scale(1); }
-        50% { transform: scale(1.05); }
-    }
-    
-    .healthy-badge {
-        background: var(--success-gradient);
-        color: white;
-        box-shadow: 0 8px 25px rgba(56, 239, 125, 0.5);
-    }
-    
-    .unhealthy-badge {
-        background: var(--danger-gradient);
-        color: white;
-        box-shadow: 0 8px 25px rgba(235, 51, 73, 0.5);
-    }
-    
-    /* Barre de confiance améliorée */
-    .confidence-bar {
-        background: rgba(240, 240, 240, 0.3);
-        border-radius: 15px;
-        height: 40px;
-        margin: 1.5rem 0;
-        overflow: hidden;
-        position: relative;
-        box-shadow: inset 0 2px 10px rgba(0,0,0,0.1);
-    }
-    
-    .confidence-fill {
-        height: 100%;
-        border-radius: 15px;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        color: white;
-        font-weight: 800;
-        font-size: 1.1rem;
-        transition: width 1.5s cubic-bezier(0.4, 0, 0.2, 1);
-        position: relative;
-        overflow: hidden;
-    }
-    
-    .confidence-fill::after {
-        content: '';
-        position: absolute;
-        top: 0;
-        left: -100%;
-        width: 100%;
-        height: 100%;
-        background: linear-gradient(90deg, transparent, rgba(255,255,255,0.4), transparent);
-        animation: shine 2s infinite;
-    }
-    
-    @keyframes shine {
-        0% { left: -100%; }
-        100% { left: 200%; }
-    }
-    
-    /* Bouton d'upload premium */
-    .upload-section {
-        background: rgba(255, 255, 255, 0.08);
-        backdrop-filter: blur(15px);
-        border-radius: var(--border-radius);
-        padding: 3rem;
-        box-shadow: var(--card-shadow);
-        border: 3px dashed rgba(102, 126, 234, 0.5);
-        text-align: center;
-        margin: 2.5rem 0;
-        transition: var(--transition);
-    }
-    
-    .upload-section:hover {
-        border-color: rgba(102, 126, 234, 0.9);
-        background: rgba(255, 255, 255, 0.12);
-        transform: scale(1.02);
-    }
-    
-    /* Info box glassmorphism */
-    .info-box {
-        background: linear-gradient(135deg, rgba(102, 126, 234, 0.9) 0%, rgba(118, 75, 162, 0.9) 100%);
-        backdrop-filter: blur(15px);
-        color: white;
-        padding: 2rem;
-        border-radius: var(--border-radius);
-        margin: 1.5rem 0;
-        box-shadow: 0 10px 40px rgba(102, 126, 234, 0.5);
-        border: 1px solid rgba(255, 255, 255, 0.2);
-        transition: var(--transition);
-    }
-    
-    .info-box:hover {
-        transform: translateY(-3px);
-        box-shadow: 0 15px 50px rgba(102, 126, 234, 0.6);
-    }
-    
-    /* Animations multiples */
-    @keyframes float {
-        0%, 100% { transform: translateY(0px); }
-        50% { transform: translateY(-10px); }
-    }
-    
-    @keyframes fadeInUp {
-        from {
-            opacity: 0;
-            transform: translateY(30px);
-        }
-        to {
-            opacity: 1;
-            transform: translateY(0);
-        }
-    }
-    
-    @keyframes pulse {
-        0%, 100% { opacity: 1; }
-        50% { opacity: 0.6; }
-    }
-    
-    .loading {
-        animation: pulse 1.5s ease-in-out infinite;
-    }
-    
-    /* Carte d'instruction premium */
-    .instruction-card {
-        background: rgba(255, 255, 255, 0.95);
-        backdrop-filter: blur(10px);
-        border-left: 6px solid #667eea;
-        padding: 1.5rem 2rem;
-        margin: 1.5rem 0;
-        border-radius: 16px;
-        box-shadow: 0 8px 25px rgba(0,0,0,0.12);
-        transition: var(--transition);
-    }
-    
-    .instruction-card:hover {
-        transform: translateX(8px);
-        box-shadow: 0 12px 35px rgba(0,0,0,0.18);
-    }
-    
-    /* Footer élégant */
-    .footer {
-        text-align: center;
-        padding: 3rem;
-        color: rgba(255, 255, 255, 0.7);
-        margin-top: 4rem;
-        border-top: 1px solid rgba(255, 255, 255, 0.1);
-        backdrop-filter: blur(10px);
-    }
-    
-    /* Boutons Streamlit personnalisés */
-    .stButton > button {
-        background: var(--primary-gradient);
-        color: white;
-        border: none;
-        border-radius: 50px;
-        padding: 0.8rem 2.5rem;
-        font-weight: 700;
-        font-size: 1.1rem;
-        letter-spacing: 1px;
-        transition: var(--transition);
-        box-shadow: 0 8px 25px rgba(102, 126, 234, 0.4);
-        font-family: 'Poppins', sans-serif;
-    }
-    
-    .stButton > button:hover {
-        transform: translateY(-3px);
-        box-shadow: 0 12px 35px rgba(102, 126, 234, 0.6);
-    }
-    
-    /* File uploader personnalisé */
-    .stFileUploader {
-        background: transparent;
-    }
-    
-    /* Sidebar moderne */
-    [data-testid="stSidebar"] {
-        background: linear-gradient(180deg, rgba(102, 126, 234, 0.95) 0%, rgba(118, 75, 162, 0.95) 100%);
-        backdrop-filter: blur(20px);
-    }
-    
-    [data-testid="stSidebar"] * {
-        color: white !important;
-    }
-    
-    /* Metrics premium */
-    [data-testid="stMetricValue"] {
-        font-size: 2rem;
-        font-weight: 800;
-        font-family: 'Poppins', sans-serif;
-    }
-    
-    /* Expander premium */
-    .streamlit-expanderHeader {
-        background: rgba(102, 126, 234, 0.1);
-        border-radius: 12px;
-        font-weight: 600;
-    }
-    
-    /* Animation d'entrée pour tous les éléments */
-    .element-container {
-        animation: fadeInUp 0.6s ease-out;
-    }
-    
-    /* Amélioration du texte */
-    h1, h2, h3, h4, h5, h6 {
-        font-family: 'Poppins', sans-serif;
-        font-weight: 700;
-        color: rgba(255, 255, 255, 0.95);
-    }
-    
-    p, li, span {
-        font-family: 'Inter', sans-serif;
-        line-height: 1.7;
-    }
-    
-    /* Success message */
-    .stSuccess {
-        background: rgba(56, 239, 125, 0.15);
-        border-left: 4px solid #38ef7d;
-        border-radius: 12px;
-        backdrop-filter: blur(10px);
-    }
-    
-    /* Error message */
-    .stError {
-        background: rgba(235, 51, 73, 0.15);
-        border-left: 4px solid #eb3349;
-        border-radius: 12px;
-        backdrop-filter: blur(10px);
-    }
-    
-    /* Spinner personnalisé */
-    .stSpinner > div {
-        border-top-color: #667eea !important;
-    }
-    
-    /* Scrollbar personnalisée */
-    ::-webkit-scrollbar {
-        width: 10px;
-        height: 10px;
-    }
-    
-    ::-webkit-scrollbar-track {
-        background: rgba(255, 255, 255, 0.1);
-        border-radius: 10px;
-    }
-    
-    ::-webkit-scrollbar-thumb {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        border-radius: 10px;
-    }
-    
-    ::-webkit-scrollbar-thumb:hover {
-        background: linear-gradient(135deg, #764ba2 0%, #667eea 100%);
-    }
-    
-    /* ===== CORRECTION DE LA VISIBILITÉ DES TEXTES ===== */
-    
-    /* Tous les titres et sous-titres Streamlit */
-    .stMarkdown h1, .stMarkdown h2, .stMarkdown h3, 
-    .stMarkdown h4, .stMarkdown h5, .stMarkdown h6 {
-        color: rgba(255, 255, 255, 0.95) !important;
-        font-family: 'Poppins', sans-serif !important;
-    }
-    
-    /* Tous les paragraphes et textes */
-    .stMarkdown p, .stMarkdown span, .stMarkdown div {
-        color: rgba(255, 255, 255, 0.9) !important;
-    }
-    
-    /* Labels des composants */
-    label, .stMarkdown label {
-        color: rgba(255, 255, 255, 0.95) !important;
-        font-weight: 500 !important;
-    }
-    
-    /* ===== FILE UPLOADER - TEXTE VISIBLE EN NOIR ===== */
-    
-    /* Zone de drop principale - texte en noir */
-    [data-testid="stFileUploadDropzone"] {
-        background: rgba(255, 255, 255, 0.95) !important;
-        border: 2px dashed rgba(102, 126, 234, 0.5) !important;
-        border-radius: 16px !important;
-    }
-    
-    /* Texte "Drag and drop file here" - NOIR */
-    [data-testid="stFileUploadDropzone"] span,
-    [data-testid="stFileUploadDropzone"] small,
-    [data-testid="stFileUploadDropzone"] p {
-        color: #333 !important;
-        font-weight: 500 !important;
-    }
-    
-    /* Texte de limite "Limit 200MB per file" - GRIS FONCÉ */
-    [data-testid="stFileUploadDropzone"] small {
-        color: #666 !important;
-    }
-    
-    /* Label du file uploader */
-    [data-testid="stFileUploader"] label {
-        color: rgba(255, 255, 255, 0.95) !important;
-        font-weight: 500 !important;
-    }
-    
-    /* Bouton "Browse files" */
-    [data-testid="stFileUploader"] button {
-        color: white !important;
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%) !important;
-        border: none !important;
-        font-weight: 600 !important;
-        padding: 0.5rem 1.5rem !important;
-        border-radius: 8px !important;
-        transition: all 0.3s ease !important;
-    }
-    
-    [data-testid="stFileUploader"] button:hover {
-        transform: translateY(-2px) !important;
-        box-shadow: 0 4px 12px rgba(102, 126, 234, 0.4) !important;
-    }
-    
-    /* Nom du fichier uploadé - garder en blanc */
-    [data-testid="stFileUploader"] [data-testid="stMarkdownContainer"] {
-        color: rgba(255, 255, 255, 0.95) !important;
-    }
-    
-    /* Container du fichier uploadé */
-    [class*="uploadedFile"] {
-        color: rgba(255, 255, 255, 0.95) !important;
-    }
-    
-    [class*="uploadedFile"] * {
-        color: rgba(255, 255, 255, 0.95) !important;
-    }
+# Journal de démarrage (durées d'import, de chargement et de warmup du modèle)
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
 
+@st.cache_resource
+def start_model_loading():
+    """
+    Démarre le chargement du classifieur en arrière-plan, une seule fois par serveur.
+    
+    Returns:
+        ClassifierLoader: Chargement en cours, résolu avec le CoffeeLeafClassifier
+    """
+    # Premier chargement TensorFlow : fixe les plafonds de threads de tout le processus
+    return load_classifier_in_background(
+        MODEL_PATH, intra_op_threads=WORKER_INTRA_OP_THREADS, inter_op_threads=WORKER_INTER_OP_THREADS
+    )
+
+# Lancer le chargement dès le premier rendu : l'import de TensorFlow et la
+# désérialisation du modèle se déroulent pendant l'affichage de la page
+start_model_loading()
+
+@st.cache_resource
+def start_metrics_export():
+    """
+    Démarre l'export /metrics (durées par étape, requêtes, erreurs, cache), une seule fois par serveur.
+    
+    Returns:
+        ThreadingHTTPServer: Serveur des métriques, ou None s'il est désactivé ou indisponible
+    """
+    return start_metrics_server(METRICS_HOST, METRICS_PORT) if METRICS_PORT else None
+
+start_metrics_export()
+
+# CSS personnalisé pour une interface ultra-moderne et premium (style.css, compacté une fois)
+st.markdown(APP_STYLE, unsafe_allow_html=True)
+
+@st.cache_resource
+def get_inference_worker():
+    """
+    Worker d'inférence partagé par toutes les sessions : les passes des modèles
+    sont mises en file et regroupées en micro-lots, hors des threads de script.
     
-    /* Texte dans les expanders */
-    [data-testid="stExpander"] {
-        background: rgba(255, 255, 255, 0.05);
-        border-radius: 12px;
-    }
-    
-    [data-testid="stExpander"] p,
-    [data-testid="stExpander"] span,
-    [data-testid="stExpander"] div {
-        color: rgba(255, 255, 255, 0.9) !important;
-    }
-    
-    /* Headers dans les expanders */
-    .streamlit-expanderHeader {
-        color: rgba(255, 255, 255, 0.95) !important;
-        background: rgba(102, 126, 234, 0.2) !important;
-    }
-    
-    /* Texte dans les colonnes */
-    [data-testid="column"] h1,
-    [data-testid="column"] h2,
-    [data-testid="column"] h3,
-    [data-testid="column"] h4,
-    [data-testid="column"] p,
-    [data-testid="column"] span {
-        color: rgba(255, 255, 255, 0.95) !important;
-    }
-    
-    /* Metric labels et valeurs */
-    [data-testid="stMetricLabel"] {
-        color: rgba(255, 255, 255, 0.8) !important;
-        font-size: 1.1rem !important;
-    }
-    
-    [data-testid="stMetricValue"] {
-        color: rgba(255, 255, 255, 0.95) !important;
-        font-size: 2rem !important;
-        font-weight: 800 !important;
-        font-family: 'Poppins', sans-serif !important;
-    }
-    
-    /* Texte des listes */
-    .stMarkdown ul, .stMarkdown ol, .stMarkdown li {
-        color: rgba(255, 255, 255, 0.9) !important;
-    }
-    
-    /* Code et pre */
-    code, pre {
-        background: rgba(0, 0, 0, 0.3) !important;
-        color: rgba(255, 255, 255, 0.95) !important;
-        border-radius: 8px;
-        padding: 0.2rem 0.4rem;
-    }
-    
-    /* Liens */
-    a {
-        color: #667eea !important;
-        text-decoration: none;
-        font-weight: 600;
-    }
-    
-    a:hover {
-        color: #764ba2 !important;
-        text-decoration: underline;
-    }
-    
-    /* Dividers */
-    hr {
-        border-color: rgba(255, 255, 255, 0.2) !important;
-        margin: 2rem 0;
-    }
-    
-    /* Texte dans les tabs */
-    [data-baseweb="tab"] {
-        color: rgba(255, 255, 255, 0.8) !important;
-    }
-    
-    [data-baseweb="tab"]:hover {
-        color: rgba(255, 255, 255, 1) !important;
-    }
-    
-    /* Captions et small text */
-    .caption, small, [data-testid="caption"] {
-        color: rgba(255, 255, 255, 0.7) !important;
-    }
-    
-    /* Chart labels */
-    .stPlotlyChart text {
-        fill: rgba(255, 255, 255, 0.9) !important;
-    }
-    
-    /* Tables */
-    table {
-        color: rgba(255, 255, 255, 0.9) !important;
-    }
-    
-    th {
-        background: rgba(102, 126, 234, 0.3) !important;
-        color: white !important;
-        font-weight: 700 !important;
-    }
-    
-    td {
-        border-color: rgba(255, 255, 255, 0.2) !important;
-    }
-    
-    /* Markdown dans les result-card et instruction-card garde leurs couleurs sombres */
-    .result-card h1, .result-card h2, .result-card h3, 
-    .result-card h4, .result-card p, .result-card span {
-        color: #333 !important;
-    }
-    
-    .instruction-card h1, .instruction-card h2, .instruction-card h3, 
-    .instruction-card h4, .instruction-card p, .instruction-card span,
-    .instruction-card li {
-        color: #333 !important;
-    }
-    
-    /* Spinner text */
-    .stSpinner > div {
-        color: rgba(255, 255, 255, 0.9) !important;
-    }
-    
-    /* Dataframe */
-    [data-testid="stDataFrame"] {
-        color: rgba(255, 255, 255, 0.9) !important;
-    }
-    </style>
-""", unsafe_allow_html=True)
+    Returns:
+        InferenceWorker: Worker démarré
+    """
+    return InferenceWorker().start()
 
-# Cache pour charger le modèle une seule fois
 @st.cache_resource
-def load_ml_model():
+def get_model_registry():
     """
-    Charge le modèle de Deep Learning hybride.
-    Le modèle est mis en cache pour éviter de le recharger à chaque interaction.
+    Registre des modèles du dossier 'mes models', partagé par toutes les sessions.
+    Le modèle par défaut y est inscrit dès la fin de son chargement en arrière-plan.
+    """
+    registry = ModelRegistry(MODEL_DIR, exclude=NON_CLASSIFIER_MODELS)
+    registry.adopt(model_name(MODEL_PATH), start_model_loading().result())
+    return registry
+
+def load_ml_model(name=None):
+    """
+    Renvoie le classifieur de Deep Learning hybride.
+    Le modèle par défaut, chargé en arrière-plan au démarrage, est partagé par
+    toutes les sessions ; les autres modèles sont chargés à la demande. Un
+    fichier de modèle remplacé sur le disque est rechargé à chaud.
+    
+    Args:
+        name: Nom du modèle dans le registre (None = modèle par défaut)
+    
+    Returns:
+        WorkerModel: Classifieur servi par le worker d'inférence partagé, ou None en cas d'erreur
     """
     try:
-        model_path = "mes models/MODELE_EXPERT_6CLASSES.keras"
-        if not os.path.exists(model_path):
-            st.error(f"❌ Le fichier du modèle n'a pas été trouvé : {model_path}")
-            st.info("Veuillez vérifier que le modèle est présent dans le dossier 'mes models'.")
-            return None
-        
-        model = load_model(model_path)
-        return model
+        return get_inference_worker().bind(get_model_registry().get(name or model_name(MODEL_PATH)))
+    except FileNotFoundError:
+        st.error(f"❌ Le fichier du modèle n'a pas été trouvé : {MODEL_PATH}")
+        st.info("Veuillez vérifier que le modèle est présent dans le dossier 'mes models'.")
+        return None
     except Exception as e:
         st.error(f"❌ Erreur lors du chargement du modèle : {e}")
         return None
 
-def preprocess_image(image, target_size=(224, 224)):
+@st.cache_resource
+def get_prediction_cache():
+    """
+    Cache des prédictions partagé par toutes les sessions.
+    Configurable via les variables COFFEE_CACHE_SIZE et COFFEE_CACHE_DB.
     """
-    Prétraite l'image pour la prédiction.
+    return PredictionCache(max_entries=PREDICTION_CACHE_SIZE, db_path=PREDICTION_CACHE_DB)
+
+@st.cache_resource
+def get_ood_gate():
+    """
+    Filtre hors-distribution (autoencodeur), partagé par toutes les sessions.
     
-    Args:
-        image: Image PIL
-        target_size: Tuple (hauteur, largeur) de la taille cible
+    L'autoencodeur n'est chargé que si un seuil est défini : sans
+    calibration, le filtre ne rejetterait aucune image.
     
     Returns:
-        numpy.ndarray: Image prétraitée prête pour la prédiction
+        OutOfDistributionGate: Filtre chargé, ou None si l'autoencodeur est absent ou non calibré
     """
+    log = logging.getLogger("coffee_leaf.app")
     try:
-        # Redimensionner l'image
-        img = image.resize(target_size)
-        
-        # Convertir en array numpy
-        img_array = img_to_array(img)
-        
-        # Normaliser les pixels entre 0 et 1
-        img_array = img_array / 255.0
-        
-        # Ajouter une dimension batch
-        img_array = np.expand_dims(img_array, axis=0)
-        
-        return img_array
-    except Exception as e:
-        st.error(f"❌ Erreur lors du prétraitement de l'image : {e}")
+        threshold = configured_threshold(AUTOENCODER_PATH)
+        if threshold is None:
+            log.warning("Autoencodeur non calibré : filtre hors-distribution désactivé "
+                        "(lancez python ood.py --reference-dir ...)")
+            return None
+        gate = OutOfDistributionGate.from_path(AUTOENCODER_PATH, threshold=threshold)
+    except FileNotFoundError:
+        log.warning("Autoencodeur absent : filtre hors-distribution désactivé")
         return None
+    # Les passes de l'autoencodeur passent elles aussi par le worker partagé
+    gate.backend = get_inference_worker().bind(gate.backend)
+    return gate
 
-def predict_disease(model, image):
+def model_cache_keys(digest, *models):
     """
-    Effectue une prédiction sur l'image avec classification hiérarchique.
+    Clés de cache d'une image déjà hachée pour un ou plusieurs modèles.
     
-    Logique:
-    - Classe 0 : Healthy (feuille saine)
-    - Classes 1-5 : Unhealthy (pathologies spécifiques)
+    Args:
+        digest: Empreinte du contenu de l'image (voir cache.content_digest)
+        *models: Modèles (classifieur, filtre...) exposant `fingerprint` ; None est ignoré
+    
+    Returns:
+        list: Une clé par modèle (None pour un modèle None)
+    """
+    return [f"{m.fingerprint}:{digest}" if m is not None else None for m in models]
+
+def image_cache_keys(data, *models):
+    """
+    Clés de cache d'une image téléchargée pour un ou plusieurs modèles.
+    Le contenu de l'image n'est haché qu'une fois.
     
     Args:
-        model: Modèle Keras chargé
+        data: Octets du fichier téléchargé
+        *models: Modèles (classifieur, filtre...) exposant `fingerprint` ; None est ignoré
+    
+    Returns:
+        list: Une clé par modèle (None pour un modèle None)
+    """
+    return model_cache_keys(content_digest(data), *models)
+
+def session_upload(uploaded_file, target_size):
+    """
+    État de session d'un fichier téléchargé, créé au premier rendu.
+    Les réexécutions du script (clic, expander, widget de la barre latérale)
+    réutilisent l'image décodée, l'aperçu, les tenseurs et les diagnostics
+    au lieu de les recalculer.
+    
+    Args:
+        uploaded_file: Fichier renvoyé par st.file_uploader
+        target_size: Tuple (hauteur, largeur) du modèle
+    
+    Returns:
+        dict: image (pour le modèle), preview, digest, target_size, views
+        (tenseurs par nombre de vues TTA) et analyses (diagnostics par réglages)
+    """
+    uploads = st.session_state.setdefault("uploads", OrderedDict())
+    key = (uploaded_file.file_id, tuple(target_size))
+    entry = uploads.get(key)
+    if entry is None:
+        # Décodage réduit : image pour le modèle + aperçu de taille bornée
+        with span("decode"):
+            image, preview = decode_upload(uploaded_file, target_size)
+        with span("hash"):
+            digest = content_digest(uploaded_file.getvalue())
+        entry = uploads[key] = {
+            "image": image, "preview": preview, "digest": digest,
+            "target_size": tuple(target_size), "views": {}, "analyses": {},
+        }
+        while len(uploads) > MAX_SESSION_UPLOADS:
+            uploads.popitem(last=False)
+    uploads.move_to_end(key)
+    return entry
+
+def session_views(entry, tta_views):
+    """
+    Tenseur prétraité d'un fichier téléchargé (vues TTA), mémorisé dans son état de session.
+    
+    Args:
+        entry: État renvoyé par session_upload
+        tta_views: Nombre de vues (1 = image seule)
+    
+    Returns:
+        numpy.ndarray: Tenseur float32 (tta_views, hauteur, largeur, 3)
+    """
+    views = entry["views"].get(tta_views)
+    if views is None:
+        with span("preprocess"):
+            views = entry["views"][tta_views] = build_views(entry["image"], tta_views, entry["target_size"])
+    return views
+
+def _gate_input(model, gate, batch, images):
+    """Tenseur du filtre : le lot du classifieur si les tailles d'entrée coïncident."""
+    if gate.target_size == model.target_size:
+        return batch
+    return preprocess_batch(images, gate.target_size)
+
+def predict_disease(model, image, cache_key=None, gate=None, gate_key=None, tta_views=1, views=None):
+    """
+    Effectue une prédiction sur l'image avec classification hiérarchique.
+    
+    Args:
+        model: Classifieur chargé par load_ml_model
         image: Image PIL
+        cache_key: Clé de cache de l'image (voir image_cache_keys), None pour ne pas utiliser le cache
+        gate: Filtre hors-distribution exécuté avant le classifieur (None = pas de filtre)
+        gate_key: Clé de cache de l'erreur de reconstruction de l'image
+        tta_views: Nombre de vues augmentées moyennées (1 = pas de TTA), en une seule passe du modèle
+        views: Tenseur des vues déjà prétraité (voir session_views), None = construit ici
     
     Returns:
-        tuple: (statut_principal, pathologie_specifique, confiance, all_predictions, predicted_class_idx)
+        tuple: (statut_principal, pathologie_specifique, confiance, all_predictions, predicted_class_idx),
+        statut_principal valant OUT_OF_DISTRIBUTION pour une image rejetée par le filtre
     """
     try:
-        # Prétraiter l'image
-        processed_image = preprocess_image(image)
-        
-        if processed_image is None:
-            return None, None, None, None, None
+        cache = get_prediction_cache()
+        if cache_key is not None and tta_views > 1:
+            cache_key = f"{cache_key}:tta{tta_views}"
+        if cache_key is not None:
+            probabilities = cache.get(cache_key)
+            if probabilities is not None:
+                return model.interpret(probabilities)
         
-        # Faire la prédiction
-        predictions = model.predict(processed_image, verbose=0)
+        # La première vue est l'image seule : elle sert aussi au filtre
+        batch = views
+        if batch is None:
+            with span("preprocess"):
+                batch = build_views(image, tta_views, model.target_size)
+        if gate is not None:
+            with span("ood_gate"):
+                _, accepted = gate.screen(
+                    _gate_input(model, gate, batch[:1], [image]),
+                    [gate_key] if gate_key is not None else None, cache
+                )
+            if not accepted[0]:
+                return OUT_OF_DISTRIBUTION, None, None, None, None
         
-        # Définition des 6 classes (ordre alphabétique probable)
-        class_names = [
-            'Healthy',                # 0
-            'Red Spider Mite',        # 1
-            'Rust Level 1',           # 2
-            'Rust Level 2',           # 3
-            'Rust Level 3',           # 4
-            'Rust Level 4'            # 5
-        ]
+        with span("inference"):
+            probabilities = model.predict_proba(batch).mean(axis=0)
+        if cache_key is not None:
+            cache.put(cache_key, probabilities)
+        return model.interpret(probabilities)
+    except Exception as e:
+        st.error(f"❌ Erreur lors de la prédiction : {e}")
+        return None, None, None, None, None
+
+def poll_jobs(futures, on_progress=None):
+    """
+    Attend les Futures du worker d'inférence en les consultant périodiquement.
+    Le thread de script reste inactif pendant la passe du modèle.
+    
+    Args:
+        futures: Futures renvoyés par WorkerModel.submit
+        on_progress: Fonction appelée avec le nombre de Futures résolus à chaque consultation
+    
+    Returns:
+        numpy.ndarray: Sorties empilées dans l'ordre des Futures
+    """
+    pending = set(futures)
+    while pending:
+        _, pending = wait(pending, timeout=JOB_POLL_INTERVAL_S)
+        if on_progress is not None:
+            on_progress(len(futures) - len(pending))
+    return collect(futures)
+
+def predict_diseases(model, images, batch_size=32, cache_keys=None, gate=None, gate_keys=None, progress=None):
+    """
+    Effectue les prédictions sur plusieurs images en mode lot.
+    
+    Les images prétraitées sont empilées par paquets de `batch_size` et mises
+    en file dans le worker d'inférence partagé ; le paquet suivant est
+    prétraité pendant la passe du précédent (deux tampons en alternance).
+    Les images déjà présentes dans le cache ne repassent pas par le modèle,
+    et celles rejetées par le filtre hors-distribution n'y passent pas du tout.
+    
+    Args:
+        model: Classifieur renvoyé par load_ml_model
+        images: Liste d'images PIL
+        batch_size: Nombre maximal d'images par paquet
+        cache_keys: Clés de cache des images (même ordre), None pour ne pas utiliser le cache
+        gate: Filtre hors-distribution exécuté avant le classifieur (None = pas de filtre)
+        gate_keys: Clés de cache des erreurs de reconstruction (même ordre)
+        progress: Fonction (images traitées, total) appelée pendant l'attente des résultats
+    
+    Returns:
+        list: Un tuple (statut_principal, pathologie_specifique, confiance,
+        all_predictions, predicted_class_idx) par image, dans l'ordre d'entrée
+    """
+    cache = get_prediction_cache()
+    results = [(None, None, None, None, None)] * len(images)
+    
+    # Résultats déjà en cache
+    to_predict = []
+    for i in range(len(images)):
+        probabilities = cache.get(cache_keys[i]) if cache_keys is not None else None
+        if probabilities is not None:
+            results[i] = model.interpret(probabilities)
+        else:
+            to_predict.append(i)
+    
+    # Images traitées (cache, rejets et passes terminées), pour la progression
+    done = len(images) - len(to_predict)
+    
+    def report(count):
+        if progress is not None:
+            progress(count, len(images))
+    
+    def finish(job):
+        """Attend les résultats d'un paquet en file et les enregistre."""
+        nonlocal done
+        valid, futures = job
+        try:
+            with span("inference"):
+                probabilities_batch = poll_jobs(futures, lambda resolved: report(done + resolved))
+            for i, probabilities in zip(valid, probabilities_batch):
+                if cache_keys is not None:
+                    cache.put(cache_keys[i], probabilities)
+                results[i] = model.interpret(probabilities)
+        except Exception as e:
+            st.error(f"❌ Erreur lors de la prédiction par lot : {e}")
+        done += len(valid)
+        report(done)
+    
+    # Deux tampons de lot réutilisés : un en file dans le worker, l'autre en prétraitement
+    buffers = [allocate_batch(min(batch_size, len(to_predict)), model.target_size) for _ in range(2)] if to_predict else []
+    in_flight = [None, None]
+    
+    for n, start in enumerate(range(0, len(to_predict), batch_size)):
+        chunk = to_predict[start:start + batch_size]
+        slot = n % 2
+        buffer = buffers[slot]
         
-        # Obtenir l'index de la classe avec la plus haute probabilité
-        predicted_class_idx = np.argmax(predictions[0])
-        confidence = predictions[0][predicted_class_idx] * 100
+        # Le tampon ne peut être réécrit qu'une fois son paquet précédent traité
+        if in_flight[slot] is not None:
+            finish(in_flight[slot])
+            in_flight[slot] = None
         
-        # Déterminer le statut principal (Healthy vs Unhealthy)
-        if predicted_class_idx == 0:
-            statut_principal = "Healthy"
-            pathologie_specifique = None
-        else:
-            statut_principal = "Unhealthy"
-            pathologie_specifique = class_names[predicted_class_idx]
+        # Prétraiter chaque image dans le tampon (une image illisible n'annule pas le lot)
+        valid = []
+        for i in chunk:
+            try:
+                with span("preprocess"):
+                    preprocess_into(images[i], buffer[len(valid)], model.target_size)
+                valid.append(i)
+            except Exception as e:
+                st.error(f"❌ Erreur lors du prétraitement de l'image : {e}")
+        done += len(chunk) - len(valid)
         
-        return statut_principal, pathologie_specifique, confidence, predictions[0], predicted_class_idx
+        if valid:
+            try:
+                batch = buffer[:len(valid)]
+                
+                # Filtre hors-distribution : une passe de l'autoencodeur pour le paquet
+                if gate is not None:
+                    with span("ood_gate"):
+                        _, accepted = gate.screen(
+                            _gate_input(model, gate, batch, [images[i] for i in valid]),
+                            [gate_keys[i] for i in valid] if gate_keys is not None else None, cache
+                        )
+                    for i in np.asarray(valid)[~accepted]:
+                        results[i] = (OUT_OF_DISTRIBUTION, None, None, None, None)
+                    done += int((~accepted).sum())
+                    if not accepted.all():
+                        valid = list(np.asarray(valid)[accepted])
+                        batch = batch[accepted]
+                
+                # Paquet mis en file : le worker le regroupe avec ceux des autres sessions
+                if valid:
+                    in_flight[slot] = (valid, model.submit(batch))
+            except Exception as e:
+                st.error(f"❌ Erreur lors de la prédiction par lot : {e}")
+        report(done)
+    
+    for job in in_flight:
+        if job is not None:
+            finish(job)
+    
+    return results
+
+def predict_disease_tiled(model, data):
+    """
+    Diagnostic d'une photo de branche ou de canopée par tuiles 224x224.
+    
+    Args:
+        model: Classifieur chargé par load_ml_model
+        data: Octets du fichier téléchargé
+    
+    Returns:
+        tuple: (diagnostic sur la moyenne des tuiles de feuillage, TileAnalysis, pixels de l'image de travail)
+    """
+    try:
+        with span("tiled_inference"):
+            analysis, pixels = analyze_tiles(model, data)
     except Exception as e:
-        st.error(f"❌ Erreur lors de la prédiction : {e}")
-        return None, None, None, None, None
+        st.error(f"❌ Erreur lors de l'analyse par tuiles : {e}")
+        return (None, None, None, None, None), None, None
+    
+    if analysis.mean_probabilities is None:
+        st.warning("⚠️ Aucune tuile ne contient de feuillage : impossible d'établir un diagnostic.")
+        return (None, None, None, None, None), analysis, pixels
+    return model.interpret(analysis.mean_probabilities), analysis, pixels
+
+def display_tile_analysis(analysis, pixels):
+    """
+    Affiche la carte de sévérité et la synthèse d'une analyse par tuiles.
+    
+    Args:
+        analysis: TileAnalysis renvoyée par predict_disease_tiled
+        pixels: Pixels de l'image de travail
+    """
+    summary = analysis.summary()
+    st.markdown("### 🗺️ Carte de Sévérité par Tuiles")
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric(label="Tuiles analysées", value=summary["tiles_scored"])
+    with col2:
+        st.metric(label="Tuiles de fond écartées", value=summary["tiles_skipped"])
+    if summary["tiles_scored"]:
+        with col3:
+            st.metric(label="Tuiles malades", value=f"{summary['diseased_fraction'] * 100:.0f}%")
+        with col4:
+            st.metric(label="Sévérité maximale (0-4)", value=f"{summary['max_severity']:.1f}")
+        
+        st.image(
+            severity_overlay(analysis, pixels),
+            caption=f"Vert = sain, rouge = rouille niveau 4 — tuile la plus sévère : {summary['worst_tile']['class']}",
+            use_container_width=True
+        )
+        st.dataframe(
+            {'Classe': list(summary["class_counts"]), 'Tuiles': list(summary["class_counts"].values())},
+            use_container_width=True, hide_index=True
+        )
 
 def display_results(statut_principal, pathologie_specifique, confidence, all_predictions, predicted_class_idx):
     """
@@ -728,125 +501,18 @@ def display_results(statut_principal, pathologie_specifique, confidence, all_pre
     """
     st.markdown("### 📊 Résultats de l'Analyse Expert")
     
-    # Classes pour l'affichage
-    class_names = [
-        'Healthy (Saine)',
-        'Red Spider Mite (Acarien Rouge)',
-        'Rust Level 1 (Rouille Niveau 1)',
-        'Rust Level 2 (Rouille Niveau 2)',
-        'Rust Level 3 (Rouille Niveau 3)',
-        'Rust Level 4 (Rouille Niveau 4)'
-    ]
-    
-    # Déterminer le statut et les couleurs
+    # Cartes précompilées (voir rendering.py) : seule la barre de confiance dépend de l'image
     is_healthy = statut_principal == "Healthy"
     
     # 1. DIAGNOSTIC PRINCIPAL
-    if is_healthy:
-        badge_class = "healthy-badge"
-        icon = "✅"
-        status_text = "FEUILLE SAINE"
-        message = "La feuille analysée est en bonne santé. Aucune pathologie détectée."
-        color = "#38ef7d"
-    else:
-        badge_class = "unhealthy-badge"
-        icon = "⚠️"
-        status_text = "FEUILLE MALADE"
-        message = f"La feuille présente des signes de maladie."
-        color = "#f45c43"
-    
-    # Carte de diagnostic principal
-    st.markdown(f"""
-        <div class="result-card">
-            <h2 style="text-align: center; margin-bottom: 1rem;">{icon} Diagnostic Principal</h2>
-            <div style="text-align: center;">
-                <span class="status-badge {badge_class}">{status_text}</span>
-            </div>
-            <p style="text-align: center; font-size: 1.1rem; color: #666; margin-top: 1rem;">
-                {message}
-            </p>
-        </div>
-    """, unsafe_allow_html=True)
+    st.markdown(DIAGNOSTIC_CARDS[is_healthy], unsafe_allow_html=True)
     
     # 2. PATHOLOGIE SPÉCIFIQUE (si malade)
     if not is_healthy and pathologie_specifique:
-        # Définir les caractéristiques de chaque pathologie
-        pathology_info = {
-            'Red Spider Mite': {
-                'icon': '🕷️',
-                'color': '#f7971e',
-                'severity': 'Modérée',
-                'description': 'Acarien rouge (Oligonychus coffeae)',
-                'symptoms': 'Points jaunes sur les feuilles, toiles fines, dessèchement'
-            },
-            'Rust Level 1': {
-                'icon': '🟡',
-                'color': '#ffd93d',
-                'severity': 'Légère',
-                'description': 'Rouille du caféier - Stade précoce',
-                'symptoms': 'Petites taches chlorotiques jaunes sur la face supérieure'
-            },
-            'Rust Level 2': {
-                'icon': '🟠',
-                'color': '#ff9800',
-                'severity': 'Moyenne',
-                'description': 'Rouille du caféier - Stade intermédiaire',                'symptoms': 'Pustules orangées visibles, lésions plus nombreuses'
-            },
-            'Rust Level 3': {
-                'icon': '🔴',
-                'color': '#ff5722',
-                'severity': 'Sévère',
-                'description': 'Rouille du caféier - Stade avancé',
-                'symptoms': 'Taches nombreuses et confluentes, défoliation partielle'
-            },
-            'Rust Level 4': {
-                'icon': '🚨',
-                'color': '#d32f2f',
-                'severity': 'Critique',
-                'description': 'Rouille du caféier - Stade critique',
-                'symptoms': 'Défoliation sévère, perte massive de feuilles, danger pour la plante'
-            }
-        }
-        
-        info = pathology_info.get(pathologie_specifique, {})
-        
-        st.markdown(f"""
-            <div class="result-card" style="border-left: 5px solid {info.get('color', '#f45c43')};">
-                <h3 style="color: {info.get('color', '#f45c43')}; margin-top: 0;">
-                    {info.get('icon', '🦠')} Pathologie Identifiée
-                </h3>
-                <div style="background: rgba(255,255,255,0.5); padding: 1.5rem; border-radius: 12px; margin: 1rem 0;">
-                    <h4 style="color: #333; margin-top: 0;">{pathologie_specifique}</h4>
-                    <p style="color: #666; margin: 0.5rem 0;">
-                        <strong>Description:</strong> {info.get('description', 'Pathologie détectée')}
-                    </p>
-                    <p style="color: #666; margin: 0.5rem 0;">
-                        <strong>Symptômes:</strong> {info.get('symptoms', 'À surveiller')}
-                    </p>
-                    <p style="color: #666; margin: 0.5rem 0;">
-                        <strong>Niveau de sévérité:</strong> 
-                        <span style="background: {info.get('color', '#f45c43')}; color: white; padding: 0.2rem 0.8rem; border-radius: 20px; font-weight: 600;">
-                            {info.get('severity', 'Variable')}
-                        </span>
-                    </p>
-                </div>
-            </div>
-        """, unsafe_allow_html=True)
+        st.markdown(pathology_card(pathologie_specifique), unsafe_allow_html=True)
     
     # 3. BARRE DE CONFIANCE
-    st.markdown(f"""
-        <div class="result-card">
-            <h3>🎯 Niveau de Confiance</h3>
-            <div class="confidence-bar">
-                <div class="confidence-fill" style="width: {confidence}%; background: linear-gradient(90deg, {color} 0%, {color} 100%);">
-                    {confidence:.1f}%
-                </div>
-            </div>
-            <p style="text-align: center; color: #666; margin-top: 0.5rem;">
-                Le modèle est confiant à <strong>{confidence:.1f}%</strong> dans ce diagnostic.
-            </p>
-        </div>
-    """, unsafe_allow_html=True)
+    st.markdown(confidence_card(confidence, is_healthy), unsafe_allow_html=True)
     
     # 4. DÉTAILS DES PROBABILITÉS
     with st.expander("📈 Voir les détails des probabilités pour toutes les classes"):
@@ -858,41 +524,41 @@ def display_results(statut_principal, pathologie_specifique, confidence, all_pre
         with col1:
             st.markdown("##### 🌿 Feuille Saine")
             st.metric(
-                label=class_names[0],
+                label=CLASS_LABELS[0],
                 value=f"{all_predictions[0] * 100:.2f}%",
                 delta=None
             )
             
             st.markdown("##### 🕷️ Acarien")
             st.metric(
-                label=class_names[1],
+                label=CLASS_LABELS[1],
                 value=f"{all_predictions[1] * 100:.2f}%",
                 delta=None
             )
             
             st.markdown("##### 🟡 Rouille Niveaux 1-2")
             st.metric(
-                label=class_names[2],
+                label=CLASS_LABELS[2],
                 value=f"{all_predictions[2] * 100:.2f}%",
                 delta=None
             )
         
         with col2:
             st.metric(
-                label=class_names[3],
+                label=CLASS_LABELS[3],
                 value=f"{all_predictions[3] * 100:.2f}%",
                 delta=None
             )
             
             st.markdown("##### 🔴 Rouille Niveaux 3-4")
             st.metric(
-                label=class_names[4],
+                label=CLASS_LABELS[4],
                 value=f"{all_predictions[4] * 100:.2f}%",
                 delta=None
             )
             
             st.metric(
-                label=class_names[5],
+                label=CLASS_LABELS[5],
                 value=f"{all_predictions[5] * 100:.2f}%",
                 delta=None
             )
@@ -900,11 +566,157 @@ def display_results(statut_principal, pathologie_specifique, confidence, all_pre
         # Graphique à barres
         st.markdown("##### 📊 Visualisation graphique")
         chart_data = {
-            'Classe': class_names,
+            'Classe': CLASS_LABELS,
             'Probabilité (%)': [p * 100 for p in all_predictions]
         }
         st.bar_chart(chart_data, x='Classe', y='Probabilité (%)', color='#667eea')
 
+def display_batch_results(file_names, results, summary):
+    """
+    Affiche le tableau de bord d'une analyse par lot.
+    
+    Args:
+        file_names: Noms des fichiers analysés
+        results: Liste de tuples renvoyés par predict_diseases
+        summary: BatchSummary du lot (agrégats calculés sur la matrice des probabilités)
+    """
+    st.markdown("### 📊 Résultats de l'Analyse par Lot")
+    
+    synthese = summary.summary()
+    class_counts = synthese.get("class_counts", {})
+    nb_healthy = class_counts.get("Healthy", 0)
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric(label="Images analysées", value=synthese["scored"])
+    with col2:
+        st.metric(label="✅ Feuilles saines", value=nb_healthy)
+    with col3:
+        st.metric(label="⚠️ Feuilles malades", value=synthese["scored"] - nb_healthy)
+    with col4:
+        st.metric(label=f"🔎 Confiance < {summary.low_confidence:.0f}%", value=synthese.get("low_confidence", 0))
+    
+    if synthese["rejected"]:
+        st.warning(f"🚫 {synthese['rejected']} image(s) ne ressemblent pas à des feuilles de café et n'ont pas été classées.")
+    if synthese["failed"]:
+        st.warning(f"⚠️ {synthese['failed']} image(s) n'ont pas pu être analysées.")
+    
+    if synthese["scored"]:
+        col1, col2 = st.columns(2)
+        with col1:
+            st.markdown("#### 🧮 Feuilles par classe")
+            st.bar_chart({"Feuilles": class_counts})
+        with col2:
+            st.markdown("#### 🔴 Sévérité de la rouille")
+            st.bar_chart({"Feuilles": synthese["severity_counts"]})
+            st.caption(
+                f"Sévérité attendue moyenne : {synthese['mean_severity']:.2f} / 4 — "
+                f"{synthese['diseased_fraction'] * 100:.0f}% de feuilles malades"
+            )
+        
+        outliers = summary.outliers(limit=MAX_LOW_CONFIDENCE_ROWS)
+        if len(outliers):
+            st.markdown("#### 🔎 Feuilles à faible confiance (à vérifier)")
+            st.dataframe(
+                {
+                    'Image': [summary.file_names[i] for i in outliers],
+                    'Classe': [CLASS_LABELS[c] for c in summary.classes[outliers]],
+                    'Confiance (%)': np.round(summary.confidence[outliers], 1),
+                },
+                use_container_width=True, hide_index=True
+            )
+    
+    # Export des résultats complets (une écriture en flux par format)
+    formats = ["csv", "parquet"] if parquet_available() else ["csv"]
+    for col, output_format in zip(st.columns(len(formats)), formats):
+        with col:
+            st.download_button(
+                f"⬇️ Exporter en {output_format.upper()}",
+                data=summary.export(output_format),
+                file_name=f"analyse_lot.{output_format}",
+                mime=EXPORT_FORMATS[output_format],
+                use_container_width=True
+            )
+    
+    # Tableau récapitulatif : un seul élément HTML, une ligne par image
+    with st.expander(f"📋 Détail des {len(results)} image(s)"):
+        st.markdown(batch_report_html(file_names, results), unsafe_allow_html=True)
+
+def analyze_batch(model, gate=None):
+    """
+    Section d'analyse par lot : plusieurs feuilles téléchargées en une fois.
+    
+    Args:
+        model: Modèle Keras chargé
+        gate: Filtre hors-distribution (None = pas de filtre)
+    """
+    st.markdown("---")
+    st.markdown("## 📤 Télécharger un Lot d'Images")
+    
+    uploaded_files = st.file_uploader(
+        "Choisissez les images de feuilles de café d'une parcelle (JPG, JPEG, PNG)",
+        type=['jpg', 'jpeg', 'png'],
+        accept_multiple_files=True,
+        help="Formats supportés: JPG, JPEG, PNG. Taille maximale: 200MB par image"
+    )
+    
+    if not uploaded_files:
+        st.info("ℹ️ Sélectionnez une ou plusieurs images pour lancer l'analyse par lot.")
+        return
+    
+    st.markdown(f"**{len(uploaded_files)}** image(s) sélectionnée(s).")
+    
+    col1, col2, col3 = st.columns([1, 1, 1])
+    with col2:
+        analyze_button = st.button(
+            "🔬 Analyser le Lot",
+            type="primary",
+            use_container_width=True
+        )
+    
+    # Résultats mémorisés pour ce lot et ces réglages : les réexécutions ne font que les afficher
+    batch_key = (tuple(f.file_id for f in uploaded_files), model.fingerprint, gate is not None)
+    
+    if analyze_button:
+        start_request("batch")
+        file_names = []
+        images = []
+        cache_keys = []
+        gate_keys = []
+        for uploaded_file in uploaded_files:
+            try:
+                with span("decode"):
+                    images.append(open_image(uploaded_file, model.target_size))
+                file_names.append(uploaded_file.name)
+                with span("hash"):
+                    cache_key, gate_key = image_cache_keys(uploaded_file.getvalue(), model, gate)
+                cache_keys.append(cache_key)
+                gate_keys.append(gate_key)
+            except Exception as e:
+                st.error(f"❌ Erreur lors de la lecture de {uploaded_file.name} : {e}")
+        
+        if not images:
+            st.error("❌ Aucune image valide à analyser.")
+            return
+        
+        label = f"🔍 Analyse de {len(images)} image(s) en cours..."
+        progress_bar = st.progress(0.0, text=label)
+        results = predict_diseases(
+            model, images, cache_keys=cache_keys, gate=gate, gate_keys=gate_keys,
+            progress=lambda processed, total: progress_bar.progress(processed / total, text=label),
+        )
+        progress_bar.empty()
+        st.session_state["batch_analysis"] = (
+            batch_key, file_names, results, BatchSummary.from_results(file_names, results, model.class_names)
+        )
+    
+    stored = st.session_state.get("batch_analysis")
+    if stored is not None and stored[0] == batch_key:
+        _, file_names, results, summary = stored
+        st.markdown("---")
+        with span("render"):
+            display_batch_results(file_names, results, summary)
+
 def main():
     """Fonction principale de l'application"""
     
@@ -975,203 +787,205 @@ def main():
         </div>
     """, unsafe_allow_html=True)
     
-    # Charger le modèle
+    # Attendre le modèle (chargement lancé en arrière-plan au démarrage)
     with st.spinner("🔄 Chargement du modèle..."):
         model = load_ml_model()
     
+    # Choix d'un autre modèle du dossier 'mes models' (chargé à la demande)
+    if model is not None:
+        model_names = get_model_registry().names()
+        if len(model_names) > 1:
+            default_name = model_name(MODEL_PATH)
+            selected_name = st.sidebar.selectbox(
+                "🧠 Modèle", model_names,
+                index=model_names.index(default_name) if default_name in model_names else 0,
+            )
+            with st.spinner(f"🔄 Chargement du modèle {selected_name}..."):
+                model = load_ml_model(selected_name)
+    
     if model is None:
         st.error("❌ Impossible de charger le modèle. Veuillez vérifier l'installation.")
         st.stop()
     
     st.success("✅ Modèle chargé avec succès !")
     
-    # Section d'upload
-    st.markdown("---")
-    st.markdown("## 📤 Télécharger une Image")
+    # Filtre hors-distribution (autoencodeur) avant le classifieur
+    gate = get_ood_gate()
+    if gate is not None and gate.enabled:
+        if not st.sidebar.toggle(
+            "🛡️ Rejeter les images hors distribution", value=True,
+            help="L'autoencodeur écarte les photos qui ne ressemblent pas à une feuille de café avant le diagnostic"
+        ):
+            gate = None
+    else:
+        gate = None
+    
+    # Augmentation au moment du test : vues moyennées en une seule passe du modèle
+    tta_views = st.sidebar.select_slider(
+        "🔁 Vues TTA (image unique)",
+        options=list(range(1, len(available_views(model.target_size)) + 1)),
+        value=1,
+        help="Retournements, rotations et recadrages moyennés pour stabiliser les diagnostics limites "
+             "(voir python -m benchmarks.bench_tta pour le coût en latence)"
+    )
     
-    uploaded_file = st.file_uploader(
-        "Choisissez une image de feuille de café (JPG, JPEG, PNG)",
-        type=['jpg', 'jpeg', 'png'],
-        help="Formats supportés: JPG, JPEG, PNG. Taille maximale: 200MB"
+    # Choix du mode d'analyse
+    st.markdown("---")
+    mode_analyse = st.radio(
+        "Mode d'analyse",
+        ["🖼️ Image unique", "🗂️ Lot d'images"],
+        horizontal=True,
+        help="Le mode lot analyse plusieurs feuilles d'une même parcelle en une seule passe du modèle"
     )
     
-    if uploaded_file is not None:
-        # Lire et afficher l'image
-        try:
-            image = Image.open(uploaded_file).convert('RGB')
-            
-            # Afficher l'image téléchargée
-            col1, col2, col3 = st.columns([1, 2, 1])
-            with col2:
-                st.markdown("### 📸 Image téléchargée")
-                st.image(image, caption="Image de la feuille à analyser", use_container_width=True)
-            
-            # Bouton d'analyse
-            st.markdown("---")
-            
-            col1, col2, col3 = st.columns([1, 1, 1])
-            with col2:
-                analyze_button = st.button(
-                    "🔬 Analyser l'Image",
-                    type="primary",
-                    use_container_width=True
+    if mode_analyse == "🗂️ Lot d'images":
+        analyze_batch(model, gate)
+    else:
+        # Section d'upload
+        st.markdown("---")
+        st.markdown("## 📤 Télécharger une Image")
+        
+        uploaded_file = st.file_uploader(
+            "Choisissez une image de feuille de café (JPG, JPEG, PNG)",
+            type=['jpg', 'jpeg', 'png'],
+            help="Formats supportés: JPG, JPEG, PNG. Taille maximale: 200MB"
+        )
+        
+        if uploaded_file is not None:
+            # Lire et afficher l'image
+            try:
+                # Image décodée et aperçu mémorisés dans la session (un décodage par fichier)
+                upload = session_upload(uploaded_file, model.target_size)
+                
+                # Afficher l'image téléchargée
+                col1, col2, col3 = st.columns([1, 2, 1])
+                with col2:
+                    st.markdown("### 📸 Image téléchargée")
+                    st.image(upload["preview"], caption="Image de la feuille à analyser", use_container_width=True)
+                
+                # Bouton d'analyse
+                st.markdown("---")
+                
+                tiled = st.checkbox(
+                    "🔲 Analyse par tuiles (photo de branche ou de canopée)",
+                    help="Découpe la photo en tuiles 224x224 qui se chevauchent pour ne pas perdre les petites lésions"
                 )
-            
-            if analyze_button:
-                # Analyser l'image
-                with st.spinner("🔍 Analyse en cours..."):
-                    statut_principal, pathologie_specifique, confidence, all_predictions, predicted_class_idx = predict_disease(model, image)
                 
-                if statut_principal is not None:
-                    st.markdown("---")
-                    # Afficher les résultats
-                    display_results(statut_principal, pathologie_specifique, confidence, all_predictions, predicted_class_idx)
+                col1, col2, col3 = st.columns([1, 1, 1])
+                with col2:
+                    analyze_button = st.button(
+                        "🔬 Analyser l'Image",
+                        type="primary",
+                        use_container_width=True
+                    )
+                
+                # Diagnostic mémorisé pour ces réglages : les réexécutions ne font que l'afficher
+                analysis_key = (model.fingerprint, gate is not None, tiled, 1 if tiled else tta_views)
+                stored = upload["analyses"].get(analysis_key)
+                if analyze_button and stored is None:
+                    # Analyser l'image
+                    with st.spinner("🔍 Analyse en cours..."):
+                        start_request("tiled" if tiled else "single")
+                        if tiled:
+                            result, analysis, pixels = predict_disease_tiled(model, uploaded_file.getvalue())
+                        else:
+                            analysis = pixels = None
+                            cache_key, gate_key = model_cache_keys(upload["digest"], model, gate)
+                            result = predict_disease(
+                                model, upload["image"], cache_key, gate, gate_key, tta_views,
+                                views=session_views(upload, tta_views)
+                            )
+                    stored = (result, analysis, pixels)
+                    if result[0] is not None or analysis is not None:
+                        upload["analyses"][analysis_key] = stored
+                
+                if stored is not None:
+                    result, analysis, pixels = stored
+                    statut_principal, pathologie_specifique, confidence, all_predictions, predicted_class_idx = result
                     
-                    # Recommandations spécifiques
-                    st.markdown("---")
-                    st.markdown("### 💡 Recommandations d'Actions")
+                    if analysis is not None:
+                        st.markdown("---")
+                        with span("render"):
+                            display_tile_analysis(analysis, pixels)
                     
-                    if statut_principal == "Healthy":
-                        st.markdown("""
-                            <div class="instruction-card">
-                                <h4 style="color: #38ef7d; margin-top: 0;">✅ Feuille Saine Détectée</h4>
-                                <ul>
-                                    <li><strong>Surveillance préventive:</strong> Continuez les pratiques agricoles actuelles</li>
-                                    <li><strong>Contrôle régulier:</strong> Inspectez les plants chaque semaine</li>
-                                    <li><strong>Nutrition:</strong> Maintenez un programme de fertilisation équilibré</li>
-                                    <li><strong>Prophylaxie:</strong> Appliquez des traitements préventifs si nécessaire</li>
-                                    <li><strong>Documentation:</strong> Notez l'état actuel pour référence future</li>
-                                </ul>
-                            </div>
-                        """, unsafe_allow_html=True)
-                    else:
-                        # Recommandations spécifiques selon la pathologie
-                        recommendations = {
-                            'Red Spider Mite': {
-                                'color': '#f7971e',
-                                'icon': '🕷️',
-                                'title': 'Acarien Rouge Détecté',
-                                'actions': [
-                                    '<strong>Action immédiate:</strong> Isoler les plants infectés',
-                                    '<strong>Traitement acaricide:</strong> Appliquer un acaricide spécifique (ex: abamectine, spiromesifen)',
-                                    '<strong>Contrôle biologique:</strong> Introduire des prédateurs naturels (acariens prédateurs)',
-                                    '<strong>Gestion environnementale:</strong> Augmenter l\'humidité relative (> 70%)',
-                                    '<strong>Éviter:</strong> La sur-fertilisation azotée qui favorise les acariens',
-                                    '<strong>Monitoring:</strong> Surveiller hebdomadairement avec des loupes',
-                                    '<strong>Prévention:</strong> Éliminer les mauvaises herbes environnantes'
-                                ]
-                            },
-                            'Rust Level 1': {
-                                'color': '#ffd93d',
-                                'icon': '🟡',
-                                'title': 'Rouille Niveau 1 - Intervention Précoce',
-                                'actions': [
-                                    '<strong>Chance de contrôle:</strong> Excellent! Intervention au stade précoce',
-                                    '<strong>Fongicide systémique:</strong> Appliquer triazole ou strobilurine',
-                                    '<strong>Action rapide:</strong> Traiter sous 48h pour éviter la progression',
-                                    '<strong>Élimination:</strong> Retirer et brûler les feuilles légèrement affectées',
-                                    '<strong>Espacement:</strong> Améliorer la circulation d\'air entre les plants',
-                                    '<strong>Nutrition:</strong> Renforcer avec potassium et micronutriments',
-                                    '<strong>Surveillance:</strong> Inspections quotidiennes pendant 2 semaines'
-                                ]
-                            },
-                            'Rust Level 2': {
-                                'color': '#ff9800',
-                                'icon': '🟠',
-                                'title': 'Rouille Niveau 2 - Action Urgente Requise',
-                                'actions': [
-                                    '<strong>Urgence:</strong> Traitement fongicide dans les 24h',
-                                    '<strong>Protocole intensif:</strong> Fongicide à base de cuivre + triazole',
-                                    '<strong>Double application:</strong> Répéter le traitement après 10-14 jours',
-                                    '<strong>Défoliation ciblée:</strong> Enlever les feuilles moyennement à fortement infectées',
-                                    '<strong>Quarantaine:</strong> Isoler immédiatement la zone affectée',
-                                    '<strong>Réduire humidité:</strong> Éviter l\'irrigation par aspersion',
-                                    '<strong>Consultation:</strong> Faire appel à un phytopathologiste',
-                                    '<strong>Traçabilité:</strong> Cartographier les zones infectées'
-                                ]
-                            },
-                            'Rust Level 3': {
-                                'color': '#ff5722',
-                                'icon': '🔴',
-                                'title': 'Rouille Niveau 3 - Situation Critique',
-                                'actions': [
-                                    '<strong>⚠️ ALERTE CRITIQUE:</strong> Intervention d\'urgence requise',
-                                    '<strong>Traitement agressif:</strong> Fongicide systémique à dose maximale',
-                                    '<strong>Applications fréquentes:</strong> Traiter tous les 7 jours pendant 1 mois',
-                                    '<strong>Défoliation majeure:</strong> Retirer jusqu\'à 60% des feuilles infectées',
-                                    '<strong>Tailler:</strong> Élaguer les branches fortement atteintes',
-                                    '<strong>Zone tampon:</strong> Traiter aussi les plants dans un rayon de 10m',
-                                    '<strong>Mesures drastiques:</strong> Envisager l\'arrachage des plants les plus atteints',
-                                    '<strong>Expert obligatoire:</strong> Consultation immédiate d\'un agronome',
-                                    '<strong>Perte de rendement:</strong> Prévoir 30-50% de baisse de production'
-                                ]
-                            },
-                            'Rust Level 4': {
-                                'color': '#d32f2f',
-                                'icon': '🚨',
-                                'title': 'Rouille Niveau 4 - URGENCE MAXIMALE',
-                                'actions': [
-                                    '<strong>🚨 DANGER IMMINENT:</strong> Risque de perte totale du plant',
-                                    '<strong>Décision urgente:</strong> Évaluer viabilité du plant (< 30% feuilles saines = arracher)',
-                                    '<strong>Si maintien:</strong> Traitement fongicide + nutritionnel intensif',
-                                    '<strong>Défoliation complète:</strong> Retirer TOUTES les feuilles infectées',
-                                    '<strong>Taille sévère:</strong> Rabattre au niveau du tronc si nécessaire',
-                                    '<strong>Quarantaine stricte:</strong> Isoler avec barrière physique',
-                                    '<strong>Protection zone saine:</strong> Traiter préventivement tous les plants dans 20m',
-                                    '<strong>Désinfection:</strong> Désinfecter tous les outils après usage',
-                                    '<strong>Arrachage possible:</strong> Détruire le plant si l\'infection progresse',
-                                    '<strong>Réglementation:</strong> Déclarer aux autorités phytosanitaires si requis',
-                                    '<strong>Perte économique:</strong> Anticiper perte de 70-100% du rendement'
-                                ]
-                            }
-                        }
+                    if statut_principal == OUT_OF_DISTRIBUTION:
+                        st.warning(
+                            "🚫 Cette image ne ressemble pas à une feuille de café : aucun diagnostic n'a été établi. "
+                            "Désactivez le filtre hors-distribution dans la barre latérale pour l'analyser quand même."
+                        )
+                    elif statut_principal is not None:
+                        st.markdown("---")
+                        # Afficher les résultats
+                        with span("render"):
+                            display_results(statut_principal, pathologie_specifique, confidence, all_predictions, predicted_class_idx)
                         
-                        reco = recommendations.get(pathologie_specifique, {
-                            'color': '#f45c43',
-                            'icon': '⚠️',
-                            'title': 'Feuille Malade Détectée',
-                            'actions': [
-                                '<strong>Action immédiate:</strong> Isoler les plants affectés',
-                                'Consulter un agronome spécialisé',
-                                'Analyser les conditions environnementales',
-                                'Surveiller la propagation'
-                            ]
-                        })
+                        # Recommandations spécifiques
+                        st.markdown("---")
+                        st.markdown("### 💡 Recommandations d'Actions")
                         
-                        actions_html = ''.join([f'<li>{action}</li>' for action in reco['actions']])
-                        
-                        st.markdown(f"""
-                            <div class="instruction-card" style="border-left: 5px solid {reco['color']};">
-                                <h4 style="color: {reco['color']}; margin-top: 0;">{reco['icon']} {reco['title']}</h4>
-                                <ul>
-                                    {actions_html}
-                                </ul>
-                            </div>
-                        """, unsafe_allow_html=True)
-                else:
-                    st.error("❌ Erreur lors de l'analyse de l'image.")
+                        st.markdown(
+                            recommendation_card("Healthy" if statut_principal == "Healthy" else pathologie_specifique),
+                            unsafe_allow_html=True
+                        )
+                    else:
+                        st.error("❌ Erreur lors de l'analyse de l'image.")
+            
+            except Exception as e:
+                st.error(f"❌ Erreur lors du traitement de l'image : {e}")
         
-        except Exception as e:
-            st.error(f"❌ Erreur lors du traitement de l'image : {e}")
-    
-    else:
-        # Instructions quand aucune image n'est téléchargée
-        st.markdown("""
-            <div class="upload-section">
-                <h2 style="color: rgba(255, 255, 255, 0.9); margin-top: 0; font-size: 2.5rem;">📁 Glissez votre image ici</h2>
-                <p style="color: rgba(255, 255, 255, 0.8); margin: 1.5rem 0; font-size: 1.2rem;">
-                    Sélectionnez une image de feuille de café pour commencer l'analyse intelligente
-                </p>
-                <div style="margin: 2rem 0;">
-                    <span style="display: inline-block; background: rgba(102, 126, 234, 0.2); color: rgba(255, 255, 255, 0.9); padding: 0.5rem 1.5rem; border-radius: 50px; margin: 0.5rem; font-weight: 600;">JPG</span>
-                    <span style="display: inline-block; background: rgba(102, 126, 234, 0.2); color: rgba(255, 255, 255, 0.9); padding: 0.5rem 1.5rem; border-radius: 50px; margin: 0.5rem; font-weight: 600;">JPEG</span>
-                    <span style="display: inline-block; background: rgba(102, 126, 234, 0.2); color: rgba(255, 255, 255, 0.9); padding: 0.5rem 1.5rem; border-radius: 50px; margin: 0.5rem; font-weight: 600;">PNG</span>
+        else:
+            # Instructions quand aucune image n'est téléchargée
+            st.markdown("""
+                <div class="upload-section">
+                    <h2 style="color: rgba(255, 255, 255, 0.9); margin-top: 0; font-size: 2.5rem;">📁 Glissez votre image ici</h2>
+                    <p style="color: rgba(255, 255, 255, 0.8); margin: 1.5rem 0; font-size: 1.2rem;">
+                        Sélectionnez une image de feuille de café pour commencer l'analyse intelligente
+                    </p>
+                    <div style="margin: 2rem 0;">
+                        <span style="display: inline-block; background: rgba(102, 126, 234, 0.2); color: rgba(255, 255, 255, 0.9); padding: 0.5rem 1.5rem; border-radius: 50px; margin: 0.5rem; font-weight: 600;">JPG</span>
+                        <span style="display: inline-block; background: rgba(102, 126, 234, 0.2); color: rgba(255, 255, 255, 0.9); padding: 0.5rem 1.5rem; border-radius: 50px; margin: 0.5rem; font-weight: 600;">JPEG</span>
+                        <span style="display: inline-block; background: rgba(102, 126, 234, 0.2); color: rgba(255, 255, 255, 0.9); padding: 0.5rem 1.5rem; border-radius: 50px; margin: 0.5rem; font-weight: 600;">PNG</span>
+                    </div>
+                    <p style="color: rgba(255, 255, 255, 0.6); font-size: 0.95rem; margin-top: 1.5rem;">
+                        ✨ Taille maximale : 200MB | 🔒 Traitement sécurisé local
+                    </p>
                 </div>
-                <p style="color: rgba(255, 255, 255, 0.6); font-size: 0.95rem; margin-top: 1.5rem;">
-                    ✨ Taille maximale : 200MB | 🔒 Traitement sécurisé local
-                </p>
-            </div>
-        """, unsafe_allow_html=True)
+            """, unsafe_allow_html=True)
+    
+    # Statistiques du cache des prédictions et durées de démarrage
+    cache_stats = get_prediction_cache().stats()
+    timings = model.startup_timings
+    st.sidebar.markdown("---")
+    if timings:
+        readiness = model.readiness.snapshot()
+        st.sidebar.caption(
+            f"⏱️ Démarrage du modèle : import {timings['import_s']:.1f}s | "
+            f"chargement {timings['load_s']:.1f}s | warmup {timings['warmup_s']:.1f}s | "
+            f"prêt en {readiness['time_to_ready_s']:.1f}s"
+        )
+    registry_stats = get_model_registry().stats()
+    st.sidebar.caption(
+        f"🧠 Modèles en mémoire : {len(registry_stats['resident'])}/{registry_stats['max_resident']} "
+        f"({registry_stats['resident_mb']:.0f} Mo) | remplacements à chaud : {registry_stats['swaps']}"
+    )
+    worker_stats = get_inference_worker().stats()
+    st.sidebar.caption(
+        f"⚙️ Worker d'inférence : {worker_stats['submitted']} image(s) traitée(s), "
+        f"{worker_stats['pending']} en attente | threads TensorFlow "
+        f"{worker_stats['intra_op_threads']} intra / {worker_stats['inter_op_threads']} inter"
+    )
+    ood_gate = get_ood_gate()
+    if ood_gate is not None and ood_gate.enabled:
+        gate_stats = ood_gate.stats()
+        st.sidebar.caption(
+            f"🛡️ Filtre hors-distribution : {gate_stats['rejected']}/{gate_stats['checked']} image(s) rejetée(s), "
+            f"{gate_stats['classifier_images_avoided']} passe(s) du classifieur évitée(s) "
+            f"(autoencodeur {gate_stats['gate_s']:.1f}s)"
+        )
+    st.sidebar.caption(
+        f"🗃️ Cache des prédictions : {cache_stats['hits']} succès / {cache_stats['misses']} échecs "
+        f"({cache_stats['entries']}/{PREDICTION_CACHE_SIZE} entrées)"
+    )
     
     # Footer
     st.markdown("---")
@@ -1189,5 +1003,30 @@ def main():
         </div>
     """, unsafe_allow_html=True)
 
+def display_debug_panel(trace):
+    """
+    Panneau de débogage (barre latérale) : durée de chaque étape de la dernière analyse.
+    
+    Args:
+        trace: RequestTrace de l'exécution courante du script
+    """
+    if trace.mode is not None:
+        st.session_state["last_trace"] = trace
+    if not st.sidebar.toggle("🐞 Durées par étape (débogage)", value=False):
+        return
+    
+    last_trace = st.session_state.get("last_trace")
+    if last_trace is None:
+        st.sidebar.caption("Aucune analyse pour l'instant.")
+        return
+    st.sidebar.caption(
+        f"Dernière analyse ({last_trace.mode}) : {last_trace.total_s * 1000:.0f} ms au total"
+        + (f" | métriques : http://{METRICS_HOST}:{METRICS_PORT}/metrics" if start_metrics_export() else "")
+    )
+    st.sidebar.dataframe(last_trace.rows(), use_container_width=True, hide_index=True)
+
 if __name__ == "__main__":
-    main()
+    # Trace de l'exécution : alimente le panneau de débogage
+    with RequestTrace() as trace:
+        main()
+    display_debug_panel(trace)
@@ -0,0 +1,381 @@
+"""
+Backends d'Inférence - Feuilles de Café
+=======================================
+Exécution de la passe avant du classifieur sur différents moteurs.
+
+Tous les backends exposent la même interface :
+    backend.predict_proba(batch)  # (N, 224, 224, 3) float32 dans [0, 1] -> (N, 6)
+    backend.warmup()              # première exécution, avant le premier utilisateur
+
+TensorFlow n'est importé qu'au chargement d'un backend qui en a besoin :
+importer ce module reste instantané (le backend ONNX n'importe jamais TF).
+
+Backends disponibles:
+    keras       Modèle .keras, passe avant compilée en tf.function
+    savedmodel  Dossier SavedModel TensorFlow (signature serving_default)
+    tflite      Modèle .tflite (float, dynamic-range ou int8), interpréteur multi-thread
+    onnx        Modèle .onnx exécuté par ONNX Runtime (CPU)
+
+Auteur: Groupe 8
+Projet: Deep Learning - Classification des maladies des feuilles de café
+"""
+
+import importlib.util
+import os
+import threading
+
+import numpy as np
+
+from preprocessing import INPUT_SIZE
+
+
+def _env_int(name):
+    value = os.environ.get(name)
+    return int(value) if value else None
+
+
+# Nombre de threads par défaut des interpréteurs (None = choix du moteur)
+DEFAULT_NUM_THREADS = _env_int("COFFEE_NUM_THREADS")
+
+# Parallélisme intra-op / inter-op par défaut (TensorFlow et ONNX Runtime)
+DEFAULT_INTRA_OP_THREADS = _env_int("COFFEE_INTRA_OP_THREADS")
+DEFAULT_INTER_OP_THREADS = _env_int("COFFEE_INTER_OP_THREADS")
+
+
+def configure_tf_threads(intra_op_threads=None, inter_op_threads=None):
+    """
+    Règle le parallélisme de TensorFlow pour tout le processus.
+
+    Doit être appelé avant la première opération TensorFlow : une fois le
+    runtime initialisé, TensorFlow refuse la modification.
+
+    Args:
+        intra_op_threads: Threads utilisés à l'intérieur d'une opération (None = inchangé)
+        inter_op_threads: Opérations indépendantes exécutées en parallèle (None = inchangé)
+
+    Returns:
+        bool: True si les réglages ont été appliqués
+    """
+    import tensorflow as tf
+
+    try:
+        if intra_op_threads is not None:
+            tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+        if inter_op_threads is not None:
+            tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+    except RuntimeError:
+        # Runtime déjà initialisé : les réglages existants restent en place
+        return False
+    return True
+
+
+def build_inference_function(model, target_size=INPUT_SIZE):
+    """
+    Compile la passe avant du modèle en graphe TensorFlow à signature fixe.
+
+    Contrairement à `model.predict`, qui reconstruit un adaptateur de données
+    et une boucle de distribution à chaque appel, la fonction renvoyée est
+    tracée une seule fois pour toutes les tailles de lot (dimension None).
+
+    Args:
+        model: Modèle Keras chargé
+        target_size: Tuple (hauteur, largeur) attendu par le modèle
+
+    Returns:
+        tf.types.experimental.ConcreteFunction: Fonction (N, hauteur, largeur, 3) float32 -> probabilités
+    """
+    import tensorflow as tf
+
+    @tf.function(input_signature=[tf.TensorSpec(shape=(None, *target_size, 3), dtype=tf.float32)])
+    def infer(batch):
+        return model(batch, training=False)
+
+    return infer.get_concrete_function()
+
+
+def _warmup(backend, batch_sizes):
+    """Exécute le backend sur des lots nuls pour chaque taille demandée."""
+    for batch_size in batch_sizes:
+        backend.predict_proba(np.zeros((batch_size, *backend.target_size, 3), dtype=np.float32))
+
+
+class KerasBackend:
+    """Backend Keras : passe avant compilée une fois au chargement."""
+
+    name = "keras"
+    requires_tensorflow = True
+
+    def __init__(self, model, target_size=INPUT_SIZE):
+        """
+        Args:
+            model: Modèle Keras chargé
+            target_size: Tuple (hauteur, largeur) attendu par le modèle
+        """
+        self.model = model
+        self.target_size = tuple(target_size)
+        self._infer = build_inference_function(model, self.target_size)
+
+    @classmethod
+    def from_path(cls, model_path, target_size=INPUT_SIZE, intra_op_threads=DEFAULT_INTRA_OP_THREADS,
+                  inter_op_threads=DEFAULT_INTER_OP_THREADS, **options):
+        """Charge un modèle .keras."""
+        import tensorflow as tf
+
+        configure_tf_threads(intra_op_threads, inter_op_threads)
+        return cls(tf.keras.models.load_model(model_path), target_size)
+
+    def warmup(self, batch_sizes=(1,)):
+        _warmup(self, batch_sizes)
+
+    def predict_proba(self, batch):
+        import tensorflow as tf
+
+        return self._infer(tf.convert_to_tensor(batch, dtype=tf.float32)).numpy()
+
+
+class SavedModelBackend:
+    """Backend SavedModel : signature `serving_default` d'un export TensorFlow."""
+
+    name = "savedmodel"
+    requires_tensorflow = True
+
+    def __init__(self, model_path, target_size=INPUT_SIZE):
+        """
+        Args:
+            model_path: Dossier SavedModel
+            target_size: Tuple (hauteur, largeur) attendu par le modèle
+        """
+        import tensorflow as tf
+
+        self.model_path = model_path
+        self.target_size = tuple(target_size)
+        # Garder l'objet chargé : la signature en dépend
+        self._loaded = tf.saved_model.load(model_path)
+        self._signature = self._loaded.signatures["serving_default"]
+        self._input_name = next(iter(self._signature.structured_input_signature[1]))
+
+    @classmethod
+    def from_path(cls, model_path, target_size=INPUT_SIZE, intra_op_threads=DEFAULT_INTRA_OP_THREADS,
+                  inter_op_threads=DEFAULT_INTER_OP_THREADS, **options):
+        """Charge un dossier SavedModel."""
+        configure_tf_threads(intra_op_threads, inter_op_threads)
+        return cls(model_path, target_size)
+
+    def warmup(self, batch_sizes=(1,)):
+        _warmup(self, batch_sizes)
+
+    def predict_proba(self, batch):
+        import tensorflow as tf
+
+        outputs = self._signature(**{self._input_name: tf.convert_to_tensor(batch, dtype=tf.float32)})
+        return next(iter(outputs.values())).numpy()
+
+
+# Interpréteur LiteRT autonome installé (sinon, celui de TensorFlow est utilisé)
+LITERT_AVAILABLE = importlib.util.find_spec("ai_edge_litert") is not None
+
+
+def _make_tflite_interpreter(model_path, num_threads):
+    """Crée l'interpréteur LiteRT s'il est installé, sinon celui de TensorFlow."""
+    if LITERT_AVAILABLE:
+        from ai_edge_litert.interpreter import Interpreter
+    else:
+        # tensorflow.lite n'est pas un sous-module importable : passer par l'attribut
+        import tensorflow as tf
+
+        Interpreter = tf.lite.Interpreter
+    return Interpreter(model_path=model_path, num_threads=num_threads)
+
+
+class TFLiteBackend:
+    """
+    Backend TensorFlow Lite multi-thread.
+
+    Gère les modèles float, dynamic-range et int8 complets : pour ces derniers,
+    l'entrée est quantifiée et la sortie déquantifiée avec les paramètres
+    (scale, zero_point) enregistrés dans le modèle.
+    """
+
+    name = "tflite"
+    # TensorFlow n'est nécessaire que sans LiteRT (voir _make_tflite_interpreter)
+    requires_tensorflow = not LITERT_AVAILABLE
+
+    def __init__(self, model_path, target_size=INPUT_SIZE, num_threads=DEFAULT_NUM_THREADS):
+        """
+        Args:
+            model_path: Chemin du fichier .tflite
+            target_size: Tuple (hauteur, largeur) attendu par le modèle
+            num_threads: Threads de l'interpréteur (None = choix du moteur)
+        """
+        self.model_path = model_path
+        self.target_size = tuple(target_size)
+        self.num_threads = num_threads
+        self._interpreter = _make_tflite_interpreter(model_path, num_threads)
+        self._input = self._interpreter.get_input_details()[0]
+        self._output = self._interpreter.get_output_details()[0]
+        self._batch_size = None
+        # L'interpréteur n'est pas réentrant
+        self._lock = threading.Lock()
+        self._resize(1)
+
+    @classmethod
+    def from_path(cls, model_path, target_size=INPUT_SIZE, num_threads=DEFAULT_NUM_THREADS, **options):
+        """Charge un modèle .tflite."""
+        return cls(model_path, target_size, num_threads)
+
+    def warmup(self, batch_sizes=(1,)):
+        _warmup(self, batch_sizes)
+
+    def _resize(self, batch_size):
+        """Adapte la dimension de lot de l'interpréteur (coûteux : fait seulement si elle change)."""
+        if batch_size != self._batch_size:
+            self._interpreter.resize_tensor_input(self._input["index"], [batch_size, *self.target_size, 3])
+            self._interpreter.allocate_tensors()
+            self._input = self._interpreter.get_input_details()[0]
+            self._output = self._interpreter.get_output_details()[0]
+            self._batch_size = batch_size
+
+    def predict_proba(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        input_dtype = self._input["dtype"]
+        if input_dtype != np.float32:
+            scale, zero_point = self._input["quantization"]
+            info = np.iinfo(input_dtype)
+            batch = np.clip(np.round(batch / scale + zero_point), info.min, info.max).astype(input_dtype)
+
+        with self._lock:
+            self._resize(len(batch))
+            self._interpreter.set_tensor(self._input["index"], batch)
+            self._interpreter.invoke()
+            output = self._interpreter.get_tensor(self._output["index"])
+
+        if output.dtype != np.float32:
+            scale, zero_point = self._output["quantization"]
+            output = (output.astype(np.float32) - zero_point) * scale
+        return output
+
+
+class OnnxBackend:
+    """
+    Backend ONNX Runtime (CPU).
+
+    Nécessite le paquet optionnel `onnxruntime` (pip install onnxruntime).
+    """
+
+    name = "onnx"
+    requires_tensorflow = False
+
+    def __init__(self, model_path, target_size=INPUT_SIZE, intra_op_threads=DEFAULT_INTRA_OP_THREADS,
+                 inter_op_threads=DEFAULT_INTER_OP_THREADS):
+        """
+        Args:
+            model_path: Chemin du fichier .onnx
+            target_size: Tuple (hauteur, largeur) attendu par le modèle
+            intra_op_threads: Threads à l'intérieur d'une opération (None = choix du moteur)
+            inter_op_threads: Opérations indépendantes en parallèle (None = choix du moteur)
+        """
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("Le backend ONNX nécessite onnxruntime : pip install onnxruntime") from e
+
+        options = ort.SessionOptions()
+        if intra_op_threads is not None:
+            options.intra_op_num_threads = intra_op_threads
+        if inter_op_threads is not None:
+            options.inter_op_num_threads = inter_op_threads
+            options.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+
+        self.model_path = model_path
+        self.target_size = tuple(target_size)
+        self._session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self._input_name = self._session.get_inputs()[0].name
+
+    @classmethod
+    def from_path(cls, model_path, target_size=INPUT_SIZE, intra_op_threads=DEFAULT_INTRA_OP_THREADS,
+                  inter_op_threads=DEFAULT_INTER_OP_THREADS, **options):
+        """Charge un modèle .onnx."""
+        return cls(model_path, target_size, intra_op_threads, inter_op_threads)
+
+    def warmup(self, batch_sizes=(1,)):
+        _warmup(self, batch_sizes)
+
+    def predict_proba(self, batch):
+        batch = np.ascontiguousarray(batch, dtype=np.float32)
+        return self._session.run(None, {self._input_name: batch})[0]
+
+
+# Backends disponibles, par nom
+BACKENDS = {
+    KerasBackend.name: KerasBackend,
+    SavedModelBackend.name: SavedModelBackend,
+    TFLiteBackend.name: TFLiteBackend,
+    OnnxBackend.name: OnnxBackend,
+}
+
+# Backend déduit de l'extension du fichier de modèle
+_BACKEND_BY_EXTENSION = {
+    ".keras": KerasBackend.name,
+    ".h5": KerasBackend.name,
+    ".tflite": TFLiteBackend.name,
+    ".onnx": OnnxBackend.name,
+}
+
+
+def infer_backend_name(model_path):
+    """
+    Déduit le backend à partir du chemin du modèle.
+
+    Args:
+        model_path: Chemin du fichier de modèle
+
+    Returns:
+        str: Nom du backend
+    """
+    if os.path.isdir(model_path):
+        return SavedModelBackend.name
+    extension = os.path.splitext(model_path)[1].lower()
+    return _BACKEND_BY_EXTENSION.get(extension, KerasBackend.name)
+
+
+def resolve_backend(model_path, backend=None):
+    """
+    Renvoie la classe du backend demandé, sans rien charger.
+
+    Args:
+        model_path: Chemin du fichier de modèle
+        backend: Nom du backend (voir BACKENDS), None = déduit de l'extension
+
+    Returns:
+        type: Classe du backend
+
+    Raises:
+        ValueError: Si le backend est inconnu
+    """
+    backend = backend or infer_backend_name(model_path)
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend inconnu : {backend} (disponibles : {', '.join(BACKENDS)})")
+    return BACKENDS[backend]
+
+
+def load_backend(model_path, backend=None, target_size=INPUT_SIZE, warmup=True, **options):
+    """
+    Charge un modèle avec le backend demandé.
+
+    Args:
+        model_path: Chemin du fichier de modèle
+        backend: Nom du backend (voir BACKENDS), None = déduit de l'extension
+        target_size: Tuple (hauteur, largeur) attendu par le modèle
+        warmup: Exécuter une première inférence avant de rendre la main
+        **options: Options propres au backend (num_threads, intra_op_threads, inter_op_threads)
+
+    Returns:
+        Backend chargé
+
+    Raises:
+        ValueError: Si le backend est inconnu
+    """
+    loaded = resolve_backend(model_path, backend).from_path(model_path, target_size=target_size, **options)
+    if warmup:
+        loaded.warmup()
+    return loaded
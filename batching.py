@@ -0,0 +1,159 @@
+"""
+Micro-Batching Dynamique
+========================
+Regroupe les demandes de prédiction concurrentes en micro-lots afin que le
+modèle soit appelé une fois par lot plutôt qu'une fois par image.
+
+Un lot part dès qu'il atteint `max_batch_size` images, ou au plus tard
+`max_wait_ms` millisecondes après l'arrivée de sa première image.
+
+Auteur: Groupe 8
+Projet: Deep Learning - Classification des maladies des feuilles de café
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from metrics import BATCH_SIZE, span
+
+
+class DynamicBatcher:
+    """
+    File d'attente partagée qui exécute `predict_fn` sur des micro-lots.
+
+    Exemple:
+        batcher = DynamicBatcher(classifier.predict_proba, max_batch_size=32, max_wait_ms=10)
+        batcher.start()
+        probabilities = batcher.submit(tensor).result()
+    """
+
+    def __init__(self, predict_fn, max_batch_size=32, max_wait_ms=10.0, threads=1):
+        """
+        Args:
+            predict_fn: Fonction (N, hauteur, largeur, 3) -> (N, nombre de classes)
+            max_batch_size: Nombre maximal d'images par passe du modèle
+            max_wait_ms: Attente maximale (ms) pour compléter un lot
+            threads: Lots traités simultanément (plus de 1 pour un `predict_fn`
+                qui répartit les lots entre plusieurs processus)
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size doit être supérieur ou égal à 1")
+
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.threads = threads
+        self._queue = queue.Queue()
+        self._threads = []
+        self._stopped = threading.Event()
+        # Rend submit et stop mutuellement exclusifs : aucune demande ne peut
+        # arriver après le signal d'arrêt
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Démarre les threads de traitement des lots (idempotent, y compris après stop)."""
+        with self._lock:
+            if self._stopped.is_set():
+                # Redémarrage : les anciens threads terminent la file, puis leur
+                # signal d'arrêt est retiré pour ne pas arrêter les nouveaux
+                for thread in self._threads:
+                    thread.join()
+                self._threads = []
+                self._drain_stop_signals()
+                self._stopped.clear()
+            if not any(thread.is_alive() for thread in self._threads):
+                self._threads = [
+                    threading.Thread(target=self._run, name=f"dynamic-batcher-{i}", daemon=True)
+                    for i in range(self.threads)
+                ]
+                for thread in self._threads:
+                    thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Arrête les threads après avoir traité les demandes déjà en file."""
+        with self._lock:
+            if not self._stopped.is_set():
+                self._stopped.set()
+                self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _drain_stop_signals(self):
+        """Retire les signaux d'arrêt restés en file (les threads arrêtés ont vidé les demandes)."""
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                return
+
+    def pending(self):
+        """Nombre approximatif d'images en attente dans la file."""
+        return self._queue.qsize()
+
+    def submit(self, tensor):
+        """
+        Ajoute une image prétraitée à la file.
+
+        Args:
+            tensor: numpy.ndarray de forme (hauteur, largeur, 3) ou (1, hauteur, largeur, 3)
+
+        Returns:
+            concurrent.futures.Future: Résolu avec le vecteur de probabilités de l'image
+        """
+        if tensor.ndim == 4:
+            tensor = tensor[0]
+        future = Future()
+        with self._lock:
+            if self._stopped.is_set():
+                raise RuntimeError("Le batcher est arrêté")
+            self._queue.put((tensor, future))
+        return future
+
+    def _collect(self, first):
+        """Complète un lot à partir de sa première demande."""
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Signal d'arrêt : on le remet pour la boucle principale
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        """Boucle principale : un appel du modèle par micro-lot."""
+        while True:
+            first = self._queue.get()
+            if first is None:
+                # Signal d'arrêt remis en file pour les autres threads ; les
+                # demandes restantes sont traitées avant de s'arrêter
+                stop = self._queue.empty()
+                self._queue.put(None)
+                if stop:
+                    return
+                continue
+
+            batch = self._collect(first)
+            futures = [future for _, future in batch]
+            BATCH_SIZE.observe(len(batch))
+            try:
+                with span("batch_inference"):
+                    probabilities = self.predict_fn(np.stack([tensor for tensor, _ in batch]))
+                for future, p in zip(futures, probabilities):
+                    future.set_result(p)
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
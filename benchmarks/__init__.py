@@ -0,0 +1 @@
+"""Benchmarks de performance du pipeline d'inférence (lancer avec `python -m benchmarks.<nom>`)."""
@@ -0,0 +1,140 @@
+"""
+Benchmark : parité et débit des backends d'inférence.
+
+Exécute les mêmes images sur plusieurs backends (keras, savedmodel, tflite,
+onnx), vérifie que leurs vecteurs de probabilités restent proches de la
+référence Keras, puis mesure le débit pour plusieurs tailles de lot.
+Le code de sortie est 1 si un backend dépasse la tolérance de parité.
+
+Avec --export-available, le modèle .keras est d'abord exporté dans un
+dossier temporaire vers chaque format dont le backend est disponible
+(SavedModel, TFLite float32, ONNX si tf2onnx et onnxruntime sont
+installés) : la parité se vérifie sans exports préalables. La suite de
+benchmarks (benchmarks/suite.py) lance ce contrôle à chaque `run`.
+
+Usage:
+    python -m benchmarks.bench_backends --export-available
+    python -m benchmarks.bench_backends \\
+        --model "mes models/MODELE_EXPERT_6CLASSES.keras" \\
+        --compare "mes models/MODELE_EXPERT_6CLASSES_savedmodel" "mes models/MODELE_EXPERT_6CLASSES.onnx" \\
+        --intra-op-threads 4 --inter-op-threads 1
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+
+from backends import infer_backend_name, load_backend
+from benchmarks.common import synthetic_images
+from evaluation import compare_backends, load_labeled_images
+from inference import CLASS_NAMES, MODEL_PATH
+from preprocessing import preprocess_batch
+
+# Écart maximal toléré par défaut sur les probabilités
+DEFAULT_TOLERANCE = 1e-3
+
+
+def export_available(model_path, directory):
+    """
+    Exporte un modèle .keras vers chaque format servi par un backend disponible.
+
+    Args:
+        model_path: Chemin du modèle .keras
+        directory: Dossier de sortie
+
+    Returns:
+        list: Chemins des modèles exportés (SavedModel, TFLite float32, ONNX
+        si tf2onnx et onnxruntime sont installés)
+    """
+    import tensorflow as tf
+
+    from export_onnx import export_onnx, export_savedmodel
+    from export_tflite import convert
+
+    model = tf.keras.models.load_model(model_path)
+    paths = [os.path.join(directory, "savedmodel"), os.path.join(directory, "float32.tflite")]
+    # Les convertisseurs écrivent sur la sortie standard, réservée au rapport JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        export_savedmodel(model, paths[0])
+        with open(paths[1], "wb") as f:
+            f.write(convert(model, "float32"))
+        if importlib.util.find_spec("tf2onnx") and importlib.util.find_spec("onnxruntime"):
+            paths.append(os.path.join(directory, "model.onnx"))
+            export_onnx(model, paths[-1])
+    return paths
+
+
+def parity_report(model_path, compare_paths, images, labels=None, batch_sizes=(1, 8, 32),
+                  tolerance=DEFAULT_TOLERANCE, **options):
+    """
+    Compare des modèles exportés à la référence Keras.
+
+    Args:
+        model_path: Modèle de référence (.keras)
+        compare_paths: Modèles exportés (.onnx, .tflite, dossier SavedModel)
+        images: Tenseur float32 (N, hauteur, largeur, 3)
+        labels: Index de classe attendus (None = pas de précision)
+        batch_sizes: Tailles de lot mesurées
+        tolerance: Écart maximal toléré sur les probabilités
+        **options: Options des backends (intra_op_threads, inter_op_threads, num_threads)
+
+    Returns:
+        dict: Résultats par taille de lot et backends hors tolérance (`parity_failures`)
+    """
+    backends = {"keras": load_backend(model_path, "keras", **options)}
+    for path in compare_paths:
+        backends[f"{infer_backend_name(path)}:{path}"] = load_backend(path, **options)
+
+    report = {"images": len(images), "tolerance": tolerance, "batch_sizes": {}}
+    for batch_size in batch_sizes:
+        report["batch_sizes"][batch_size] = compare_backends(backends, images, labels, "keras", batch_size)
+
+    report["parity_failures"] = sorted({
+        name
+        for results in report["batch_sizes"].values()
+        for name, metrics in results.items()
+        if metrics["max_abs_prob_diff"] > tolerance
+    })
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--model", default=MODEL_PATH, help="Modèle de référence (.keras)")
+    parser.add_argument("--compare", nargs="+", default=[], help="Modèles exportés à comparer (.onnx, .tflite, dossier SavedModel)")
+    parser.add_argument("--export-available", action="store_true",
+                        help="Exporter aussi le modèle vers chaque backend disponible (dossier temporaire)")
+    parser.add_argument("--eval-dir", default=None, help="Jeu étiqueté (sinon images synthétiques)")
+    parser.add_argument("--images", type=int, default=64, help="Nombre d'images synthétiques")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32], help="Tailles de lot mesurées")
+    parser.add_argument("--intra-op-threads", type=int, default=None, help="Threads intra-op (TF, ONNX Runtime)")
+    parser.add_argument("--inter-op-threads", type=int, default=None, help="Threads inter-op (TF, ONNX Runtime)")
+    parser.add_argument("--num-threads", type=int, default=None, help="Threads de l'interpréteur TFLite")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Écart maximal toléré sur les probabilités")
+    args = parser.parse_args(argv)
+
+    options = {
+        "intra_op_threads": args.intra_op_threads,
+        "inter_op_threads": args.inter_op_threads,
+        "num_threads": args.num_threads,
+    }
+    if args.eval_dir:
+        images, labels = load_labeled_images(args.eval_dir, CLASS_NAMES)
+    else:
+        images, labels = preprocess_batch(synthetic_images(args.images)), None
+
+    with tempfile.TemporaryDirectory() as directory:
+        compare_paths = list(args.compare)
+        if args.export_available:
+            compare_paths += export_available(args.model, directory)
+        report = parity_report(args.model, compare_paths, images, labels, args.batch_sizes, args.tolerance, **options)
+    print(json.dumps(report, indent=2))
+    return 1 if report["parity_failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""
+Benchmark : décodage pleine résolution vs décodage réduit des photos de terrain.
+
+Compare, pour une photo JPEG de téléphone (12 à 50 MP):
+    full    Image.open(...).convert('RGB') puis redimensionnement pour le modèle
+    draft   preprocessing.decode_upload (Image.draft + réductions + aperçu borné)
+
+Chaque variante tourne dans un processus séparé pour mesurer son pic RSS.
+
+Usage:
+    python -m benchmarks.bench_decode --megapixels 12 48
+"""
+
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import tempfile
+
+import numpy as np
+from PIL import Image
+
+from benchmarks.common import latency_summary, peak_rss_mb, time_calls
+from preprocessing import INPUT_SIZE, PREVIEW_SIZE, decode_upload, resize_to_array
+
+
+def make_jpeg(megapixels, seed=0):
+    """Encode une photo synthétique 4:3 de `megapixels` MP en JPEG."""
+    width = int((megapixels * 1e6 * 4 / 3) ** 0.5)
+    height = width * 3 // 4
+    rng = np.random.default_rng(seed)
+    # Image lisse (comme une photo) plutôt que du bruit, pour une taille JPEG réaliste
+    small = rng.integers(0, 256, (height // 64 + 1, width // 64 + 1, 3), dtype=np.uint8)
+    image = Image.fromarray(small).resize((width, height), Image.BILINEAR)
+    encoded = io.BytesIO()
+    image.save(encoded, format="JPEG", quality=90)
+    return encoded.getvalue()
+
+
+def _write_jpeg(megapixels, path):
+    with open(path, "wb") as f:
+        f.write(make_jpeg(megapixels))
+
+
+def decode_full(data):
+    image = Image.open(io.BytesIO(data)).convert('RGB')
+    preview = image
+    return resize_to_array(image, INPUT_SIZE), preview
+
+
+def decode_draft(data):
+    image, preview = decode_upload(data, INPUT_SIZE, PREVIEW_SIZE)
+    return resize_to_array(image, INPUT_SIZE), preview
+
+
+def _run_variant(name, path, repeats, results):
+    with open(path, "rb") as f:
+        data = f.read()
+    fn = decode_full if name == "full" else decode_draft
+    summary = latency_summary(time_calls(lambda: fn(data), repeats, warmup=1))
+    summary["peak_rss_mb"] = peak_rss_mb()
+    results[name] = summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--megapixels", type=float, nargs="+", default=[12, 48], help="Tailles des photos testées")
+    parser.add_argument("--repeats", type=int, default=5, help="Décodages mesurés par variante")
+    args = parser.parse_args(argv)
+
+    context = multiprocessing.get_context("spawn")
+    report = {}
+    with context.Manager() as manager, tempfile.TemporaryDirectory() as tmp:
+        for megapixels in args.megapixels:
+            # La photo est générée dans un processus à part : sous Linux, ru_maxrss
+            # survit à fork/exec, le parent doit donc rester petit
+            path = os.path.join(tmp, f"{megapixels:g}mp.jpg")
+            process = context.Process(target=_write_jpeg, args=(megapixels, path))
+            process.start()
+            process.join()
+            results = manager.dict()
+            for name in ("full", "draft"):
+                process = context.Process(target=_run_variant, args=(name, path, args.repeats, results))
+                process.start()
+                process.join()
+            report[f"{megapixels:g}MP"] = {"jpeg_bytes": os.path.getsize(path), **dict(results)}
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
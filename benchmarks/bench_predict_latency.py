@@ -0,0 +1,41 @@
+"""
+Benchmark : latence unitaire `model.predict` vs fonction TensorFlow compilée.
+
+Compare, pour une image prétraitée (lot de 1), l'ancien chemin
+`model.predict(processed_image, verbose=0)` et la fonction à signature fixe
+construite par `CoffeeLeafClassifier` au chargement.
+
+Usage:
+    python -m benchmarks.bench_predict_latency --repeats 200
+"""
+
+import argparse
+import json
+
+from benchmarks.common import latency_summary, synthetic_images, time_calls
+from inference import MODEL_PATH, CoffeeLeafClassifier
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--model", default=MODEL_PATH, help="Chemin du modèle .keras")
+    parser.add_argument("--repeats", type=int, default=200, help="Nombre d'appels mesurés par variante")
+    args = parser.parse_args(argv)
+
+    classifier = CoffeeLeafClassifier.from_path(args.model)
+    batch = classifier.preprocess(synthetic_images(1)[0])
+
+    keras_predict = time_calls(lambda: classifier.model.predict(batch, verbose=0), args.repeats)
+    compiled = time_calls(lambda: classifier.predict_proba(batch), args.repeats)
+
+    report = {
+        "model.predict": latency_summary(keras_predict),
+        "tf.function": latency_summary(compiled),
+    }
+    report["speedup_p50"] = report["model.predict"]["p50_ms"] / report["tf.function"]["p50_ms"]
+    report["speedup_p99"] = report["model.predict"]["p99_ms"] / report["tf.function"]["p99_ms"]
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
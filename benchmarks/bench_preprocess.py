@@ -0,0 +1,77 @@
+"""
+Benchmark : prétraitement historique vs tampon de lot préalloué.
+
+Variantes mesurées (par lot d'images, en millisecondes):
+    legacy          resize -> img_to_array -> / 255.0 -> expand_dims -> concatenate
+    buffer          preprocess_batch dans un tampon float32 réutilisé
+    decode+legacy   décodage JPEG pleine résolution + legacy
+    decode+draft    décodage JPEG réduit (Image.draft) + buffer
+
+Usage:
+    python -m benchmarks.bench_preprocess --batch-size 32 --size 4000x3000
+"""
+
+import argparse
+import io
+import json
+
+import numpy as np
+from PIL import Image
+
+from benchmarks.common import latency_summary, synthetic_images, time_calls
+from preprocessing import INPUT_SIZE, allocate_batch, open_image, preprocess_batch
+
+
+def legacy_preprocess(image, target_size=INPUT_SIZE):
+    """Reproduction de l'ancien preprocess_image de app.py."""
+    from tensorflow.keras.preprocessing.image import img_to_array
+
+    img = image.resize(target_size)
+    img_array = img_to_array(img)
+    img_array = img_array / 255.0
+    return np.expand_dims(img_array, axis=0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--batch-size", type=int, default=32, help="Images par lot")
+    parser.add_argument("--size", default="1600x1200", help="Taille des images synthétiques (LARGEURxHAUTEUR)")
+    parser.add_argument("--repeats", type=int, default=10, help="Nombre de lots mesurés par variante")
+    args = parser.parse_args(argv)
+
+    width, height = (int(v) for v in args.size.split("x"))
+    images = synthetic_images(args.batch_size, (width, height))
+    jpegs = []
+    for image in images:
+        encoded = io.BytesIO()
+        image.save(encoded, format="JPEG", quality=90)
+        jpegs.append(encoded.getvalue())
+
+    buffer = allocate_batch(args.batch_size)
+
+    # Vérification de parité avant de mesurer
+    legacy = np.concatenate([legacy_preprocess(image) for image in images], axis=0)
+    max_abs_diff = float(np.max(np.abs(legacy - preprocess_batch(images, out=buffer))))
+
+    variants = {
+        "legacy": lambda: np.concatenate([legacy_preprocess(image) for image in images], axis=0),
+        "buffer": lambda: preprocess_batch(images, out=buffer),
+        "decode+legacy": lambda: np.concatenate(
+            [legacy_preprocess(Image.open(io.BytesIO(data)).convert("RGB")) for data in jpegs], axis=0
+        ),
+        "decode+draft": lambda: preprocess_batch(
+            [open_image(data, INPUT_SIZE) for data in jpegs], out=buffer
+        ),
+    }
+    report = {
+        "batch_size": args.batch_size,
+        "image_size": [width, height],
+        "max_abs_diff_legacy_vs_buffer": max_abs_diff,
+    }
+    for name, fn in variants.items():
+        report[name] = latency_summary(time_calls(fn, args.repeats, warmup=1))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
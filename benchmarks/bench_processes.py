@@ -0,0 +1,94 @@
+"""
+Benchmark : passage à l'échelle de l'inférence multi-processus.
+
+Pour chaque nombre de processus, démarre un ProcessInferencePool, envoie des
+lots de pixels uint8 par la mémoire partagée (tous les créneaux en vol) et
+mesure le débit (img/s) ainsi que l'accélération par rapport au premier
+nombre de processus mesuré. `0` mesure l'inférence dans le processus du
+benchmark (normalisation + predict_proba), comme score_bulk sans --processes.
+
+Usage:
+    python -m benchmarks.bench_processes --workers 0 1 2 4 8 --cpu-affinity auto --batches 64
+"""
+
+import argparse
+import json
+import time
+from collections import deque
+
+import numpy as np
+
+from benchmarks.common import synthetic_images
+from inference import MODEL_PATH, CoffeeLeafClassifier
+from preprocessing import INPUT_SIZE, allocate_batch, normalize_into, resize_to_array
+from process_pool import ProcessInferencePool
+
+
+def pixel_batch(batch_size, target_size=INPUT_SIZE):
+    """Lot de pixels uint8 redimensionnés à partir d'images synthétiques."""
+    images = synthetic_images(8)
+    return np.stack([resize_to_array(images[i % len(images)], target_size) for i in range(batch_size)])
+
+
+def measure_in_process(model_path, pixels, batches):
+    """Débit de référence : normalisation et passes dans le processus courant."""
+    start = time.perf_counter()
+    classifier = CoffeeLeafClassifier.from_path(model_path, warmup_batch_sizes=(len(pixels),))
+    load_s = time.perf_counter() - start
+    buffer = allocate_batch(len(pixels), classifier.target_size)
+
+    start = time.perf_counter()
+    for _ in range(batches):
+        classifier.predict_proba(normalize_into(pixels, buffer))
+    elapsed = time.perf_counter() - start
+    return load_s, elapsed
+
+
+def measure_pool(model_path, workers, pixels, batches, cpu_affinity):
+    """Débit d'un pool de `workers` processus, tous les créneaux en vol."""
+    start = time.perf_counter()
+    with ProcessInferencePool(model_path, workers, len(pixels), cpu_affinity) as pool:
+        load_s = time.perf_counter() - start
+        # Un lot par processus pour amorcer les passes avant la mesure
+        for future in [pool.submit(pixels) for _ in range(workers)]:
+            future.result()
+
+        in_flight = deque()
+        start = time.perf_counter()
+        for _ in range(batches):
+            if len(in_flight) >= pool.slots:
+                in_flight.popleft().result()
+            in_flight.append(pool.submit(pixels))
+        while in_flight:
+            in_flight.popleft().result()
+        elapsed = time.perf_counter() - start
+    return load_s, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--model", default=MODEL_PATH, help="Chemin du modèle")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Nombres de processus mesurés (0 = sans pool)")
+    parser.add_argument("--batch-size", type=int, default=32, help="Images par lot")
+    parser.add_argument("--batches", type=int, default=32, help="Lots chronométrés par configuration")
+    parser.add_argument("--cpu-affinity", choices=["auto"], default=None, help="Épingler chaque processus sur une tranche des cœurs")
+    args = parser.parse_args(argv)
+
+    pixels = pixel_batch(args.batch_size)
+    report = {"model": args.model, "batch_size": args.batch_size, "batches": args.batches,
+              "cpu_affinity": args.cpu_affinity, "workers": {}}
+    baseline = None
+    for workers in args.workers:
+        if workers:
+            load_s, elapsed = measure_pool(args.model, workers, pixels, args.batches, args.cpu_affinity)
+        else:
+            load_s, elapsed = measure_in_process(args.model, pixels, args.batches)
+        img_s = args.batches * args.batch_size / elapsed
+        baseline = baseline or img_s
+        report["workers"][workers] = {"load_s": load_s, "img_s": img_s, "speedup": img_s / baseline}
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark : latence des réexécutions Streamlit après une analyse.
+
+Pilote l'application avec streamlit.testing (même processus) : téléchargement
+d'une image, clic sur « Analyser », puis réexécutions sans nouvelle action
+(comme après un clic sur un expander ou un widget de la barre latérale), puis
+un nouveau clic sur « Analyser » avec les mêmes réglages.
+Pour chaque phase, mesure la durée de l'exécution du script et les étapes
+recalculées (compteurs `coffee_stage_seconds_count` par étape), et indique
+si le diagnostic reste affiché après la réexécution.
+
+Usage:
+    python -m benchmarks.bench_rerun --image feuille.jpg --reruns 20
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+
+from benchmarks.common import latency_summary
+from metrics import REGISTRY
+
+# Application pilotée (racine du dépôt)
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+_STAGE_COUNT = re.compile(r'^coffee_stage_seconds_count\{stage="([^"]+)"\} (\d+)$', re.MULTILINE)
+
+
+def stage_counts():
+    """Nombre d'exécutions de chaque étape depuis le démarrage du processus."""
+    return {stage: int(count) for stage, count in _STAGE_COUNT.findall(REGISTRY.render())}
+
+
+def timed_run(at):
+    """
+    Exécute le script une fois.
+
+    Returns:
+        tuple: (durée en ms, étapes exécutées pendant le script -> nombre)
+    """
+    before = stage_counts()
+    start = time.perf_counter()
+    at.run()
+    elapsed_ms = (time.perf_counter() - start) * 1000.0
+    after = stage_counts()
+    stages = {stage: count - before.get(stage, 0) for stage, count in after.items() if count != before.get(stage, 0)}
+    return elapsed_ms, stages
+
+
+def results_shown(at):
+    """Indique si le diagnostic (bloc « Recommandations d'Actions ») est affiché."""
+    return any("Recommandations d'Actions" in markdown.value for markdown in at.markdown)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--image", required=True, help="Photo de feuille téléchargée dans l'application")
+    parser.add_argument("--reruns", type=int, default=20, help="Réexécutions chronométrées après l'analyse")
+    parser.add_argument("--app", default=APP_PATH, help="Script Streamlit piloté")
+    args = parser.parse_args(argv)
+
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(args.app, default_timeout=300)
+    first_ms, _ = timed_run(at)
+
+    with open(args.image, "rb") as f:
+        at.file_uploader[0].set_value((os.path.basename(args.image), f.read(), "image/jpeg"))
+    upload_ms, upload_stages = timed_run(at)
+
+    analyze_button = next(button for button in at.button if "Analyser" in button.label)
+    analyze_button.click()
+    analyze_ms, analyze_stages = timed_run(at)
+
+    durations, stages = [], {}
+    for _ in range(args.reruns):
+        elapsed_ms, run_stages = timed_run(at)
+        durations.append(elapsed_ms)
+        for stage, count in run_stages.items():
+            stages[stage] = stages.get(stage, 0) + count
+    shown = results_shown(at)
+
+    # Nouveau clic sur « Analyser » avec les mêmes réglages
+    next(button for button in at.button if "Analyser" in button.label).click()
+    reanalyze_ms, reanalyze_stages = timed_run(at)
+
+    report = {
+        "first_run_ms": first_ms,
+        "upload": {"ms": upload_ms, "stages": upload_stages},
+        "analyze": {"ms": analyze_ms, "stages": analyze_stages},
+        "reanalyze": {"ms": reanalyze_ms, "stages": reanalyze_stages},
+        "rerun": {**latency_summary(durations), "stages_per_rerun": {s: c / args.reruns for s, c in stages.items()}},
+        "results_shown_after_rerun": shown,
+        "exceptions": [exception.value for exception in at.exception],
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
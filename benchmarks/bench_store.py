@@ -0,0 +1,84 @@
+"""
+Benchmark : réanalyse depuis les JPEG vs depuis un magasin de tenseurs.
+
+Écrit une archive de photos JPEG synthétiques, la décode une fois en
+remplissant un magasin de tenseurs (voir tensor_store.py), puis mesure le
+débit (img/s) de la préparation des lots du modèle (pixels normalisés
+float32, sans la passe du modèle) :
+    jpeg    iter_decoded sur les fichiers (décodage + redimensionnement)
+    store   lecture du magasin par projection mémoire
+
+Usage:
+    python -m benchmarks.bench_store --images 512 --megapixels 3 --decode-threads 8
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.bench_decode import make_jpeg
+from preprocessing import INPUT_SIZE, allocate_batch, normalize_into
+from score_bulk import iter_decoded, iter_sources, save_decoded
+from tensor_store import TensorStore
+
+
+def fill_batches(decoded, batch_size):
+    """Normalise un flux (nom, pixels, erreur) dans un tampon de lot ; renvoie le nombre d'images."""
+    buffer = allocate_batch(batch_size, INPUT_SIZE)
+    count = 0
+    for _, pixels, error in decoded:
+        if error is None:
+            normalize_into(pixels, buffer[count % batch_size])
+            count += 1
+    return count
+
+
+def measure(fn):
+    start = time.perf_counter()
+    count = fn()
+    elapsed = time.perf_counter() - start
+    return {"images": count, "s": elapsed, "img_s": count / elapsed}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--images", type=int, default=256, help="Photos de l'archive synthétique")
+    parser.add_argument("--megapixels", type=float, default=3.0, help="Taille des photos (MP)")
+    parser.add_argument("--batch-size", type=int, default=32, help="Images par lot")
+    parser.add_argument("--decode-threads", type=int, default=4, help="Threads de décodage JPEG")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        photos = os.path.join(directory, "photos")
+        os.makedirs(photos)
+        # Quelques photos distinctes recopiées : le coût de décodage est le même
+        samples = [make_jpeg(args.megapixels, seed) for seed in range(8)]
+        for i in range(args.images):
+            with open(os.path.join(photos, f"{i:05d}.jpg"), "wb") as f:
+                f.write(samples[i % len(samples)])
+
+        def decoded():
+            return iter_decoded(iter_sources(photos), INPUT_SIZE, args.decode_threads)
+
+        store_path = os.path.join(directory, "magasin")
+        with TensorStore(store_path, mode="a") as store:
+            build = measure(lambda: fill_batches(save_decoded(decoded(), store), args.batch_size))
+        jpeg = measure(lambda: fill_batches(decoded(), args.batch_size))
+        buffer = allocate_batch(args.batch_size, INPUT_SIZE)
+        with TensorStore(store_path) as store:
+            from_store = measure(lambda: sum(
+                len(normalize_into(pixels, buffer[:len(names)])) for names, pixels in store.batches(args.batch_size)
+            ))
+
+        report = {
+            "images": args.images, "megapixels": args.megapixels, "decode_threads": args.decode_threads,
+            "build_store": build, "jpeg": jpeg, "store": from_store,
+            "speedup": from_store["img_s"] / jpeg["img_s"],
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark : coût en latence et gain de calibration de la TTA.
+
+Pour chaque nombre de vues, mesure la latence d'une prédiction (construction
+des vues + une passe du modèle) et, sur un jeu étiqueté, la précision et la
+calibration (NLL, Brier, ECE) des probabilités moyennées. Chaque ligne
+indique aussi l'écart par rapport à la prédiction sans TTA.
+
+Usage:
+    python -m benchmarks.bench_tta --eval-dir held_out/ --views 1 2 4 8 11
+"""
+
+import argparse
+import json
+
+import numpy as np
+
+from benchmarks.common import latency_summary, synthetic_images, time_calls
+from evaluation import calibration_metrics, list_labeled_files
+from inference import CLASS_NAMES, MODEL_PATH, CoffeeLeafClassifier
+from preprocessing import allocate_batch, open_image
+from tta import available_views, predict_proba_tta
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--model", default=MODEL_PATH, help="Chemin du modèle")
+    parser.add_argument("--eval-dir", default=None, help="Jeu étiqueté (sinon latence seule, images synthétiques)")
+    parser.add_argument("--views", type=int, nargs="+", default=[1, 2, 4, 8], help="Nombres de vues mesurés")
+    parser.add_argument("--repeats", type=int, default=30, help="Prédictions chronométrées par nombre de vues")
+    args = parser.parse_args(argv)
+
+    classifier = CoffeeLeafClassifier.from_path(args.model)
+    max_views = len(available_views(classifier.target_size))
+    if max(args.views) > max_views:
+        parser.error(f"au plus {max_views} vues pour ce modèle")
+
+    labels = None
+    if args.eval_dir:
+        paths, labels = list_labeled_files(args.eval_dir, CLASS_NAMES)
+        images = [open_image(path) for path in paths]
+    else:
+        images = synthetic_images(8)
+
+    buffer = allocate_batch(max(args.views), classifier.target_size)
+    report = {"model": args.model, "images": len(images), "views": {}}
+    baseline = None
+    for n_views in args.views:
+        durations = time_calls(lambda: predict_proba_tta(classifier, images[0], n_views, buffer), args.repeats)
+        entry = latency_summary(durations)
+        if labels is not None:
+            probabilities = np.stack([predict_proba_tta(classifier, image, n_views, buffer) for image in images])
+            entry.update(calibration_metrics(probabilities, labels))
+
+        if baseline is None:
+            baseline = entry
+        entry["latency_cost_ms"] = entry["p50_ms"] - baseline["p50_ms"]
+        for metric in ("accuracy", "nll", "brier", "ece"):
+            if metric in entry:
+                entry[f"{metric}_delta"] = entry[metric] - baseline[metric]
+        report["views"][n_views] = entry
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
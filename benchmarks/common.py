@@ -0,0 +1,84 @@
+"""
+Outils communs aux benchmarks : chronométrage, percentiles et images synthétiques.
+"""
+
+import time
+
+import numpy as np
+from PIL import Image
+
+
+def synthetic_images(count, size=(640, 480), seed=0):
+    """
+    Génère des images PIL aléatoires reproductibles.
+
+    Args:
+        count: Nombre d'images
+        size: Tuple (largeur, hauteur) des images
+        seed: Graine du générateur aléatoire
+
+    Returns:
+        list: Images PIL RGB
+    """
+    rng = np.random.default_rng(seed)
+    width, height = size
+    return [
+        Image.fromarray(rng.integers(0, 256, (height, width, 3), dtype=np.uint8))
+        for _ in range(count)
+    ]
+
+
+def time_calls(fn, repeats, warmup=3):
+    """
+    Chronomètre des appels successifs à `fn`.
+
+    Args:
+        fn: Fonction sans argument à mesurer
+        repeats: Nombre d'appels mesurés
+        warmup: Nombre d'appels de chauffe non mesurés
+
+    Returns:
+        numpy.ndarray: Durées en millisecondes
+    """
+    for _ in range(warmup):
+        fn()
+    durations = np.empty(repeats, dtype=np.float64)
+    for i in range(repeats):
+        start = time.perf_counter()
+        fn()
+        durations[i] = (time.perf_counter() - start) * 1000.0
+    return durations
+
+
+def latency_summary(durations_ms):
+    """
+    Résume une série de durées.
+
+    Args:
+        durations_ms: Durées en millisecondes
+
+    Returns:
+        dict: Moyenne et percentiles p50/p95/p99 en millisecondes
+    """
+    p50, p95, p99 = np.percentile(durations_ms, [50, 95, 99])
+    return {
+        "mean_ms": float(np.mean(durations_ms)),
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+    }
+
+
+def peak_rss_mb():
+    """
+    Pic de mémoire résidente (RSS) du processus courant.
+
+    Returns:
+        float: Pic RSS en mégaoctets (Linux/macOS)
+    """
+    import resource
+    import sys
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss est en octets sous macOS, en kilooctets sous Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
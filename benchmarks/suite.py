@@ -0,0 +1,321 @@
+"""
+Suite de benchmarks : latence, débit, mémoire et chargement du modèle.
+
+Mesure, pour chaque nombre de threads demandé (un processus neuf par
+configuration, pour un pic RSS et un temps de chargement propres) :
+    load        Chargement du modèle (import, désérialisation, warmup)
+    preprocess  preprocess_image sur images synthétiques et réelles
+    predict     Diagnostic complet d'une image (prétraitement + passe + interprétation,
+                le chemin de predict_disease sans le cache)
+    forward     Passe du modèle seule, pour chaque taille de lot
+avec le débit (img/s), les latences p50/p95/p99 et le pic RSS, en JSON.
+
+Chaque `run` d'un modèle .keras vérifie aussi la parité numérique des
+backends (voir bench_backends.py) : le modèle est exporté vers chaque
+backend disponible et leurs probabilités sont comparées à celles de Keras.
+Un backend hors tolérance fait échouer la commande (code 1).
+
+Le mode `compare` confronte deux rapports et échoue (code 1) si une métrique
+se dégrade au-delà du seuil : latences, durées et mémoire ne doivent pas
+augmenter, les débits ne doivent pas baisser.
+
+Usage:
+    python -m benchmarks.suite run --threads 1 4 --batch-sizes 1 8 32 --output baseline.json
+    python -m benchmarks.suite run --images-dir held_out/ --output current.json --compare-to baseline.json
+    python -m benchmarks.suite compare baseline.json current.json --threshold 0.10
+"""
+
+import argparse
+import fnmatch
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from backends import KerasBackend, infer_backend_name
+from benchmarks.common import latency_summary, peak_rss_mb, synthetic_images, time_calls
+from evaluation import list_image_files
+from inference import MODEL_PATH, preprocess_image
+
+# Seuil de régression par défaut (10 %)
+DEFAULT_THRESHOLD = 0.10
+
+
+def _throughput(summary, images_per_call=1):
+    """Ajoute le débit (img/s) à un résumé de latences."""
+    summary["img_s"] = images_per_call * 1000.0 / summary["mean_ms"]
+    return summary
+
+
+def _cycle(items):
+    """Renvoie une fonction qui parcourt `items` en boucle, un élément par appel."""
+    state = {"i": -1}
+
+    def next_item():
+        state["i"] = (state["i"] + 1) % len(items)
+        return items[state["i"]]
+    return next_item
+
+
+def run_config(model_path, threads, batch_sizes, images_dir, repeats):
+    """
+    Mesure une configuration dans le processus courant (voir main).
+
+    Args:
+        model_path: Chemin du modèle
+        threads: Nombre de threads d'inférence (None = valeur par défaut du backend)
+        batch_sizes: Tailles de lot de la passe avant
+        images_dir: Dossier d'images réelles (None = synthétiques seules)
+        repeats: Appels mesurés par métrique
+
+    Returns:
+        dict: Métriques de la configuration
+    """
+    from inference import CoffeeLeafClassifier
+    from preprocessing import open_image
+
+    start = time.perf_counter()
+    classifier = CoffeeLeafClassifier.from_path(
+        model_path, intra_op_threads=threads, num_threads=threads
+    )
+    result = {"load_s": time.perf_counter() - start, "load": dict(classifier.startup_timings)}
+
+    sources = {"synthetic": synthetic_images(8)}
+    if images_dir:
+        real = []
+        for path in list_image_files(images_dir)[:32]:
+            try:
+                real.append(open_image(path))
+            except OSError:
+                # Photo illisible : ignorée
+                continue
+        if real:
+            sources["real"] = real
+
+    result["preprocess"] = {}
+    result["predict"] = {}
+    for source, images in sources.items():
+        next_image = _cycle(images)
+        result["preprocess"][source] = _throughput(latency_summary(
+            time_calls(lambda: preprocess_image(next_image(), classifier.target_size), repeats)
+        ))
+        result["predict"][source] = _throughput(latency_summary(
+            time_calls(lambda: classifier.predict(next_image()), repeats)
+        ))
+
+    result["forward"] = {}
+    images = sources["synthetic"]
+    for batch_size in batch_sizes:
+        batch = classifier.preprocess_batch([images[i % len(images)] for i in range(batch_size)])
+        result["forward"][f"batch_{batch_size}"] = _throughput(latency_summary(
+            time_calls(lambda: classifier.predict_proba(batch), repeats)
+        ), batch_size)
+
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def run_parity(model_path, tolerance):
+    """
+    Vérifie la parité des backends sur des exports temporaires du modèle (voir bench_backends).
+
+    Args:
+        model_path: Chemin du modèle .keras
+        tolerance: Écart maximal toléré sur les probabilités
+
+    Returns:
+        dict: Rapport de parité (backends hors tolérance dans `parity_failures`)
+    """
+    from benchmarks.bench_backends import export_available, parity_report
+    from preprocessing import preprocess_batch
+
+    images = preprocess_batch(synthetic_images(16))
+    with tempfile.TemporaryDirectory() as directory:
+        return parity_report(model_path, export_available(model_path, directory), images,
+                             batch_sizes=(1, 8), tolerance=tolerance)
+
+
+def _metadata(model_path):
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "model": model_path,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def flatten_metrics(report, prefix=""):
+    """
+    Aplatit les métriques numériques d'un rapport ('threads_4/forward/batch_8/p50_ms' -> valeur).
+
+    Args:
+        report: Rapport JSON (ou une de ses sections)
+        prefix: Préfixe du chemin courant
+
+    Returns:
+        dict: Chemin de la métrique -> valeur
+    """
+    metrics = {}
+    for key, value in report.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            metrics.update(flatten_metrics(value, path + "/"))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            metrics[path] = float(value)
+    return metrics
+
+
+def metric_direction(path):
+    """
+    Sens d'amélioration d'une métrique.
+
+    Args:
+        path: Chemin de la métrique
+
+    Returns:
+        int: +1 si plus haut = mieux (débit), -1 si plus bas = mieux (latence,
+        durée, mémoire), 0 si la métrique n'est pas comparée
+    """
+    if path.endswith("img_s"):
+        return 1
+    if path.endswith(("_ms", "_s", "_mb")):
+        return -1
+    return 0
+
+
+def compare_reports(baseline, current, threshold=DEFAULT_THRESHOLD, metric_thresholds=None):
+    """
+    Compare deux rapports de la suite.
+
+    Args:
+        baseline: Rapport de référence
+        current: Nouveau rapport
+        threshold: Dégradation relative tolérée (0.10 = 10 %)
+        metric_thresholds: dict motif fnmatch -> seuil propre (par ex. {'*p99_ms': 0.3})
+
+    Returns:
+        dict: Régressions, améliorations et métriques absentes d'un des rapports
+    """
+    old = flatten_metrics(baseline["results"])
+    new = flatten_metrics(current["results"])
+    regressions, improvements = [], []
+    for path in sorted(old.keys() & new.keys()):
+        direction = metric_direction(path)
+        if not direction or old[path] == 0:
+            continue
+        limit = threshold
+        for pattern, value in (metric_thresholds or {}).items():
+            if fnmatch.fnmatch(path, pattern):
+                limit = value
+        # Variation relative orientée : positive = dégradation
+        change = (old[path] - new[path]) / old[path] * direction
+        entry = {"metric": path, "baseline": old[path], "current": new[path], "change": change, "threshold": limit}
+        if change > limit:
+            regressions.append(entry)
+        elif change < -limit:
+            improvements.append(entry)
+    return {
+        "baseline_commit": baseline.get("meta", {}).get("commit"),
+        "current_commit": current.get("meta", {}).get("commit"),
+        "regressions": regressions,
+        "improvements": improvements,
+        "missing": sorted(old.keys() ^ new.keys()),
+    }
+
+
+def _parse_metric_thresholds(values):
+    thresholds = {}
+    for value in values or []:
+        pattern, _, limit = value.rpartition("=")
+        thresholds[pattern] = float(limit)
+    return thresholds
+
+
+def _load(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _print_comparison(comparison):
+    print(json.dumps(comparison, indent=2))
+    for entry in comparison["regressions"]:
+        print(f"❌ {entry['metric']} : {entry['baseline']:.4g} -> {entry['current']:.4g} "
+              f"({entry['change'] * 100:+.1f} % de dégradation, seuil {entry['threshold'] * 100:.0f} %)",
+              file=sys.stderr)
+    return 1 if comparison["regressions"] else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run = subparsers.add_parser("run", help="Mesurer et écrire un rapport JSON")
+    run.add_argument("--model", default=MODEL_PATH, help="Chemin du modèle")
+    run.add_argument("--threads", type=int, nargs="+", default=[None], help="Nombres de threads d'inférence balayés")
+    run.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32], help="Tailles de lot de la passe avant")
+    run.add_argument("--images-dir", default=None, help="Photos réelles de feuilles (récursif)")
+    run.add_argument("--repeats", type=int, default=50, help="Appels mesurés par métrique")
+    run.add_argument("--output", default=None, help="Fichier JSON du rapport (sinon sortie standard)")
+    run.add_argument("--compare-to", default=None, help="Rapport de référence à comparer après la mesure")
+    run.add_argument("--parity-tolerance", type=float, default=1e-3, help="Écart de probabilités toléré entre backends")
+    run.add_argument("--skip-parity", action="store_true", help="Ne pas vérifier la parité des backends")
+
+    compare = subparsers.add_parser("compare", help="Comparer deux rapports")
+    compare.add_argument("baseline", help="Rapport de référence")
+    compare.add_argument("current", help="Nouveau rapport")
+
+    for sub in (run, compare):
+        sub.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Dégradation relative tolérée")
+        sub.add_argument("--metric-threshold", action="append", metavar="MOTIF=SEUIL",
+                         help="Seuil propre aux métriques correspondant au motif (par ex. '*p99_ms=0.3')")
+    args = parser.parse_args(argv)
+    metric_thresholds = _parse_metric_thresholds(args.metric_threshold)
+
+    if args.command == "compare":
+        return _print_comparison(compare_reports(_load(args.baseline), _load(args.current), args.threshold, metric_thresholds))
+
+    # Un processus neuf par configuration : threads TensorFlow, pic RSS et temps de chargement indépendants
+    context = multiprocessing.get_context("spawn")
+    report = {"meta": _metadata(args.model), "results": {}}
+    for threads in args.threads:
+        with context.Pool(processes=1, maxtasksperchild=1) as pool:
+            result = pool.apply(run_config, (args.model, threads, args.batch_sizes, args.images_dir, args.repeats))
+        report["results"][f"threads_{threads or 'default'}"] = result
+
+    # Hors de "results" : la parité n'est pas une métrique comparée entre rapports
+    if not args.skip_parity and infer_backend_name(args.model) == KerasBackend.name:
+        with context.Pool(processes=1, maxtasksperchild=1) as pool:
+            report["parity"] = pool.apply(run_parity, (args.model, args.parity_tolerance))
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    status = 0
+    for name in report.get("parity", {}).get("parity_failures", []):
+        print(f"❌ Parité : {name} au-delà de {args.parity_tolerance:g} par rapport à Keras", file=sys.stderr)
+        status = 1
+    if args.compare_to:
+        status = max(status, _print_comparison(compare_reports(_load(args.compare_to), report, args.threshold,
+                                                               metric_thresholds)))
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
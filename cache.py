@@ -0,0 +1,194 @@
+"""
+Cache des Prédictions
+=====================
+Cache LRU des vecteurs de probabilités, indexé par l'empreinte du contenu de
+l'image et l'empreinte du fichier du modèle. Une même photo analysée deux
+fois (nouveau téléchargement, rerun Streamlit) ne repasse pas par TensorFlow.
+
+Une base SQLite optionnelle conserve les résultats entre deux redémarrages.
+
+Auteur: Groupe 8
+Projet: Deep Learning - Classification des maladies des feuilles de café
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from metrics import CACHE_LOOKUPS
+
+# Taille des blocs lus pour calculer l'empreinte d'un fichier
+_CHUNK_SIZE = 1024 * 1024
+
+
+def file_fingerprint(path):
+    """
+    Calcule l'empreinte SHA-256 du contenu d'un fichier (modèle, image...).
+
+    Pour un dossier (SavedModel), l'empreinte couvre le chemin relatif et
+    le contenu de tous ses fichiers.
+
+    Args:
+        path: Chemin du fichier ou du dossier
+
+    Returns:
+        str: Empreinte hexadécimale
+    """
+    digest = hashlib.sha256()
+    if os.path.isdir(path):
+        files = sorted(
+            os.path.join(root, file_name)
+            for root, _, file_names in os.walk(path)
+            for file_name in file_names
+        )
+    else:
+        files = [path]
+
+    for file_path in files:
+        if file_path != path:
+            digest.update(os.path.relpath(file_path, path).encode("utf-8"))
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_digest(data):
+    """
+    Empreinte SHA-256 du contenu d'une image (partagée par les clés de plusieurs modèles).
+
+    Args:
+        data: Octets de l'image téléchargée
+
+    Returns:
+        str: Empreinte hexadécimale
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+class PredictionCache:
+    """
+    Cache LRU thread-safe de vecteurs de probabilités.
+
+    Exemple:
+        cache = PredictionCache(max_entries=256, db_path="predictions.sqlite")
+        probabilities = cache.get(key)
+        if probabilities is None:
+            probabilities = classifier.predict_proba(batch)[0]
+            cache.put(key, probabilities)
+    """
+
+    def __init__(self, max_entries=256, db_path=None):
+        """
+        Args:
+            max_entries: Nombre maximal d'entrées gardées en mémoire
+            db_path: Chemin d'une base SQLite persistante (None = mémoire seule)
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path is not None:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS predictions ("
+                "key TEXT PRIMARY KEY, probabilities BLOB NOT NULL, created REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def get(self, key):
+        """
+        Renvoie les probabilités en cache pour `key`, ou None.
+
+        Args:
+            key: Clé « empreinte du modèle:content_digest(image) » (voir app.model_cache_keys)
+
+        Returns:
+            numpy.ndarray ou None: Vecteur de probabilités
+        """
+        with self._lock:
+            probabilities = self._entries.get(key)
+            if probabilities is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                CACHE_LOOKUPS.inc(result="hit")
+                return probabilities
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT probabilities FROM predictions WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    probabilities = np.frombuffer(row[0], dtype=np.float32)
+                    self._remember(key, probabilities)
+                    self.hits += 1
+                    CACHE_LOOKUPS.inc(result="hit")
+                    return probabilities
+
+            self.misses += 1
+            CACHE_LOOKUPS.inc(result="miss")
+            return None
+
+    def put(self, key, probabilities):
+        """
+        Enregistre les probabilités associées à `key`.
+
+        Args:
+            key: Clé « empreinte du modèle:content_digest(image) » (voir app.model_cache_keys)
+            probabilities: Vecteur de probabilités des classes
+        """
+        probabilities = np.array(probabilities, dtype=np.float32)
+        probabilities.flags.writeable = False
+        with self._lock:
+            self._remember(key, probabilities)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO predictions (key, probabilities, created) VALUES (?, ?, ?)",
+                    (key, probabilities.tobytes(), time.time()),
+                )
+                self._db.commit()
+
+    def _remember(self, key, probabilities):
+        """Ajoute une entrée en mémoire et évince la moins récemment utilisée."""
+        self._entries[key] = probabilities
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        """
+        Renvoie les compteurs du cache.
+
+        Returns:
+            dict: hits, misses, entrées en mémoire et taux de succès
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def clear(self):
+        """Vide le cache mémoire et la base persistante."""
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM predictions")
+                self._db.commit()
+
+    def close(self):
+        """Ferme la base persistante."""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,230 @@
+"""
+Tableau de Bord d'un Lot - Feuilles de Café
+===========================================
+Synthèse d'une analyse par lot (une parcelle) calculée en une fois sur la
+matrice des probabilités (images x classes) au lieu d'un parcours des
+résultats image par image :
+- nombre de feuilles par classe prédite ;
+- répartition des feuilles rouillées par niveau de sévérité (1 à 4) et
+  sévérité attendue moyenne ;
+- feuilles à faible confiance, à revoir en priorité.
+
+Les résultats complets s'exportent en CSV (mêmes colonnes que score_bulk.py)
+ou en Parquet (pyarrow, optionnel), en une seule écriture en flux.
+
+Auteur: Groupe 8
+Projet: Deep Learning - Classification des maladies des feuilles de café
+"""
+
+import csv
+import io
+import os
+
+import numpy as np
+
+from inference import CLASS_NAMES
+from ood import OUT_OF_DISTRIBUTION
+from tiling import severity_weights
+
+# Confiance (%) en dessous de laquelle une feuille est signalée comme douteuse
+LOW_CONFIDENCE = float(os.environ.get("COFFEE_LOW_CONFIDENCE", "60"))
+
+# Message d'erreur exporté pour une image qui n'a pas pu être analysée
+ANALYSIS_ERROR = "Erreur d'analyse"
+
+# Formats d'export -> type MIME
+EXPORT_FORMATS = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+
+
+class BatchSummary:
+    """Synthèse vectorisée d'un lot : une ligne de probabilités par image."""
+
+    def __init__(self, file_names, probabilities, errors=None, class_names=CLASS_NAMES, low_confidence=LOW_CONFIDENCE):
+        """
+        Args:
+            file_names: Noms des images, dans l'ordre des lignes
+            probabilities: float32 (images, classes), NaN pour les images non classées
+            errors: Motif de non-classement par image (None pour une image classée)
+            class_names: Table des noms de classes
+            low_confidence: Seuil de confiance (%) des feuilles douteuses
+        """
+        self.file_names = list(file_names)
+        self.probabilities = np.asarray(probabilities, dtype=np.float32)
+        self.class_names = tuple(class_names)
+        self.errors = list(errors) if errors is not None else [None] * len(self.file_names)
+        self.low_confidence = low_confidence
+        # Exports déjà produits (format -> octets), réutilisés aux réexécutions
+        self._exports = {}
+
+        # Images classées (ni rejetées par le filtre, ni en erreur)
+        self.valid = ~np.isnan(self.probabilities).any(axis=1)
+        classes = np.full(len(self.file_names), -1, dtype=np.int64)
+        classes[self.valid] = self.probabilities[self.valid].argmax(axis=1)
+        self.classes = classes
+        # Confiance (%) de la classe prédite, NaN hors images classées
+        self.confidence = np.take_along_axis(self.probabilities, np.maximum(classes, 0)[:, None], axis=1)[:, 0] * 100
+        self.confidence[~self.valid] = np.nan
+        # Sévérité attendue de la rouille par image (0 à 4), comme pour les tuiles
+        self.weights = severity_weights(self.class_names)
+        self.severity = self.probabilities @ self.weights
+
+    @classmethod
+    def from_results(cls, file_names, results, class_names=CLASS_NAMES, **options):
+        """
+        Construit la synthèse à partir des tuples renvoyés par predict_diseases.
+
+        Args:
+            file_names: Noms des images
+            results: Tuples (statut_principal, pathologie_specifique, confiance, all_predictions, predicted_class_idx)
+            class_names: Table des noms de classes
+
+        Returns:
+            BatchSummary
+        """
+        probabilities = np.full((len(results), len(class_names)), np.nan, dtype=np.float32)
+        errors = []
+        for i, (statut_principal, _, _, all_predictions, _) in enumerate(results):
+            if all_predictions is not None:
+                probabilities[i] = all_predictions
+                errors.append(None)
+            else:
+                errors.append(OUT_OF_DISTRIBUTION if statut_principal == OUT_OF_DISTRIBUTION else ANALYSIS_ERROR)
+        return cls(file_names, probabilities, errors, class_names, **options)
+
+    @property
+    def scored_count(self):
+        return int(np.count_nonzero(self.valid))
+
+    def class_counts(self):
+        """Nombre de feuilles par classe prédite."""
+        counts = np.bincount(self.classes[self.valid], minlength=len(self.class_names))
+        return {name: int(count) for name, count in zip(self.class_names, counts)}
+
+    def severity_counts(self):
+        """Nombre de feuilles prédites à chaque niveau de rouille (1 à 4)."""
+        levels = self.weights[self.classes[self.valid]].astype(np.int64)
+        counts = np.bincount(levels, minlength=5)[1:5]
+        return {f"Niveau {level}": int(count) for level, count in enumerate(counts, start=1)}
+
+    def outliers(self, limit=None):
+        """
+        Feuilles classées dont la confiance est sous le seuil, les moins sûres en premier.
+
+        Args:
+            limit: Nombre maximal de feuilles renvoyées (None = toutes)
+
+        Returns:
+            numpy.ndarray: Index des images
+        """
+        doubtful = np.flatnonzero(self.valid & (self.confidence < self.low_confidence))
+        doubtful = doubtful[np.argsort(self.confidence[doubtful], kind="stable")]
+        return doubtful if limit is None else doubtful[:limit]
+
+    def summary(self):
+        """
+        Synthèse du lot.
+
+        Returns:
+            dict: Images analysées / classées / rejetées / en erreur, nombre de
+            feuilles par classe et par niveau de rouille, part de feuilles
+            malades, sévérité moyenne, confiance moyenne et nombre de feuilles douteuses
+        """
+        summary = {
+            "images": len(self.file_names),
+            "scored": self.scored_count,
+            "rejected": sum(error == OUT_OF_DISTRIBUTION for error in self.errors),
+            "failed": sum(error == ANALYSIS_ERROR for error in self.errors),
+        }
+        if not self.scored_count:
+            return summary
+
+        summary.update({
+            "class_counts": self.class_counts(),
+            "severity_counts": self.severity_counts(),
+            "diseased_fraction": float(np.mean(self.classes[self.valid] != 0)),
+            "mean_severity": float(self.severity[self.valid].mean()),
+            "mean_confidence": float(self.confidence[self.valid].mean()),
+            "low_confidence": int(len(self.outliers())),
+        })
+        return summary
+
+    @property
+    def fieldnames(self):
+        """Colonnes exportées (identiques à la sortie CSV de score_bulk.py)."""
+        return ["path", "predicted_class_idx", "class_name", "confidence", "error"] + [f"p_{name}" for name in self.class_names]
+
+    def _csv_rows(self):
+        """Lignes CSV générées à la volée à partir des colonnes."""
+        probabilities = self.probabilities.tolist()
+        for i, (name, idx, confidence, error) in enumerate(
+                zip(self.file_names, self.classes.tolist(), self.confidence.tolist(), self.errors)):
+            if error is not None:
+                yield [name, None, None, None, error] + [None] * len(self.class_names)
+            else:
+                yield [name, idx, self.class_names[idx], confidence, None] + probabilities[i]
+
+    def to_csv(self, stream):
+        """
+        Écrit tous les résultats en CSV, en une seule écriture en flux.
+
+        Args:
+            stream: Flux texte (ouvert avec newline='')
+        """
+        writer = csv.writer(stream)
+        writer.writerow(self.fieldnames)
+        writer.writerows(self._csv_rows())
+
+    def to_parquet(self, sink):
+        """
+        Écrit tous les résultats en Parquet (une colonne par champ, sans passer par des lignes).
+
+        Args:
+            sink: Chemin ou flux binaire
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("L'export Parquet nécessite pyarrow : pip install pyarrow") from e
+
+        invalid = ~self.valid
+        columns = [
+            pa.array(self.file_names, type=pa.string()),
+            pa.array(self.classes, mask=invalid),
+            pa.array([self.class_names[idx] if idx >= 0 else None for idx in self.classes.tolist()], type=pa.string()),
+            pa.array(self.confidence, mask=invalid),
+            pa.array(self.errors, type=pa.string()),
+        ]
+        columns += [pa.array(self.probabilities[:, c], mask=invalid) for c in range(len(self.class_names))]
+        pq.write_table(pa.Table.from_arrays(columns, names=self.fieldnames), sink)
+
+    def export(self, output_format="csv"):
+        """
+        Export complet en mémoire (pour un bouton de téléchargement), produit une seule fois par format.
+
+        Args:
+            output_format: 'csv' ou 'parquet'
+
+        Returns:
+            bytes: Contenu du fichier
+        """
+        if output_format not in self._exports:
+            buffer = io.BytesIO()
+            if output_format == "parquet":
+                self.to_parquet(buffer)
+            else:
+                text = io.TextIOWrapper(buffer, encoding="utf-8", newline="")
+                self.to_csv(text)
+                text.flush()
+                text.detach()
+            self._exports[output_format] = buffer.getvalue()
+        return self._exports[output_format]
+
+
+def parquet_available():
+    """Indique si l'export Parquet est possible (pyarrow installé)."""
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
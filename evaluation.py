@@ -0,0 +1,220 @@
+"""
+Évaluation des Backends - Feuilles de Café
+==========================================
+Chargement d'un jeu d'images étiquetées et comparaison de backends
+d'inférence (précision, accord avec la référence, écart des probabilités,
+latence).
+
+Structure attendue d'un jeu étiqueté : un sous-dossier par classe, nommé
+comme dans CLASS_NAMES (insensible à la casse, espaces ou '_') ou par son
+index :
+    held_out/Healthy/*.jpg
+    held_out/Rust_Level_1/*.jpg
+    held_out/5/*.jpg
+
+Auteur: Groupe 8
+Projet: Deep Learning - Classification des maladies des feuilles de café
+"""
+
+import os
+import time
+
+import numpy as np
+
+from preprocessing import INPUT_SIZE, allocate_batch, open_image, preprocess_into
+
+# Extensions d'images acceptées (identiques à l'interface Streamlit)
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def _normalize_label(name):
+    return name.lower().replace("_", " ").replace("-", " ").strip()
+
+
+def list_image_files(directory):
+    """
+    Liste récursivement les images d'un dossier, dans un ordre stable.
+
+    Args:
+        directory: Dossier racine
+
+    Returns:
+        list: Chemins des images
+    """
+    paths = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        paths.extend(
+            os.path.join(root, file_name) for file_name in sorted(files)
+            if file_name.lower().endswith(IMAGE_EXTENSIONS)
+        )
+    return paths
+
+
+def load_images(paths, target_size=INPUT_SIZE):
+    """
+    Décode et prétraite des images dans un seul tenseur.
+
+    Args:
+        paths: Chemins des images
+        target_size: Tuple (hauteur, largeur) du modèle
+
+    Returns:
+        numpy.ndarray: Tenseur float32 de forme (len(paths), hauteur, largeur, 3)
+    """
+    batch = allocate_batch(len(paths), target_size)
+    for i, path in enumerate(paths):
+        preprocess_into(open_image(path, target_size), batch[i], target_size)
+    return batch
+
+
+def list_labeled_files(directory, class_names):
+    """
+    Liste les images d'un jeu étiqueté (un sous-dossier par classe).
+
+    Args:
+        directory: Dossier racine du jeu étiqueté
+        class_names: Table des noms de classes
+
+    Returns:
+        tuple: (chemins des images, numpy.ndarray des index de classe)
+
+    Raises:
+        ValueError: Si un sous-dossier ne correspond à aucune classe
+    """
+    by_name = {_normalize_label(name): idx for idx, name in enumerate(class_names)}
+    paths = []
+    labels = []
+    for entry in sorted(os.listdir(directory)):
+        class_dir = os.path.join(directory, entry)
+        if not os.path.isdir(class_dir):
+            continue
+        if entry.isdigit() and int(entry) < len(class_names):
+            label = int(entry)
+        elif _normalize_label(entry) in by_name:
+            label = by_name[_normalize_label(entry)]
+        else:
+            raise ValueError(f"Sous-dossier sans classe correspondante : {entry}")
+
+        class_paths = list_image_files(class_dir)
+        paths.extend(class_paths)
+        labels.extend([label] * len(class_paths))
+    return paths, np.asarray(labels, dtype=np.int64)
+
+
+def load_labeled_images(directory, class_names, target_size=INPUT_SIZE, limit_per_class=None):
+    """
+    Charge un jeu d'images étiquetées (un sous-dossier par classe).
+
+    Args:
+        directory: Dossier racine du jeu étiqueté
+        class_names: Table des noms de classes
+        target_size: Tuple (hauteur, largeur) du modèle
+        limit_per_class: Nombre maximal d'images par classe (None = toutes)
+
+    Returns:
+        tuple: (tenseur des images, numpy.ndarray des index de classe)
+
+    Raises:
+        ValueError: Si un sous-dossier ne correspond à aucune classe
+    """
+    paths, labels = list_labeled_files(directory, class_names)
+    if limit_per_class is not None:
+        keep = np.concatenate([np.flatnonzero(labels == label)[:limit_per_class] for label in np.unique(labels)])
+        keep.sort()
+        paths, labels = [paths[i] for i in keep], labels[keep]
+    return load_images(paths, target_size), labels
+
+
+def calibration_metrics(probabilities, labels, bins=10):
+    """
+    Précision et calibration d'un ensemble de prédictions.
+
+    Args:
+        probabilities: Probabilités (N, classes)
+        labels: Index de classe attendus (N,)
+        bins: Nombre d'intervalles de confiance pour l'ECE
+
+    Returns:
+        dict: accuracy, nll (log-vraisemblance négative moyenne), brier et
+        ece (erreur de calibration attendue)
+    """
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    labels = np.asarray(labels)
+    rows = np.arange(len(labels))
+    confidence = probabilities.max(axis=1)
+    correct = probabilities.argmax(axis=1) == labels
+
+    one_hot = np.zeros_like(probabilities)
+    one_hot[rows, labels] = 1.0
+
+    # ECE : écart |précision - confiance| par intervalle, pondéré par son effectif
+    bin_index = np.minimum((confidence * bins).astype(np.int64), bins - 1)
+    bin_accuracy = np.bincount(bin_index, weights=correct, minlength=bins)
+    bin_confidence = np.bincount(bin_index, weights=confidence, minlength=bins)
+    ece = np.sum(np.abs(bin_accuracy - bin_confidence)) / len(labels)
+
+    return {
+        "accuracy": float(correct.mean()),
+        "nll": float(-np.mean(np.log(np.clip(probabilities[rows, labels], 1e-12, 1.0)))),
+        "brier": float(np.mean(np.sum((probabilities - one_hot) ** 2, axis=1))),
+        "ece": float(ece),
+    }
+
+
+def predict_in_batches(backend, images, batch_size=32):
+    """
+    Exécute un backend sur un tenseur d'images, par lots.
+
+    Args:
+        backend: Objet exposant predict_proba
+        images: Tenseur float32 (N, hauteur, largeur, 3)
+        batch_size: Nombre d'images par passe
+
+    Returns:
+        tuple: (probabilités (N, classes), secondes passées dans le backend)
+    """
+    outputs = []
+    elapsed = 0.0
+    for start in range(0, len(images), batch_size):
+        begin = time.perf_counter()
+        outputs.append(np.asarray(backend.predict_proba(images[start:start + batch_size]), dtype=np.float32))
+        elapsed += time.perf_counter() - begin
+    return np.concatenate(outputs, axis=0), elapsed
+
+
+def compare_backends(backends, images, labels=None, reference=None, batch_size=32):
+    """
+    Compare plusieurs backends sur les mêmes images.
+
+    Args:
+        backends: dict nom -> backend
+        images: Tenseur float32 (N, hauteur, largeur, 3)
+        labels: Index de classe attendus (None = pas de précision)
+        reference: Nom du backend de référence (par défaut le premier)
+        batch_size: Nombre d'images par passe
+
+    Returns:
+        dict: Par backend : précision, écart de précision, accord top-1 et
+        écart max des probabilités vs la référence, débit (img/s)
+    """
+    reference = reference or next(iter(backends))
+    probabilities = {}
+    report = {}
+    for name, backend in backends.items():
+        probabilities[name], elapsed = predict_in_batches(backend, images, batch_size)
+        report[name] = {"throughput_img_s": len(images) / elapsed if elapsed else None}
+
+    ref_probabilities = probabilities[reference]
+    ref_accuracy = None
+    if labels is not None and len(labels):
+        ref_accuracy = float(np.mean(ref_probabilities.argmax(axis=1) == labels))
+
+    for name, p in probabilities.items():
+        entry = report[name]
+        entry["top1_agreement"] = float(np.mean(p.argmax(axis=1) == ref_probabilities.argmax(axis=1)))
+        entry["max_abs_prob_diff"] = float(np.max(np.abs(p - ref_probabilities)))
+        if ref_accuracy is not None:
+            entry["accuracy"] = float(np.mean(p.argmax(axis=1) == labels))
+            entry["accuracy_delta"] = entry["accuracy"] - ref_accuracy
+    return report
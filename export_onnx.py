@@ -0,0 +1,88 @@
+"""
+Export ONNX / SavedModel - Feuilles de Café
+===========================================
+Exporte le classifieur .keras vers les formats servis par les autres
+backends d'inférence (voir backends.py) :
+    savedmodel  Dossier SavedModel TensorFlow (signature serving_default)
+    onnx        Fichier .onnx pour ONNX Runtime (nécessite tf2onnx)
+
+Usage:
+    python export_onnx.py --formats onnx savedmodel
+    COFFEE_MODEL_PATH="mes models/MODELE_EXPERT_6CLASSES.onnx" COFFEE_INTRA_OP_THREADS=4 streamlit run app.py
+
+Auteur: Groupe 8
+Projet: Deep Learning - Classification des maladies des feuilles de café
+"""
+
+import argparse
+import os
+
+import tensorflow as tf
+
+from inference import MODEL_PATH
+from preprocessing import INPUT_SIZE
+
+# Formats d'export disponibles
+FORMATS = ("onnx", "savedmodel")
+
+
+def export_savedmodel(model, output_path):
+    """
+    Exporte le modèle en SavedModel TensorFlow.
+
+    Args:
+        model: Modèle Keras chargé
+        output_path: Dossier de sortie
+    """
+    model.export(output_path)
+
+
+def export_onnx(model, output_path, opset=17, target_size=INPUT_SIZE):
+    """
+    Exporte le modèle en ONNX, avec une dimension de lot dynamique.
+
+    Args:
+        model: Modèle Keras chargé
+        output_path: Fichier .onnx de sortie
+        opset: Version d'opset ONNX
+        target_size: Tuple (hauteur, largeur) attendu par le modèle
+    """
+    try:
+        import tf2onnx
+    except ImportError as e:
+        raise ImportError("L'export ONNX nécessite tf2onnx : pip install tf2onnx") from e
+
+    input_signature = (tf.TensorSpec((None, *target_size, 3), tf.float32, name="input"),)
+
+    @tf.function(input_signature=input_signature)
+    def infer(batch):
+        return model(batch, training=False)
+
+    tf2onnx.convert.from_function(infer, input_signature=input_signature, opset=opset, output_path=output_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export ONNX / SavedModel du classifieur")
+    parser.add_argument("--model", default=MODEL_PATH, help="Chemin du modèle .keras")
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=list(FORMATS), help="Formats à produire")
+    parser.add_argument("--output-dir", default=None, help="Dossier de sortie (par défaut celui du modèle)")
+    parser.add_argument("--opset", type=int, default=17, help="Version d'opset ONNX")
+    args = parser.parse_args(argv)
+
+    model = tf.keras.models.load_model(args.model)
+    output_dir = args.output_dir or os.path.dirname(args.model) or "."
+    os.makedirs(output_dir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(args.model))[0]
+
+    if "savedmodel" in args.formats:
+        path = os.path.join(output_dir, f"{stem}_savedmodel")
+        export_savedmodel(model, path)
+        print(f"✅ savedmodel : {path}")
+    if "onnx" in args.formats:
+        path = os.path.join(output_dir, f"{stem}.onnx")
+        export_onnx(model, path, args.opset)
+        print(f"✅ onnx : {path}")
+
+
+if __name__ == "__main__":
+    main()
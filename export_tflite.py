@@ -0,0 +1,138 @@
+"""
+Export TensorFlow Lite - Feuilles de Café
+=========================================
+Convertit le classifieur .keras en modèles TFLite quantifiés pour les
+serveurs CPU, puis compare leur précision à celle du modèle float.
+
+Variantes produites:
+    float32   Conversion simple (référence TFLite)
+    dynamic   Quantification dynamic-range (poids int8, activations float)
+    int8      Quantification int8 complète (entrée/sortie int8), calibrée
+              sur un jeu représentatif de photos de feuilles
+
+Chaque variante écrite est rechargée par backends.load_backend, comme dans
+l'application et le serveur, et exécutée une fois : un modèle que le
+backend TFLite ne sait pas charger fait échouer l'export immédiatement.
+
+Usage:
+    python export_tflite.py --representative-dir echantillons/ --eval-dir held_out/
+    COFFEE_MODEL_PATH="mes models/MODELE_EXPERT_6CLASSES_int8.tflite" streamlit run app.py
+
+Auteur: Groupe 8
+Projet: Deep Learning - Classification des maladies des feuilles de café
+"""
+
+import argparse
+import json
+import os
+
+import tensorflow as tf
+
+from backends import KerasBackend, load_backend
+from evaluation import compare_backends, list_image_files, load_images, load_labeled_images
+from inference import CLASS_NAMES, MODEL_PATH
+from preprocessing import INPUT_SIZE
+
+# Variantes de quantification disponibles
+VARIANTS = ("float32", "dynamic", "int8")
+
+
+def representative_dataset(paths, target_size=INPUT_SIZE):
+    """
+    Construit le générateur de calibration de la quantification int8.
+
+    Args:
+        paths: Chemins des photos de feuilles représentatives
+        target_size: Tuple (hauteur, largeur) du modèle
+
+    Returns:
+        callable: Générateur de listes [tenseur (1, hauteur, largeur, 3)]
+    """
+    def generate():
+        # Une image à la fois : la calibration n'a pas besoin de tout charger
+        for path in paths:
+            try:
+                batch = load_images([path], target_size)
+            except OSError:
+                # Photo illisible : ignorée pour la calibration
+                continue
+            yield [batch]
+    return generate
+
+
+def convert(model, variant, representative_paths=None, target_size=INPUT_SIZE):
+    """
+    Convertit un modèle Keras en TFLite.
+
+    Args:
+        model: Modèle Keras chargé
+        variant: 'float32', 'dynamic' ou 'int8'
+        representative_paths: Photos de calibration (obligatoires pour 'int8')
+        target_size: Tuple (hauteur, largeur) du modèle
+
+    Returns:
+        bytes: Modèle TFLite sérialisé
+    """
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if variant == "dynamic":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    elif variant == "int8":
+        if not representative_paths:
+            raise ValueError("La quantification int8 nécessite des images représentatives (--representative-dir)")
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset(representative_paths, target_size)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+    elif variant != "float32":
+        raise ValueError(f"Variante inconnue : {variant} (disponibles : {', '.join(VARIANTS)})")
+    return converter.convert()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export TFLite quantifié du classifieur")
+    parser.add_argument("--model", default=MODEL_PATH, help="Chemin du modèle .keras")
+    parser.add_argument("--variants", nargs="+", choices=VARIANTS, default=list(VARIANTS), help="Variantes à produire")
+    parser.add_argument("--output-dir", default=None, help="Dossier de sortie (par défaut celui du modèle)")
+    parser.add_argument("--representative-dir", default=None, help="Photos de feuilles pour calibrer l'int8")
+    parser.add_argument("--representative-count", type=int, default=200, help="Nombre maximal de photos de calibration")
+    parser.add_argument("--eval-dir", default=None, help="Jeu étiqueté (un sous-dossier par classe) pour mesurer la précision")
+    parser.add_argument("--num-threads", type=int, default=None, help="Threads des interpréteurs TFLite pendant l'évaluation")
+    args = parser.parse_args(argv)
+
+    if "int8" in args.variants and not args.representative_dir:
+        parser.error("la variante int8 nécessite --representative-dir")
+
+    model = tf.keras.models.load_model(args.model)
+    output_dir = args.output_dir or os.path.dirname(args.model) or "."
+    os.makedirs(output_dir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(args.model))[0]
+
+    representative_paths = None
+    if args.representative_dir:
+        representative_paths = list_image_files(args.representative_dir)[:args.representative_count]
+
+    report = {"model": args.model, "variants": {}}
+    backends = {}
+    for variant in args.variants:
+        path = os.path.join(output_dir, f"{stem}_{variant}.tflite")
+        converted = convert(model, variant, representative_paths)
+        with open(path, "wb") as f:
+            f.write(converted)
+        # Aller-retour par le chargeur de l'application (avec une première inférence)
+        backends[variant] = load_backend(path, num_threads=args.num_threads)
+        report["variants"][variant] = {"path": path, "size_bytes": os.path.getsize(path)}
+        print(f"✅ {variant} : {path}")
+
+    if args.eval_dir:
+        images, labels = load_labeled_images(args.eval_dir, CLASS_NAMES)
+        backends = {"keras": KerasBackend(model), **backends}
+        for name, metrics in compare_backends(backends, images, labels, reference="keras").items():
+            report["variants"].setdefault(name, {}).update(metrics)
+        report["eval_images"] = len(labels)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
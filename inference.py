@@ -0,0 +1,421 @@
+"""
+Moteur d'Inférence - Feuilles de Café
+=====================================
+Logique de classification indépendante de Streamlit : chargement du modèle,
+prétraitement des images et diagnostic hiérarchique (Healthy / Unhealthy).
+
+Ce module peut être importé seul par un worker, un serveur ou un benchmark
+sans déclencher la configuration de la page ni le CSS de l'application.
+
+Auteur: Groupe 8
+Projet: Deep Learning - Classification des maladies des feuilles de café
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from backends import KerasBackend, load_backend, resolve_backend
+from cache import file_fingerprint
+from preprocessing import INPUT_SIZE, allocate_batch, preprocess_batch
+
+# Chemin par défaut du modèle expert 6 classes (surchargeable par COFFEE_MODEL_PATH)
+MODEL_PATH = os.environ.get("COFFEE_MODEL_PATH") or os.path.join("mes models", "MODELE_EXPERT_6CLASSES.keras")
+
+# Backend d'inférence (keras, tflite...) ; None = déduit de l'extension du modèle
+BACKEND = os.environ.get("COFFEE_BACKEND") or None
+
+# Tailles de lot exécutées au warmup (surchargeable par COFFEE_WARMUP_BATCH_SIZES="1,8,32")
+WARMUP_BATCH_SIZES = tuple(
+    int(size) for size in (os.environ.get("COFFEE_WARMUP_BATCH_SIZES") or "1,8,32").split(",")
+)
+
+logger = logging.getLogger("coffee_leaf.inference")
+
+# Définition des 6 classes (ordre alphabétique probable)
+CLASS_NAMES = (
+    'Healthy',                # 0
+    'Red Spider Mite',        # 1
+    'Rust Level 1',           # 2
+    'Rust Level 2',           # 3
+    'Rust Level 3',           # 4
+    'Rust Level 4'            # 5
+)
+
+
+def preprocess_image(image, target_size=INPUT_SIZE):
+    """
+    Prétraite l'image pour la prédiction.
+
+    Args:
+        image: Image PIL
+        target_size: Tuple (hauteur, largeur) de la taille cible
+
+    Returns:
+        numpy.ndarray: Image prétraitée de forme (1, hauteur, largeur, 3)
+    """
+    return preprocess_batch([image], target_size)
+
+
+class Readiness:
+    """
+    État de disponibilité d'un modèle, lisible depuis n'importe quel thread.
+
+    Cycle de vie : starting -> loading -> warming -> ready (ou failed).
+    Un répartiteur de charge ne doit envoyer du trafic qu'aux répliques « ready ».
+    """
+
+    STARTING = "starting"
+    LOADING = "loading"
+    WARMING = "warming"
+    READY = "ready"
+    FAILED = "failed"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = self.STARTING
+        self._created = time.monotonic()
+        self._ready_after = None
+        self._error = None
+
+    def set(self, state, error=None):
+        """
+        Change l'état courant.
+
+        Args:
+            state: Nouvel état (Readiness.LOADING, WARMING, READY ou FAILED)
+            error: Erreur de chargement (état FAILED)
+        """
+        with self._lock:
+            self._state = state
+            self._error = str(error) if error is not None else None
+            if state == self.READY and self._ready_after is None:
+                self._ready_after = time.monotonic() - self._created
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state
+
+    def is_ready(self):
+        """Indique si le modèle est chargé et chauffé."""
+        return self.state == self.READY
+
+    def snapshot(self):
+        """
+        Renvoie l'état courant sous forme sérialisable.
+
+        Returns:
+            dict: status, ready, uptime_s, time_to_ready_s et error
+        """
+        with self._lock:
+            return {
+                "status": self._state,
+                "ready": self._state == self.READY,
+                "uptime_s": time.monotonic() - self._created,
+                "time_to_ready_s": self._ready_after,
+                "error": self._error,
+            }
+
+
+def interpret_predictions(probabilities, class_names=CLASS_NAMES):
+    """
+    Transforme un vecteur de probabilités en diagnostic hiérarchique.
+
+    Logique:
+    - Classe 0 : Healthy (feuille saine)
+    - Classes 1-5 : Unhealthy (pathologies spécifiques)
+
+    Args:
+        probabilities: Probabilités pour les 6 classes (numpy.ndarray)
+        class_names: Table des noms de classes
+
+    Returns:
+        tuple: (statut_principal, pathologie_specifique, confiance, all_predictions, predicted_class_idx)
+    """
+    # Obtenir l'index de la classe avec la plus haute probabilité
+    predicted_class_idx = np.argmax(probabilities)
+    confidence = probabilities[predicted_class_idx] * 100
+
+    # Déterminer le statut principal (Healthy vs Unhealthy)
+    if predicted_class_idx == 0:
+        statut_principal = "Healthy"
+        pathologie_specifique = None
+    else:
+        statut_principal = "Unhealthy"
+        pathologie_specifique = class_names[predicted_class_idx]
+
+    return statut_principal, pathologie_specifique, confidence, probabilities, predicted_class_idx
+
+
+class CoffeeLeafClassifier:
+    """
+    Classifieur de feuilles de café : possède le backend d'inférence,
+    le prétraitement et la table des classes.
+
+    Exemple:
+        classifier = CoffeeLeafClassifier.from_path()
+        statut, pathologie, confiance, probas, idx = classifier.predict(image)
+    """
+
+    def __init__(self, backend, class_names=CLASS_NAMES, target_size=INPUT_SIZE, model_path=None):
+        """
+        Args:
+            backend: Backend d'inférence (voir backends.py) ou modèle Keras déjà chargé
+            class_names: Table des noms de classes (index -> nom)
+            target_size: Tuple (hauteur, largeur) attendu par le modèle
+            model_path: Chemin du fichier d'origine du modèle
+        """
+        if not hasattr(backend, "predict_proba"):
+            backend = KerasBackend(backend, target_size)
+        self.backend = backend
+        self.class_names = tuple(class_names)
+        self.target_size = tuple(target_size)
+        self.model_path = model_path
+        # Durées de démarrage et disponibilité (renseignées par from_path)
+        self.startup_timings = {}
+        self.readiness = Readiness()
+        self.readiness.set(Readiness.READY)
+
+        # Empreinte du modèle : invalide les résultats en cache d'une autre version
+        self.fingerprint = file_fingerprint(model_path) if model_path else f"memory-{id(backend)}"
+
+    @property
+    def model(self):
+        """Modèle Keras sous-jacent (None pour les backends hors Keras)."""
+        return getattr(self.backend, "model", None)
+
+    def memory_bytes(self):
+        """
+        Taille des poids du modèle en mémoire.
+
+        Returns:
+            int ou None: Octets occupés par les poids (None hors Keras)
+        """
+        if self.model is None:
+            return None
+        return int(sum(np.prod(w.shape) * np.dtype(w.dtype).itemsize for w in self.model.weights))
+
+    @classmethod
+    def from_path(cls, model_path=MODEL_PATH, backend=BACKEND, class_names=CLASS_NAMES,
+                  target_size=INPUT_SIZE, warmup_batch_sizes=WARMUP_BATCH_SIZES, readiness=None, **options):
+        """
+        Charge le modèle depuis le disque, le chauffe et construit le classifieur.
+
+        Le warmup exécute un lot nul par taille de `warmup_batch_sizes` : le
+        traçage du graphe et la sélection des noyaux ne sont pas payés par le
+        premier utilisateur.
+
+        Args:
+            model_path: Chemin du fichier de modèle (.keras, .tflite...)
+            backend: Nom du backend, None = déduit de l'extension du modèle
+            class_names: Table des noms de classes (index -> nom)
+            target_size: Tuple (hauteur, largeur) attendu par le modèle
+            warmup_batch_sizes: Tailles de lot exécutées au warmup
+            readiness: Readiness mis à jour à chaque étape (optionnel)
+            **options: Options du backend (par ex. num_threads)
+
+        Returns:
+            CoffeeLeafClassifier: Classifieur prêt à l'emploi
+
+        Raises:
+            FileNotFoundError: Si le fichier du modèle est absent
+        """
+        readiness = readiness or Readiness()
+        try:
+            if not os.path.exists(model_path):
+                raise FileNotFoundError(f"Le fichier du modèle n'a pas été trouvé : {model_path}")
+
+            # Chaque étape est chronométrée séparément pour le journal de démarrage
+            timings = {}
+            backend_class = resolve_backend(model_path, backend)
+            readiness.set(Readiness.LOADING)
+
+            start = time.perf_counter()
+            if backend_class.requires_tensorflow:
+                import tensorflow  # noqa: F401
+            timings["import_s"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            loaded = load_backend(model_path, backend_class.name, target_size, warmup=False, **options)
+            timings["load_s"] = time.perf_counter() - start
+
+            readiness.set(Readiness.WARMING)
+            start = time.perf_counter()
+            loaded.warmup(warmup_batch_sizes)
+            timings["warmup_s"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            classifier = cls(loaded, class_names, target_size, model_path)
+            timings["fingerprint_s"] = time.perf_counter() - start
+        except BaseException as e:
+            readiness.set(Readiness.FAILED, e)
+            raise
+
+        classifier.startup_timings = timings
+        classifier.readiness = readiness
+        readiness.set(Readiness.READY)
+        logger.info(
+            "Modèle %s (%s) prêt : import %.2fs, chargement %.2fs, warmup %s %.2fs, empreinte %.2fs",
+            model_path, backend_class.name, timings["import_s"], timings["load_s"],
+            list(warmup_batch_sizes), timings["warmup_s"], timings["fingerprint_s"],
+        )
+        return classifier
+
+    def preprocess(self, image):
+        """
+        Prétraite une image PIL pour le modèle.
+
+        Args:
+            image: Image PIL
+
+        Returns:
+            numpy.ndarray: Tenseur de forme (1, hauteur, largeur, 3)
+        """
+        return preprocess_image(image, self.target_size)
+
+    def preprocess_batch(self, images, out=None):
+        """
+        Prétraite plusieurs images PIL dans un seul tampon de lot.
+
+        Args:
+            images: Séquence d'images PIL
+            out: Tampon float32 préalloué (voir preprocessing.allocate_batch), None = allocation
+
+        Returns:
+            numpy.ndarray: Tenseur de forme (len(images), hauteur, largeur, 3)
+        """
+        return preprocess_batch(images, self.target_size, out)
+
+    def predict_proba(self, batch):
+        """
+        Exécute une passe du modèle sur un lot déjà prétraité.
+
+        Args:
+            batch: numpy.ndarray de forme (N, hauteur, largeur, 3)
+
+        Returns:
+            numpy.ndarray: Probabilités de forme (N, nombre de classes)
+        """
+        return self.backend.predict_proba(batch)
+
+    def interpret(self, probabilities):
+        """
+        Diagnostic hiérarchique à partir d'un vecteur de probabilités.
+
+        Args:
+            probabilities: Probabilités pour toutes les classes
+
+        Returns:
+            tuple: (statut_principal, pathologie_specifique, confiance, all_predictions, predicted_class_idx)
+        """
+        return interpret_predictions(probabilities, self.class_names)
+
+    def predict(self, image):
+        """
+        Effectue une prédiction sur une image.
+
+        Args:
+            image: Image PIL
+
+        Returns:
+            tuple: (statut_principal, pathologie_specifique, confiance, all_predictions, predicted_class_idx)
+        """
+        predictions = self.predict_proba(self.preprocess(image))
+        return self.interpret(predictions[0])
+
+    def predict_batch(self, images, batch_size=32):
+        """
+        Effectue les prédictions sur plusieurs images, une passe par paquet.
+
+        Args:
+            images: Liste d'images PIL
+            batch_size: Nombre maximal d'images par passe du modèle
+
+        Returns:
+            list: Un tuple de diagnostic par image, dans l'ordre d'entrée
+        """
+        results = []
+        buffer = allocate_batch(min(batch_size, len(images)), self.target_size)
+        for start in range(0, len(images), batch_size):
+            batch = self.preprocess_batch(images[start:start + batch_size], buffer)
+            results.extend(self.interpret(p) for p in self.predict_proba(batch))
+        return results
+
+
+class ClassifierLoader:
+    """
+    Chargement du classifieur dans un thread dédié.
+
+    L'appelant peut afficher son interface (ou accepter des connexions)
+    pendant l'import de TensorFlow, la désérialisation du modèle et le
+    warmup, et interroger `health()` pour savoir si le modèle est prêt.
+    """
+
+    def __init__(self, model_path=MODEL_PATH, **kwargs):
+        """
+        Args:
+            model_path: Chemin du fichier de modèle
+            **kwargs: Arguments de CoffeeLeafClassifier.from_path
+        """
+        self.model_path = model_path
+        self.readiness = Readiness()
+        self._future = Future()
+        self._kwargs = kwargs
+        threading.Thread(target=self._run, name="model-loader", daemon=True).start()
+
+    def _run(self):
+        if not self._future.set_running_or_notify_cancel():
+            return
+        try:
+            classifier = CoffeeLeafClassifier.from_path(self.model_path, readiness=self.readiness, **self._kwargs)
+            self._future.set_result(classifier)
+        except BaseException as e:
+            logger.exception("Échec du chargement du modèle %s", self.model_path)
+            self._future.set_exception(e)
+
+    def done(self):
+        """Indique si le chargement est terminé (avec succès ou non)."""
+        return self._future.done()
+
+    def result(self, timeout=None):
+        """
+        Attend la fin du chargement.
+
+        Args:
+            timeout: Attente maximale en secondes (None = illimitée)
+
+        Returns:
+            CoffeeLeafClassifier: Classifieur prêt
+
+        Raises:
+            Exception: L'erreur survenue pendant le chargement
+        """
+        return self._future.result(timeout)
+
+    def health(self):
+        """
+        État de disponibilité du modèle, pour une sonde de readiness.
+
+        Returns:
+            dict: Voir Readiness.snapshot, plus le chemin du modèle
+        """
+        return {**self.readiness.snapshot(), "model_path": self.model_path}
+
+
+def load_classifier_in_background(model_path=MODEL_PATH, **kwargs):
+    """
+    Lance le chargement du classifieur dans un thread dédié.
+
+    Args:
+        model_path: Chemin du fichier de modèle
+        **kwargs: Arguments de CoffeeLeafClassifier.from_path
+
+    Returns:
+        ClassifierLoader: Chargement en cours (result(), done(), health())
+    """
+    return ClassifierLoader(model_path, **kwargs)
@@ -0,0 +1,303 @@
+"""
+Métriques et Instrumentation - Feuilles de Café
+===============================================
+Chronométrage de chaque étape du chemin de prédiction (décodage,
+prétraitement, filtre, inférence, rendu) et compteurs (requêtes, erreurs,
+cache, tailles de lot), exportés au format texte Prometheus.
+
+Chaque étape est encadrée par `span("etape")` : sa durée alimente
+l'histogramme `coffee_stage_seconds` et, si une `RequestTrace` est active
+dans le contexte courant, la trace de la requête (panneau de débogage).
+
+Exemple:
+    with RequestTrace() as trace:
+        with span("decode"):
+            image = open_image(data)
+    print(trace.rows())
+
+Auteur: Groupe 8
+Projet: Deep Learning - Classification des maladies des feuilles de café
+"""
+
+import contextvars
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger("coffee_leaf.metrics")
+
+# Bornes (secondes) des histogrammes de durée
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Bornes des histogrammes de taille de lot
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+# Trace de la requête en cours (par thread / session Streamlit)
+_current_trace = contextvars.ContextVar("coffee_request_trace", default=None)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Compteur monotone, éventuellement étiqueté."""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        """
+        Incrémente le compteur.
+
+        Args:
+            amount: Valeur ajoutée (positive)
+            **labels: Valeur de chaque étiquette (voir labelnames)
+        """
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        """Valeur courante pour un jeu d'étiquettes."""
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def render(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values]
+
+
+class Histogram:
+    """Histogramme cumulatif (bornes fixes), éventuellement étiqueté."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DURATION_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        """
+        Enregistre une observation.
+
+        Args:
+            value: Valeur observée (secondes, taille de lot...)
+            **labels: Valeur de chaque étiquette (voir labelnames)
+        """
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            counts, total = self._series.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._series[key] = (counts, total + value)
+
+    def render(self):
+        with self._lock:
+            series = sorted((key, (list(counts), total)) for key, (counts, total) in self._series.items())
+        lines = []
+        for key, (counts, total) in series:
+            for bound, count in zip(self.buckets, counts):
+                labels = _format_labels(self.labelnames, key, [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {counts[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """Ensemble de métriques exportées ensemble."""
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self.register(Counter(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DURATION_BUCKETS):
+        return self.register(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self):
+        """
+        Exporte toutes les métriques au format texte Prometheus (version 0.0.4).
+
+        Returns:
+            str: Texte de la réponse /metrics
+        """
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Registre et métriques du chemin de prédiction
+REGISTRY = MetricsRegistry()
+REQUESTS = REGISTRY.counter("coffee_requests_total", "Analyses demandées", ("mode",))
+ERRORS = REGISTRY.counter("coffee_errors_total", "Erreurs par étape", ("stage",))
+CACHE_LOOKUPS = REGISTRY.counter("coffee_cache_lookups_total", "Consultations du cache des prédictions", ("result",))
+STAGE_SECONDS = REGISTRY.histogram("coffee_stage_seconds", "Durée de chaque étape du chemin de prédiction", ("stage",))
+BATCH_SIZE = REGISTRY.histogram("coffee_batch_size", "Images par passe du modèle", buckets=BATCH_SIZE_BUCKETS)
+
+
+class RequestTrace:
+    """
+    Durées des étapes d'une requête, pour le panneau de débogage.
+
+    Utilisée comme gestionnaire de contexte : les `span` exécutés dans le
+    bloc (même thread) y sont enregistrés.
+    """
+
+    def __init__(self):
+        self.spans = []
+        # Type d'analyse demandée pendant la trace (voir start_request), None sinon
+        self.mode = None
+        self.started = time.perf_counter()
+        self.total_s = None
+        self._token = None
+
+    def __enter__(self):
+        self._token = _current_trace.set(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.total_s = time.perf_counter() - self.started
+        _current_trace.reset(self._token)
+        return False
+
+    def record(self, stage, seconds, error=False):
+        self.spans.append((stage, seconds, error))
+
+    def rows(self):
+        """
+        Durées par étape, dans l'ordre d'exécution.
+
+        Returns:
+            dict: Colonnes 'Étape', 'Durée (ms)' et 'Erreur' (pour st.dataframe)
+        """
+        return {
+            "Étape": [stage for stage, _, _ in self.spans],
+            "Durée (ms)": [round(seconds * 1000, 2) for _, seconds, _ in self.spans],
+            "Erreur": ["❌" if error else "" for _, _, error in self.spans],
+        }
+
+
+def start_request(mode):
+    """
+    Compte une analyse demandée et l'associe à la trace en cours.
+
+    Args:
+        mode: Type d'analyse (single, batch, tiled, http...)
+    """
+    REQUESTS.inc(mode=mode)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.mode = mode
+
+
+@contextmanager
+def span(stage):
+    """
+    Chronomètre une étape : histogramme global et trace de la requête en cours.
+
+    Une exception levée dans le bloc incrémente `coffee_errors_total{stage}`
+    puis est propagée.
+
+    Args:
+        stage: Nom de l'étape (decode, preprocess, inference, render...)
+    """
+    start = time.perf_counter()
+    error = False
+    try:
+        yield
+    except BaseException:
+        error = True
+        ERRORS.inc(stage=stage)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.record(stage, elapsed, error)
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    """Sert GET /metrics au format texte Prometheus."""
+
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(host="127.0.0.1", port=9108):
+    """
+    Démarre l'export /metrics dans un thread dédié.
+
+    Args:
+        host: Adresse d'écoute (locale par défaut)
+        port: Port d'écoute
+
+    Returns:
+        ThreadingHTTPServer: Serveur démarré, ou None si le port est indisponible
+    """
+    try:
+        server = ThreadingHTTPServer((host, port), MetricsRequestHandler)
+    except OSError as e:
+        logger.warning("Export des métriques indisponible sur %s:%d : %s", host, port, e)
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logger.info("Métriques exportées sur http://%s:%d/metrics", host, port)
+    return server
@@ -0,0 +1,314 @@
+"""
+Filtre Hors-Distribution - Feuilles de Café
+===========================================
+Étape exécutée avant le classifieur 6 classes : l'autoencodeur
+`autoencoder_coffee.keras`, entraîné sur des feuilles de café, reconstruit
+chaque image et l'erreur de reconstruction (MSE) mesure son écart au
+domaine. Une photo qui n'est pas une feuille de café (erreur au-dessus du
+seuil) est signalée et ne passe pas par le classifieur : pas de calcul
+inutile, pas de diagnostic confiant sur une image absurde.
+
+Le seuil est calibré sur un jeu de référence de vraies feuilles (quantile
+des erreurs) et enregistré à côté de l'autoencodeur :
+
+    python ood.py --reference-dir held_out/ --quantile 0.99
+
+Auteur: Groupe 8
+Projet: Deep Learning - Classification des maladies des feuilles de café
+"""
+
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+from backends import load_backend
+from cache import file_fingerprint
+from preprocessing import INPUT_SIZE
+
+# Autoencodeur livré avec le projet (surchargeable par COFFEE_AUTOENCODER_PATH)
+AUTOENCODER_PATH = os.environ.get("COFFEE_AUTOENCODER_PATH") or os.path.join("mes models", "autoencoder_coffee.keras")
+
+# Seuil imposé (COFFEE_OOD_THRESHOLD) ; sinon celui du fichier de calibration
+OOD_THRESHOLD = float(os.environ["COFFEE_OOD_THRESHOLD"]) if os.environ.get("COFFEE_OOD_THRESHOLD") else None
+
+# Quantile des erreurs de référence retenu comme seuil par défaut
+DEFAULT_QUANTILE = 0.99
+
+# Statut renvoyé à la place du diagnostic pour une image rejetée
+OUT_OF_DISTRIBUTION = "Hors distribution"
+
+logger = logging.getLogger("coffee_leaf.ood")
+
+
+def threshold_path(model_path):
+    """
+    Chemin du fichier de calibration associé à un autoencodeur.
+
+    Args:
+        model_path: Chemin de l'autoencodeur
+
+    Returns:
+        str: Chemin du fichier JSON du seuil
+    """
+    return os.path.splitext(model_path)[0] + ".threshold.json"
+
+
+def configured_threshold(model_path=AUTOENCODER_PATH, threshold=OOD_THRESHOLD, fingerprint=None):
+    """
+    Seuil du filtre, lu sans charger l'autoencodeur.
+
+    Le fichier de calibration n'est retenu que s'il a été produit pour cette
+    version de l'autoencodeur (même empreinte).
+
+    Args:
+        model_path: Chemin de l'autoencodeur
+        threshold: Seuil imposé (None = fichier de calibration s'il existe)
+        fingerprint: Empreinte de l'autoencodeur si déjà calculée
+
+    Returns:
+        float ou None: Seuil, None si le filtre n'est pas calibré
+
+    Raises:
+        FileNotFoundError: Si un fichier de calibration existe mais pas l'autoencodeur
+    """
+    if threshold is not None:
+        return threshold
+    path = threshold_path(model_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        calibration = json.load(f)
+    if calibration.get("fingerprint") != (fingerprint or file_fingerprint(model_path)):
+        logger.warning("Calibration %s faite pour une autre version de l'autoencodeur : ignorée", path)
+        return None
+    return float(calibration["threshold"])
+
+
+def calibrate_threshold(errors, quantile=DEFAULT_QUANTILE):
+    """
+    Seuil de rejet à partir des erreurs d'un jeu de vraies feuilles.
+
+    Args:
+        errors: Erreurs de reconstruction du jeu de référence
+        quantile: Part des feuilles de référence à accepter (0.99 = 1 % de faux rejets)
+
+    Returns:
+        float: Seuil d'erreur
+    """
+    return float(np.quantile(np.asarray(errors, dtype=np.float64), quantile))
+
+
+class OutOfDistributionGate:
+    """
+    Filtre hors-distribution par erreur de reconstruction.
+
+    Exemple:
+        gate = OutOfDistributionGate.from_path()
+        errors, accepted = gate.screen(batch)
+        probabilities = classifier.predict_proba(batch[accepted])
+    """
+
+    def __init__(self, backend, threshold=None, target_size=INPUT_SIZE, model_path=None):
+        """
+        Args:
+            backend: Backend d'inférence de l'autoencodeur (voir backends.py)
+            threshold: Erreur maximale acceptée (None = filtre inactif, erreurs seulement mesurées)
+            target_size: Tuple (hauteur, largeur) attendu par l'autoencodeur
+            model_path: Chemin du fichier de l'autoencodeur
+        """
+        self.backend = backend
+        self.threshold = threshold
+        self.target_size = tuple(target_size)
+        self.model_path = model_path
+        # Empreinte de l'autoencodeur : clés de cache des erreurs
+        self.fingerprint = file_fingerprint(model_path) if model_path else f"memory-{id(backend)}"
+        self.checked = 0
+        self.rejected = 0
+        self.cache_hits = 0
+        self.gate_seconds = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_path(cls, model_path=AUTOENCODER_PATH, threshold=OOD_THRESHOLD, target_size=INPUT_SIZE, **options):
+        """
+        Charge l'autoencodeur et son seuil calibré.
+
+        Args:
+            model_path: Chemin de l'autoencodeur
+            threshold: Seuil imposé (None = fichier de calibration s'il existe)
+            target_size: Tuple (hauteur, largeur) de l'autoencodeur
+            **options: Options du backend (par ex. intra_op_threads)
+
+        Returns:
+            OutOfDistributionGate: Filtre prêt à l'emploi
+
+        Raises:
+            FileNotFoundError: Si l'autoencodeur est introuvable
+        """
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"L'autoencodeur n'a pas été trouvé : {model_path}")
+
+        backend = load_backend(model_path, target_size=target_size, **options)
+        gate = cls(backend, None, target_size, model_path)
+        if threshold is None:
+            threshold = gate.load_threshold()
+        gate.threshold = threshold
+        if threshold is None:
+            logger.warning("Autoencodeur %s non calibré : filtre hors-distribution inactif "
+                           "(lancez python ood.py --reference-dir ...)", model_path)
+        return gate
+
+    @property
+    def enabled(self):
+        """Indique si un seuil est défini (sinon aucune image n'est rejetée)."""
+        return self.threshold is not None
+
+    def load_threshold(self):
+        """
+        Lit le seuil du fichier de calibration, s'il correspond à cet autoencodeur.
+
+        Returns:
+            float ou None: Seuil calibré
+        """
+        return configured_threshold(self.model_path, None, self.fingerprint)
+
+    def reconstruction_errors(self, batch):
+        """
+        Erreur quadratique moyenne de reconstruction de chaque image.
+
+        Args:
+            batch: Tenseur float32 (N, hauteur, largeur, 3) normalisé entre 0 et 1
+
+        Returns:
+            numpy.ndarray: Erreurs float32 de forme (N,)
+        """
+        reconstruction = np.asarray(self.backend.predict_proba(batch), dtype=np.float32)
+        return np.mean(np.square(reconstruction - batch), axis=(1, 2, 3), dtype=np.float32)
+
+    def accepts(self, errors):
+        """
+        Applique le seuil à des erreurs de reconstruction.
+
+        Args:
+            errors: Erreurs de forme (N,)
+
+        Returns:
+            numpy.ndarray: Masque booléen des images acceptées
+        """
+        errors = np.asarray(errors)
+        if not self.enabled:
+            return np.ones(errors.shape, dtype=bool)
+        return errors <= self.threshold
+
+    def screen(self, batch, cache_keys=None, cache=None):
+        """
+        Filtre un lot : une seule passe de l'autoencodeur pour les images hors cache.
+
+        Args:
+            batch: Tenseur float32 (N, hauteur, largeur, 3) déjà prétraité
+            cache_keys: Clés de cache des images (« self.fingerprint:content_digest(image) »)
+            cache: PredictionCache où conserver les erreurs (None = pas de cache)
+
+        Returns:
+            tuple: (erreurs de forme (N,), masque booléen des images acceptées)
+        """
+        errors = np.empty(len(batch), dtype=np.float32)
+        missing = []
+        for i in range(len(batch)):
+            cached = cache.get(cache_keys[i]) if cache is not None and cache_keys is not None else None
+            if cached is not None:
+                errors[i] = cached[0]
+            else:
+                missing.append(i)
+
+        start = time.perf_counter()
+        if missing:
+            # Lot contigu : pas de copie si aucune image n'était en cache
+            to_check = batch if len(missing) == len(batch) else batch[missing]
+            errors[missing] = self.reconstruction_errors(to_check)
+            if cache is not None and cache_keys is not None:
+                for i in missing:
+                    cache.put(cache_keys[i], errors[i:i + 1])
+        elapsed = time.perf_counter() - start
+
+        accepted = self.accepts(errors)
+        with self._lock:
+            self.checked += len(batch)
+            self.rejected += int(np.count_nonzero(~accepted))
+            self.cache_hits += len(batch) - len(missing)
+            self.gate_seconds += elapsed
+        return errors, accepted
+
+    def stats(self):
+        """
+        Renvoie les compteurs du filtre.
+
+        Returns:
+            dict: Images contrôlées, rejetées (passes du classifieur évitées),
+            succès du cache, temps passé dans l'autoencodeur et seuil
+        """
+        with self._lock:
+            return {
+                "checked": self.checked,
+                "rejected": self.rejected,
+                "classifier_images_avoided": self.rejected,
+                "rejection_rate": self.rejected / self.checked if self.checked else 0.0,
+                "cache_hits": self.cache_hits,
+                "gate_s": self.gate_seconds,
+                "threshold": self.threshold,
+            }
+
+
+def main(argv=None):
+    from evaluation import list_image_files, load_images
+
+    parser = argparse.ArgumentParser(description="Calibration du filtre hors-distribution")
+    parser.add_argument("--autoencoder", default=AUTOENCODER_PATH, help="Chemin de l'autoencodeur .keras")
+    parser.add_argument("--reference-dir", required=True, help="Photos de vraies feuilles de café (récursif)")
+    parser.add_argument("--quantile", type=float, default=DEFAULT_QUANTILE, help="Quantile des erreurs retenu comme seuil")
+    parser.add_argument("--limit", type=int, default=None, help="Nombre maximal de photos de référence")
+    parser.add_argument("--batch-size", type=int, default=32, help="Images par passe de l'autoencodeur")
+    parser.add_argument("--negative-dir", default=None, help="Photos hors domaine pour mesurer le taux de rejet")
+    args = parser.parse_args(argv)
+
+    gate = OutOfDistributionGate.from_path(args.autoencoder, threshold=float("inf"))
+
+    def errors_of(directory):
+        paths = list_image_files(directory)[:args.limit]
+        errors = []
+        for start in range(0, len(paths), args.batch_size):
+            errors.append(gate.reconstruction_errors(load_images(paths[start:start + args.batch_size], gate.target_size)))
+        return np.concatenate(errors) if errors else np.empty(0, dtype=np.float32)
+
+    reference_errors = errors_of(args.reference_dir)
+    if not len(reference_errors):
+        parser.error(f"aucune image dans {args.reference_dir}")
+
+    threshold = calibrate_threshold(reference_errors, args.quantile)
+    calibration = {
+        "threshold": threshold,
+        "quantile": args.quantile,
+        "reference_images": int(len(reference_errors)),
+        "reference_error_mean": float(reference_errors.mean()),
+        "reference_error_max": float(reference_errors.max()),
+        "fingerprint": gate.fingerprint,
+    }
+    if args.negative_dir:
+        negative_errors = errors_of(args.negative_dir)
+        calibration["negative_images"] = int(len(negative_errors))
+        calibration["negative_rejection_rate"] = float(np.mean(negative_errors > threshold)) if len(negative_errors) else None
+
+    path = threshold_path(args.autoencoder)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(calibration, f, indent=2)
+    print(json.dumps(calibration, indent=2))
+    print(f"✅ Seuil enregistré : {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Prétraitement des Images - Feuilles de Café
+===========================================
+Décodage, redimensionnement et normalisation des images pour le modèle.
+
+Chaque image est redimensionnée en uint8 puis normalisée directement dans
+un tampon de lot float32 préalloué (division en place) : aucune copie
+intermédiaire float pleine taille n'est créée, et le même tampon peut être
+réutilisé d'un lot à l'autre.
+
+Auteur: Groupe 8
+Projet: Deep Learning - Classification des maladies des feuilles de café
+"""
+
+import io
+
+import numpy as np
+from PIL import Image
+
+# Taille d'entrée du modèle (hauteur, largeur)
+INPUT_SIZE = (224, 224)
+
+# Taille maximale (largeur, hauteur) de l'aperçu affiché dans l'interface
+PREVIEW_SIZE = (1024, 1024)
+
+# Diviseur de normalisation des pixels (identique à l'ancien `img_array / 255.0`)
+_PIXEL_SCALE = np.float32(255.0)
+
+
+def allocate_batch(batch_size, target_size=INPUT_SIZE):
+    """
+    Alloue un tampon de lot réutilisable.
+
+    Args:
+        batch_size: Nombre d'images du lot
+        target_size: Tuple (hauteur, largeur) du modèle
+
+    Returns:
+        numpy.ndarray: Tampon float32 de forme (batch_size, hauteur, largeur, 3)
+    """
+    height, width = target_size
+    return np.empty((batch_size, height, width, 3), dtype=np.float32)
+
+
+def open_image(source, target_size=None):
+    """
+    Ouvre une image en RGB, avec décodage réduit pour les grands JPEG.
+
+    Si `target_size` est fourni, le décodeur JPEG applique une mise à l'échelle
+    DCT (`Image.draft`) et ne décode que la résolution nécessaire (au moins
+    `target_size`), au lieu de l'image complète.
+
+    Args:
+        source: Chemin, octets ou objet fichier de l'image
+        target_size: Tuple (hauteur, largeur) minimal à conserver, None pour la pleine résolution
+
+    Returns:
+        PIL.Image.Image: Image RGB chargée
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    image = Image.open(source)
+    if target_size is not None and image.format == "JPEG":
+        height, width = target_size
+        image.draft("RGB", (width, height))
+    return image.convert("RGB")
+
+
+def reduce_for_model(image, target_size=INPUT_SIZE):
+    """
+    Réduit rapidement une image par un facteur entier (moyenne par blocs).
+
+    L'image conserve au moins deux fois la taille cible pour que le
+    redimensionnement final (bicubique) garde sa qualité.
+
+    Args:
+        image: Image PIL chargée
+        target_size: Tuple (hauteur, largeur) du modèle
+
+    Returns:
+        PIL.Image.Image: Image réduite (ou l'image d'origine si déjà petite)
+    """
+    height, width = target_size
+    factor = min(image.width // width, image.height // height) // 2
+    return image.reduce(factor) if factor > 1 else image
+
+
+def decode_upload(source, target_size=INPUT_SIZE, preview_size=PREVIEW_SIZE):
+    """
+    Décode une photo téléchargée près de la taille utile.
+
+    Un seul décodage JPEG réduit (`Image.draft`) à la plus grande des deux
+    tailles utiles, puis deux réductions : l'image pour le modèle et un
+    aperçu de taille bornée pour l'affichage. La photo pleine résolution
+    (12 à 50 MP) n'est jamais entièrement décodée.
+
+    Args:
+        source: Chemin, octets ou objet fichier de l'image
+        target_size: Tuple (hauteur, largeur) du modèle
+        preview_size: Tuple (largeur, hauteur) maximal de l'aperçu
+
+    Returns:
+        tuple: (image pour le modèle, aperçu), deux images PIL RGB
+    """
+    height, width = target_size
+    needed = (max(height, preview_size[1]), max(width, preview_size[0]))
+    image = open_image(source, needed)
+
+    preview = image.copy()
+    preview.thumbnail(preview_size)
+    return reduce_for_model(image, target_size), preview
+
+
+def resize_to_array(image, target_size=INPUT_SIZE):
+    """
+    Redimensionne une image et renvoie ses pixels uint8.
+
+    Args:
+        image: Image PIL RGB
+        target_size: Tuple (hauteur, largeur) de la taille cible
+
+    Returns:
+        numpy.ndarray: Pixels uint8 de forme (hauteur, largeur, 3)
+    """
+    height, width = target_size
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    if image.size != (width, height):
+        image = image.resize((width, height))
+    return np.asarray(image, dtype=np.uint8)
+
+
+def normalize_into(pixels, out):
+    """
+    Normalise des pixels uint8 entre 0 et 1 directement dans `out`.
+
+    Args:
+        pixels: numpy.ndarray uint8 de forme (..., hauteur, largeur, 3)
+        out: numpy.ndarray float32 de même forme, écrit en place
+
+    Returns:
+        numpy.ndarray: `out`
+    """
+    return np.divide(pixels, _PIXEL_SCALE, out=out)
+
+
+def preprocess_into(image, out, target_size=INPUT_SIZE):
+    """
+    Prétraite une image PIL dans une tranche d'un tampon de lot.
+
+    Args:
+        image: Image PIL
+        out: numpy.ndarray float32 de forme (hauteur, largeur, 3), par ex. `batch[i]`
+        target_size: Tuple (hauteur, largeur) de la taille cible
+
+    Returns:
+        numpy.ndarray: `out`
+    """
+    return normalize_into(resize_to_array(image, target_size), out)
+
+
+def preprocess_batch(images, target_size=INPUT_SIZE, out=None):
+    """
+    Prétraite plusieurs images dans un seul tampon de lot.
+
+    Args:
+        images: Séquence d'images PIL
+        target_size: Tuple (hauteur, largeur) de la taille cible
+        out: Tampon préalloué d'au moins len(images) images (None = allocation)
+
+    Returns:
+        numpy.ndarray: Vue float32 de forme (len(images), hauteur, largeur, 3)
+    """
+    if out is None:
+        out = allocate_batch(len(images), target_size)
+    elif len(out) < len(images):
+        raise ValueError(f"Tampon trop petit : {len(out)} places pour {len(images)} images")
+
+    for i, image in enumerate(images):
+        preprocess_into(image, out[i], target_size)
+    return out[:len(images)]
@@ -0,0 +1,383 @@
+"""
+Inférence Multi-Processus - Feuilles de Café
+============================================
+Pool de processus d'inférence pour l'analyse en masse et le serveur HTTP :
+chaque processus charge le modèle une fois et exécute ses passes avec son
+propre runtime TensorFlow, hors du GIL du processus principal.
+
+Les lots de pixels uint8 (N, 224, 224, 3) sont échangés par un anneau de
+tampons `multiprocessing.shared_memory` (un créneau d'entrée et un créneau
+de sortie par lot en vol) : seuls les numéros de créneau transitent par les
+files, jamais les tableaux. Chaque processus normalise lui-même ses pixels.
+
+Le nombre de processus et l'épinglage CPU sont configurables : avec
+l'épinglage, chaque processus reçoit une tranche contiguë des cœurs
+disponibles et règle ses threads TensorFlow sur leur nombre.
+
+Exemple:
+    with ProcessInferencePool(MODEL_PATH, workers=4, cpu_affinity="auto") as pool:
+        probabilities = pool.predict_proba(pixels)          # uint8 (N, 224, 224, 3)
+
+Auteur: Groupe 8
+Projet: Deep Learning - Classification des maladies des feuilles de café
+"""
+
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from inference import CLASS_NAMES, MODEL_PATH, Readiness, interpret_predictions
+from preprocessing import INPUT_SIZE, allocate_batch, normalize_into, resize_to_array
+
+logger = logging.getLogger("coffee_leaf.process_pool")
+
+# Nombre de processus d'inférence (0 = inférence dans le processus principal)
+INFERENCE_PROCESSES = int(os.environ.get("COFFEE_INFERENCE_PROCESSES", "0"))
+
+# Épinglage CPU des processus : "auto" (tranches contiguës des cœurs disponibles) ou vide
+CPU_AFFINITY = os.environ.get("COFFEE_CPU_AFFINITY") or None
+
+# Lots en vol par processus : un en calcul, un en cours de remplissage
+SLOTS_PER_WORKER = 2
+
+# Intervalle (secondes) de vérification des processus morts
+_LIVENESS_INTERVAL_S = 1.0
+
+
+def plan_affinity(workers, cpu_affinity="auto"):
+    """
+    Cœurs attribués à chaque processus.
+
+    Args:
+        workers: Nombre de processus
+        cpu_affinity: None (pas d'épinglage), "auto" (tranches contiguës des
+            cœurs disponibles) ou liste explicite d'ensembles de cœurs par processus
+
+    Returns:
+        list: Un ensemble de cœurs (ou None) par processus
+    """
+    if cpu_affinity is None:
+        return [None] * workers
+    if cpu_affinity != "auto":
+        if len(cpu_affinity) != workers:
+            raise ValueError(f"{len(cpu_affinity)} ensemble(s) de cœurs pour {workers} processus")
+        return [set(cpus) for cpus in cpu_affinity]
+
+    cpus = sorted(os.sched_getaffinity(0))
+    if workers >= len(cpus):
+        # Plus de processus que de cœurs : un cœur chacun, à tour de rôle
+        return [{cpus[i % len(cpus)]} for i in range(workers)]
+    return [set(part.tolist()) for part in np.array_split(np.array(cpus), workers)]
+
+
+def _worker_main(worker_id, model_path, options, cpus, batch_size, target_size,
+                 inputs_name, outputs_name, input_shape, output_shape, tasks, results):
+    """Boucle d'un processus d'inférence : charge le modèle puis traite les créneaux reçus."""
+    # Import local : le processus principal n'a pas besoin de TensorFlow
+    from inference import CoffeeLeafClassifier
+
+    # Ctrl+C concerne le processus principal, qui arrête le pool (voir close)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    threads = options.pop("threads", None)
+    if cpus:
+        os.sched_setaffinity(0, cpus)
+        threads = threads or len(cpus)
+    try:
+        classifier = CoffeeLeafClassifier.from_path(
+            model_path, target_size=target_size, intra_op_threads=threads, inter_op_threads=1,
+            num_threads=threads, warmup_batch_sizes=(batch_size,), **options
+        )
+    except BaseException as e:
+        results.put(("failed", worker_id, f"{type(e).__name__}: {e}"))
+        return
+
+    # Les processus lancés par spawn partagent le resource_tracker du processus principal,
+    # seul responsable de la suppression des segments (voir close)
+    inputs_segment = shared_memory.SharedMemory(name=inputs_name)
+    outputs_segment = shared_memory.SharedMemory(name=outputs_name)
+    inputs = np.ndarray(input_shape, dtype=np.uint8, buffer=inputs_segment.buf)
+    outputs = np.ndarray(output_shape, dtype=np.float32, buffer=outputs_segment.buf)
+    buffer = allocate_batch(batch_size, target_size)
+    results.put(("ready", worker_id, None))
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                return
+            slot, n = task
+            try:
+                normalize_into(inputs[slot, :n], buffer[:n])
+                outputs[slot, :n] = classifier.predict_proba(buffer[:n])
+                results.put(("done", slot, None))
+            except Exception as e:
+                results.put(("error", slot, f"{type(e).__name__}: {e}"))
+    finally:
+        del inputs, outputs
+        inputs_segment.close()
+        outputs_segment.close()
+
+
+class ProcessInferencePool:
+    """
+    Processus d'inférence alimentés par un anneau de tampons partagés.
+
+    Expose l'interface utilisée par le serveur et l'analyse en masse
+    (target_size, class_names, readiness, preprocess, predict_proba,
+    interpret) ; les lots sont des pixels uint8, non normalisés.
+    """
+
+    def __init__(self, model_path=MODEL_PATH, workers=None, batch_size=32, cpu_affinity=CPU_AFFINITY,
+                 class_names=CLASS_NAMES, target_size=INPUT_SIZE, slots_per_worker=SLOTS_PER_WORKER, **options):
+        """
+        Args:
+            model_path: Chemin du fichier de modèle
+            workers: Nombre de processus (None = COFFEE_INFERENCE_PROCESSES, ou 1)
+            batch_size: Nombre maximal d'images par créneau (par passe du modèle)
+            cpu_affinity: Épinglage CPU (voir plan_affinity)
+            class_names: Table des noms de classes (index -> nom)
+            target_size: Tuple (hauteur, largeur) attendu par le modèle
+            slots_per_worker: Lots en vol par processus
+            **options: Options de CoffeeLeafClassifier.from_path (backend...) ;
+                `threads` fixe les threads d'inférence de chaque processus
+        """
+        self.model_path = model_path
+        self.workers = workers or INFERENCE_PROCESSES or 1
+        self.batch_size = batch_size
+        self.class_names = tuple(class_names)
+        self.target_size = tuple(target_size)
+        self.affinity = plan_affinity(self.workers, cpu_affinity)
+        self.readiness = Readiness()
+        self._options = options
+        self.slots = self.workers * slots_per_worker
+        self._input_shape = (self.slots, batch_size, *self.target_size, 3)
+        self._output_shape = (self.slots, batch_size, len(self.class_names))
+        self._segments = []
+        self._processes = []
+        self._free_slots = queue.Queue()
+        # créneau -> (Future, nombre d'images) des lots en vol
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._ready_workers = 0
+        self._closed = False
+        # Motif de mise hors service (processus mort ou en échec) : submit() le lève
+        self._error = None
+        self._collector = None
+
+    def __enter__(self):
+        self.start()
+        self.wait_ready()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def start(self):
+        """
+        Alloue l'anneau de tampons et lance les processus (chargement en arrière-plan).
+
+        Returns:
+            ProcessInferencePool: self
+        """
+        self.readiness.set(Readiness.LOADING)
+        inputs = shared_memory.SharedMemory(create=True, size=int(np.prod(self._input_shape)))
+        outputs = shared_memory.SharedMemory(create=True, size=int(np.prod(self._output_shape)) * 4)
+        self._segments = [inputs, outputs]
+        self._inputs = np.ndarray(self._input_shape, dtype=np.uint8, buffer=inputs.buf)
+        self._outputs = np.ndarray(self._output_shape, dtype=np.float32, buffer=outputs.buf)
+        for slot in range(self.slots):
+            self._free_slots.put(slot)
+
+        # spawn : TensorFlow ne supporte pas fork après son initialisation
+        context = multiprocessing.get_context("spawn")
+        self._tasks = context.Queue()
+        self._results = context.Queue()
+        for worker_id, cpus in enumerate(self.affinity):
+            process = context.Process(
+                target=_worker_main, name=f"inference-{worker_id}", daemon=True,
+                args=(worker_id, self.model_path, dict(self._options), cpus, self.batch_size, self.target_size,
+                      inputs.name, outputs.name, self._input_shape, self._output_shape, self._tasks, self._results),
+            )
+            process.start()
+            self._processes.append(process)
+        self._collector = threading.Thread(target=self._collect, name="process-pool-results", daemon=True)
+        self._collector.start()
+        return self
+
+    def wait_ready(self, timeout=None):
+        """
+        Attend que tous les processus aient chargé le modèle.
+
+        Args:
+            timeout: Attente maximale en secondes (None = illimitée)
+
+        Raises:
+            RuntimeError: Si un processus n'a pas pu charger le modèle
+            TimeoutError: Si le délai est dépassé
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.readiness.is_ready():
+            snapshot = self.readiness.snapshot()
+            if snapshot["status"] == Readiness.FAILED:
+                raise RuntimeError(f"Échec du chargement du pool d'inférence : {snapshot['error']}")
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError("Pool d'inférence non prêt")
+            time.sleep(0.05)
+        return self
+
+    def _fail_all(self, error):
+        """Met le pool hors service : échoue les lots en vol et rend leurs créneaux."""
+        with self._lock:
+            self._error = self._error or error
+            in_flight, self._in_flight = self._in_flight, {}
+        for slot, (future, _) in in_flight.items():
+            future.set_exception(RuntimeError(error))
+            # Réveille les submit() en attente d'un créneau : ils lèvent l'erreur
+            self._free_slots.put(slot)
+
+    def _collect(self):
+        """Thread de réception : résout les Futures et libère les créneaux."""
+        while True:
+            try:
+                kind, key, error = self._results.get(timeout=_LIVENESS_INTERVAL_S)
+            except queue.Empty:
+                if self._closed:
+                    return
+                dead = [p.name for p in self._processes if not p.is_alive()]
+                if dead:
+                    message = f"Processus d'inférence arrêté(s) : {', '.join(dead)}"
+                    logger.error(message)
+                    self.readiness.set(Readiness.FAILED, message)
+                    self._fail_all(message)
+                    return
+                continue
+            except (EOFError, OSError):
+                return
+
+            if kind == "stop":
+                # Signal de close() : tous les résultats des processus sont déjà traités
+                return
+            if kind == "ready":
+                self._ready_workers += 1
+                logger.info("Processus d'inférence %d prêt (cœurs %s)", key, self.affinity[key] or "non épinglés")
+                if self._ready_workers == self.workers:
+                    self.readiness.set(Readiness.READY)
+            elif kind == "failed":
+                logger.error("Processus d'inférence %d : %s", key, error)
+                self.readiness.set(Readiness.FAILED, error)
+                self._fail_all(error)
+            else:
+                with self._lock:
+                    entry = self._in_flight.pop(key, None)
+                if entry is None:
+                    # Lot déjà échoué par _fail_all, créneau déjà rendu
+                    continue
+                future, n = entry
+                if kind == "done":
+                    # Copie avant de libérer le créneau pour un autre lot
+                    future.set_result(self._outputs[key, :n].copy())
+                else:
+                    future.set_exception(RuntimeError(error))
+                self._free_slots.put(key)
+
+    def submit(self, pixels):
+        """
+        Envoie un lot de pixels aux processus.
+
+        Attend un créneau libre si tous les créneaux sont en vol (contre-pression).
+        Un pool hors service (processus mort ou en échec) lève une erreur au
+        lieu d'attendre.
+
+        Args:
+            pixels: numpy.ndarray uint8 de forme (N, hauteur, largeur, 3), N <= batch_size
+
+        Returns:
+            concurrent.futures.Future: Résolu avec les probabilités (N, nombre de classes)
+
+        Raises:
+            RuntimeError: Si le pool est fermé ou hors service
+        """
+        if self._closed:
+            raise RuntimeError("Le pool d'inférence est fermé")
+        if pixels.dtype != np.uint8:
+            raise TypeError(f"Pixels uint8 attendus, reçu {pixels.dtype}")
+        n = len(pixels)
+        if not 1 <= n <= self.batch_size:
+            raise ValueError(f"Lot de {n} image(s) : entre 1 et {self.batch_size} par créneau")
+
+        slot = self._free_slots.get()
+        future = Future()
+        with self._lock:
+            error = self._error
+            if error is None:
+                self._in_flight[slot] = (future, n)
+        if error is not None:
+            # Créneau rendu pour réveiller le submit() suivant, qui lève à son tour
+            self._free_slots.put(slot)
+            raise RuntimeError(f"Pool d'inférence hors service : {error}")
+        self._inputs[slot, :n] = pixels
+        self._tasks.put((slot, n))
+        return future
+
+    def predict_proba(self, pixels):
+        """
+        Probabilités d'un lot de pixels uint8, découpé en créneaux (bloquant).
+
+        Args:
+            pixels: numpy.ndarray uint8 de forme (N, hauteur, largeur, 3)
+
+        Returns:
+            numpy.ndarray: Probabilités de forme (N, nombre de classes)
+        """
+        futures = [self.submit(pixels[start:start + self.batch_size])
+                   for start in range(0, len(pixels), self.batch_size)]
+        return np.concatenate([future.result() for future in futures])
+
+    def preprocess(self, image):
+        """
+        Pixels uint8 d'une image PIL pour le pool (la normalisation a lieu dans les processus).
+
+        Returns:
+            numpy.ndarray: Pixels de forme (1, hauteur, largeur, 3)
+        """
+        return resize_to_array(image, self.target_size)[np.newaxis]
+
+    def interpret(self, probabilities):
+        """Diagnostic hiérarchique à partir d'un vecteur de probabilités (voir CoffeeLeafClassifier.interpret)."""
+        return interpret_predictions(probabilities, self.class_names)
+
+    def close(self, timeout=10.0):
+        """Arrête les processus et libère la mémoire partagée."""
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._processes:
+            self._tasks.put(None)
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        # Le thread de réception s'arrête avant la libération des tampons qu'il copie
+        # (il est déjà arrêté si un processus est mort)
+        if self._collector is not None and self._collector.is_alive():
+            self._results.put(("stop", None, None))
+            self._collector.join(timeout)
+        if self._processes:
+            # Un processus tué peut garder le verrou d'une file : ne pas attendre
+            # l'envoi des messages restants à la sortie de l'interpréteur
+            self._tasks.cancel_join_thread()
+            self._results.cancel_join_thread()
+        self._fail_all("Le pool d'inférence est fermé")
+        self._inputs = self._outputs = None
+        for segment in self._segments:
+            segment.close()
+            segment.unlink()
+        self._segments = []
@@ -0,0 +1,388 @@
+"""
+Registre des Modèles - Feuilles de Café
+=======================================
+Découverte des modèles du dossier `mes models`, chargement à la demande et
+remplacement à chaud.
+
+- Au plus `max_resident` modèles (et `max_bytes` octets) restent en mémoire ;
+  au-delà, le moins récemment utilisé est évincé.
+- Quand le fichier d'un modèle est remplacé sur le disque, la nouvelle
+  version est chargée à côté de l'ancienne puis la remplace d'un coup, sans
+  redémarrer le serveur. Les requêtes en cours (voir `lease`) terminent sur
+  l'ancienne version, libérée après la dernière d'entre elles.
+
+Exemple:
+    registry = ModelRegistry("mes models", max_resident=2)
+    with registry.lease("MODELE_EXPERT_6CLASSES") as classifier:
+        statut, pathologie, confiance, probas, idx = classifier.predict(image)
+
+Auteur: Groupe 8
+Projet: Deep Learning - Classification des maladies des feuilles de café
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from inference import MODEL_PATH, CoffeeLeafClassifier
+
+# Dossier des modèles (celui du modèle par défaut)
+MODEL_DIR = os.path.dirname(MODEL_PATH) or "."
+
+# Nombre maximal de modèles chargés simultanément (surchargeable par COFFEE_MAX_MODELS)
+MAX_RESIDENT_MODELS = int(os.environ.get("COFFEE_MAX_MODELS", "2"))
+
+# Mémoire maximale des modèles chargés en Mo (COFFEE_MAX_MODEL_MB, vide = illimitée)
+MAX_RESIDENT_BYTES = (
+    int(float(os.environ["COFFEE_MAX_MODEL_MB"]) * 1024 * 1024) if os.environ.get("COFFEE_MAX_MODEL_MB") else None
+)
+
+# Artefacts du dossier qui ne sont pas des classifieurs 6 classes
+NON_CLASSIFIER_MODELS = ("autoencoder_coffee",)
+
+logger = logging.getLogger("coffee_leaf.registry")
+
+
+def model_name(path):
+    """
+    Nom d'un modèle dans le registre : le nom du fichier sans extension.
+
+    Args:
+        path: Chemin du fichier de modèle
+
+    Returns:
+        str: Nom du modèle
+    """
+    return os.path.splitext(os.path.basename(os.path.normpath(path)))[0]
+
+
+def disk_size(path):
+    """
+    Taille d'un modèle sur le disque (fichier ou dossier SavedModel).
+
+    Args:
+        path: Chemin du modèle
+
+    Returns:
+        int: Taille en octets
+    """
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    return sum(
+        os.path.getsize(os.path.join(root, file_name))
+        for root, _, file_names in os.walk(path)
+        for file_name in file_names
+    )
+
+
+def _signature(path):
+    """Signature (date de modification, taille) d'un fichier de modèle."""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _safe_signature(path):
+    """Signature d'un fichier de modèle, None s'il est momentanément absent."""
+    try:
+        return _signature(path)
+    except OSError:
+        return None
+
+
+class ModelVersion:
+    """Une version chargée d'un modèle, avec ses requêtes en cours."""
+
+    def __init__(self, name, path, signature, model, footprint):
+        self.name = name
+        self.path = path
+        self.signature = signature
+        self.model = model
+        self.footprint = footprint
+        self.loaded_at = time.time()
+        self.checked_at = time.monotonic()
+        self.in_flight = 0
+        self.retired = False
+
+
+class ModelRegistry:
+    """
+    Registre thread-safe des modèles d'un dossier.
+
+    Les chargements se font hors du verrou principal : un modèle en cours de
+    chargement ne bloque ni les prédictions des autres modèles, ni celles de
+    sa version précédente.
+    """
+
+    def __init__(self, directory=MODEL_DIR, factory=CoffeeLeafClassifier.from_path,
+                 max_resident=MAX_RESIDENT_MODELS, max_bytes=MAX_RESIDENT_BYTES,
+                 check_interval_s=2.0, extensions=(".keras",), exclude=()):
+        """
+        Args:
+            directory: Dossier des modèles
+            factory: Fonction chemin -> modèle chargé
+            max_resident: Nombre maximal de modèles en mémoire
+            max_bytes: Empreinte mémoire maximale des modèles (None = illimitée)
+            check_interval_s: Intervalle minimal entre deux vérifications du fichier d'un modèle
+            extensions: Extensions des fichiers découverts
+            exclude: Noms de modèles à ignorer
+        """
+        self.directory = directory
+        self.factory = factory
+        self.max_resident = max(1, max_resident)
+        self.max_bytes = max_bytes
+        self.check_interval_s = check_interval_s
+        self.extensions = tuple(extensions)
+        self.exclude = set(exclude)
+        self.loads = 0
+        self.swaps = 0
+        self.evictions = 0
+        # Versions courantes, de la moins à la plus récemment utilisée
+        self._versions = OrderedDict()
+        # Versions remplacées ou évincées encore utilisées par des requêtes
+        self._retired = []
+        self._lock = threading.Lock()
+        self._load_locks = {}
+
+    def discover(self):
+        """
+        Liste les modèles présents dans le dossier.
+
+        Returns:
+            dict: Nom du modèle -> chemin, trié par nom
+        """
+        if not os.path.isdir(self.directory):
+            return {}
+        models = {}
+        for entry in sorted(os.listdir(self.directory)):
+            if entry.lower().endswith(self.extensions) and model_name(entry) not in self.exclude:
+                models[model_name(entry)] = os.path.join(self.directory, entry)
+        return models
+
+    def names(self):
+        """Noms des modèles disponibles (découverts ou déjà chargés)."""
+        with self._lock:
+            loaded = list(self._versions)
+        return sorted(set(self.discover()) | set(loaded))
+
+    def _path(self, name):
+        with self._lock:
+            version = self._versions.get(name)
+        if version is not None:
+            return version.path
+        path = self.discover().get(name)
+        if path is None:
+            raise KeyError(f"Modèle inconnu : {name} (disponibles : {', '.join(self.names()) or 'aucun'})")
+        return path
+
+    def _is_stale(self, version):
+        """Indique si le fichier du modèle a changé depuis son chargement (appelé sous verrou)."""
+        now = time.monotonic()
+        if now - version.checked_at < self.check_interval_s:
+            return False
+        version.checked_at = now
+        # Fichier momentanément absent (copie en cours) : on garde la version chargée
+        signature = _safe_signature(version.path)
+        return signature is not None and signature != version.signature
+
+    def _current(self, name):
+        """Version courante à servir, ou None s'il faut (re)charger (appelé sous verrou)."""
+        version = self._versions.get(name)
+        if version is None:
+            return None
+        # Pendant le chargement d'une nouvelle version, l'ancienne continue de servir
+        load_lock = self._load_locks.get(name)
+        reloading = load_lock is not None and load_lock.locked()
+        if not reloading and self._is_stale(version):
+            return None
+        self._versions.move_to_end(name)
+        return version
+
+    def _acquire(self, name, lease=False):
+        with self._lock:
+            version = self._current(name)
+            if version is not None:
+                version.in_flight += lease
+                return version
+
+        # Un seul chargement à la fois par modèle ; les autres modèles restent disponibles
+        with self._lock:
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+        with load_lock:
+            # Un autre thread a peut-être chargé la nouvelle version pendant l'attente
+            with self._lock:
+                version = self._versions.get(name)
+                signature = _safe_signature(version.path) if version is not None else None
+                if version is not None and signature in (None, version.signature):
+                    self._versions.move_to_end(name)
+                    version.in_flight += lease
+                    return version
+
+            version = self._load(name, self._path(name))
+            with self._lock:
+                version.in_flight += lease
+                self._install(version)
+            return version
+
+    def _load(self, name, path):
+        signature = _signature(path)
+        start = time.perf_counter()
+        model = self.factory(path)
+        footprint = _footprint(model, path)
+        logger.info("Modèle %s chargé en %.2fs (%.1f Mo)", name, time.perf_counter() - start, footprint / 2**20)
+        self.loads += 1
+        return ModelVersion(name, path, signature, model, footprint)
+
+    def _install(self, version):
+        """Publie une version et évince les modèles en trop (appelé sous verrou)."""
+        previous = self._versions.pop(version.name, None)
+        self._versions[version.name] = version
+        if previous is not None and previous is not version:
+            self.swaps += 1
+            logger.info("Modèle %s remplacé à chaud (%d requête(s) en cours sur l'ancienne version)",
+                        version.name, previous.in_flight)
+            self._retire(previous)
+
+        while len(self._versions) > 1 and (
+            len(self._versions) > self.max_resident
+            or (self.max_bytes is not None and self.resident_bytes() > self.max_bytes)
+        ):
+            _, evicted = self._versions.popitem(last=False)
+            self.evictions += 1
+            logger.info("Modèle %s évincé (%.1f Mo)", evicted.name, evicted.footprint / 2**20)
+            self._retire(evicted)
+
+    def _retire(self, version):
+        version.retired = True
+        if version.in_flight:
+            self._retired.append(version)
+
+    def _release(self, version):
+        with self._lock:
+            version.in_flight -= 1
+            if version.retired and not version.in_flight and version in self._retired:
+                self._retired.remove(version)
+
+    def resident_bytes(self):
+        """Empreinte mémoire des versions courantes et des versions retirées encore utilisées."""
+        return sum(v.footprint for v in self._versions.values()) + sum(v.footprint for v in self._retired)
+
+    def get(self, name):
+        """
+        Renvoie la version courante d'un modèle, chargée si nécessaire.
+
+        Si le fichier a changé sur le disque, la nouvelle version est chargée
+        et remplace l'ancienne.
+
+        Args:
+            name: Nom du modèle (voir discover)
+
+        Returns:
+            object: Modèle chargé par `factory`
+
+        Raises:
+            KeyError: Si aucun modèle ne porte ce nom
+        """
+        return self._acquire(name).model
+
+    @contextmanager
+    def lease(self, name):
+        """
+        Emprunte un modèle pour la durée d'une requête.
+
+        Un remplacement à chaud ou une éviction pendant l'emprunt n'affecte
+        pas la requête : elle termine sur la version empruntée.
+
+        Args:
+            name: Nom du modèle
+
+        Yields:
+            object: Modèle chargé par `factory`
+        """
+        version = self._acquire(name, lease=True)
+        try:
+            yield version.model
+        finally:
+            self._release(version)
+
+    def adopt(self, name, model, path=None):
+        """
+        Enregistre un modèle déjà chargé (par ex. en arrière-plan au démarrage).
+
+        Args:
+            name: Nom du modèle
+            model: Modèle chargé
+            path: Chemin de son fichier (par défaut `model.model_path`)
+        """
+        path = path or model.model_path
+        version = ModelVersion(name, path, _signature(path), model, _footprint(model, path))
+        with self._lock:
+            self._install(version)
+
+    def reload(self, name):
+        """
+        Force le rechargement d'un modèle depuis le disque (remplacement à chaud).
+
+        Args:
+            name: Nom du modèle
+
+        Returns:
+            object: Nouvelle version du modèle
+        """
+        with self._lock:
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+        with load_lock:
+            version = self._load(name, self._path(name))
+            with self._lock:
+                self._install(version)
+        return version.model
+
+    def evict(self, name):
+        """
+        Décharge un modèle ; les requêtes en cours terminent normalement.
+
+        Args:
+            name: Nom du modèle
+        """
+        with self._lock:
+            version = self._versions.pop(name, None)
+            if version is not None:
+                self.evictions += 1
+                self._retire(version)
+
+    def stats(self):
+        """
+        Renvoie l'état du registre.
+
+        Returns:
+            dict: Modèles résidents (du moins au plus récemment utilisé),
+            versions retirées encore utilisées, mémoire et compteurs
+        """
+        with self._lock:
+            return {
+                "resident": [
+                    {
+                        "name": v.name,
+                        "path": v.path,
+                        "footprint_mb": v.footprint / 2**20,
+                        "in_flight": v.in_flight,
+                        "loaded_at": v.loaded_at,
+                    }
+                    for v in self._versions.values()
+                ],
+                "retired_in_flight": sum(v.in_flight for v in self._retired),
+                "resident_mb": self.resident_bytes() / 2**20,
+                "max_resident": self.max_resident,
+                "loads": self.loads,
+                "swaps": self.swaps,
+                "evictions": self.evictions,
+            }
+
+
+def _footprint(model, path):
+    """Empreinte mémoire d'un modèle chargé, à défaut sa taille sur le disque."""
+    memory_bytes = getattr(model, "memory_bytes", None)
+    footprint = memory_bytes() if callable(memory_bytes) else None
+    return footprint if footprint is not None else disk_size(path)
@@ -0,0 +1,378 @@
+"""
+Rendu des Résultats - Feuilles de Café
+======================================
+Tables statiques de l'interface (libellés des classes, fiches des
+pathologies, recommandations) et fragments HTML précompilés une fois à
+l'import : l'affichage d'un diagnostic ne fait plus qu'assembler des
+chaînes déjà prêtes au lieu de reconstruire dictionnaires et f-strings à
+chaque exécution du script.
+
+Le rapport d'une analyse par lot est rendu en un seul tableau HTML (un seul
+`st.markdown`), quel que soit le nombre de feuilles.
+
+Auteur: Groupe 8
+Projet: Deep Learning - Classification des maladies des feuilles de café
+"""
+
+import html
+import os
+import re
+from types import MappingProxyType
+
+from ood import OUT_OF_DISTRIBUTION
+
+# Feuille de style de l'interface (chargée et compactée une fois, voir APP_STYLE)
+STYLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "style.css")
+
+
+def _frozen(**fields):
+    """Fiche immuable (dictionnaire en lecture seule)."""
+    return MappingProxyType(fields)
+
+
+# Libellés affichés des classes (index -> libellé)
+CLASS_LABELS = (
+    'Healthy (Saine)',
+    'Red Spider Mite (Acarien Rouge)',
+    'Rust Level 1 (Rouille Niveau 1)',
+    'Rust Level 2 (Rouille Niveau 2)',
+    'Rust Level 3 (Rouille Niveau 3)',
+    'Rust Level 4 (Rouille Niveau 4)',
+)
+
+# Caractéristiques de chaque pathologie
+PATHOLOGY_INFO = MappingProxyType({
+    'Red Spider Mite': _frozen(
+        icon='🕷️',
+        color='#f7971e',
+        severity='Modérée',
+        description='Acarien rouge (Oligonychus coffeae)',
+        symptoms='Points jaunes sur les feuilles, toiles fines, dessèchement',
+    ),
+    'Rust Level 1': _frozen(
+        icon='🟡',
+        color='#ffd93d',
+        severity='Légère',
+        description='Rouille du caféier - Stade précoce',
+        symptoms='Petites taches chlorotiques jaunes sur la face supérieure',
+    ),
+    'Rust Level 2': _frozen(
+        icon='🟠',
+        color='#ff9800',
+        severity='Moyenne',
+        description='Rouille du caféier - Stade intermédiaire',
+        symptoms='Pustules orangées visibles, lésions plus nombreuses',
+    ),
+    'Rust Level 3': _frozen(
+        icon='🔴',
+        color='#ff5722',
+        severity='Sévère',
+        description='Rouille du caféier - Stade avancé',
+        symptoms='Taches nombreuses et confluentes, défoliation partielle',
+    ),
+    'Rust Level 4': _frozen(
+        icon='🚨',
+        color='#d32f2f',
+        severity='Critique',
+        description='Rouille du caféier - Stade critique',
+        symptoms='Défoliation sévère, perte massive de feuilles, danger pour la plante',
+    ),
+})
+
+# Fiche d'une pathologie absente de PATHOLOGY_INFO
+DEFAULT_PATHOLOGY = _frozen(
+    icon='🦠',
+    color='#f45c43',
+    severity='Variable',
+    description='Pathologie détectée',
+    symptoms='À surveiller',
+)
+
+# Recommandations d'actions selon le diagnostic
+RECOMMENDATIONS = MappingProxyType({
+    'Healthy': _frozen(
+        color='#38ef7d',
+        icon='✅',
+        title='Feuille Saine Détectée',
+        actions=(
+            '<strong>Surveillance préventive:</strong> Continuez les pratiques agricoles actuelles',
+            '<strong>Contrôle régulier:</strong> Inspectez les plants chaque semaine',
+            '<strong>Nutrition:</strong> Maintenez un programme de fertilisation équilibré',
+            '<strong>Prophylaxie:</strong> Appliquez des traitements préventifs si nécessaire',
+            "<strong>Documentation:</strong> Notez l'état actuel pour référence future",
+        ),
+    ),
+    'Red Spider Mite': _frozen(
+        color='#f7971e',
+        icon='🕷️',
+        title='Acarien Rouge Détecté',
+        actions=(
+            '<strong>Action immédiate:</strong> Isoler les plants infectés',
+            '<strong>Traitement acaricide:</strong> Appliquer un acaricide spécifique (ex: abamectine, spiromesifen)',
+            '<strong>Contrôle biologique:</strong> Introduire des prédateurs naturels (acariens prédateurs)',
+            "<strong>Gestion environnementale:</strong> Augmenter l'humidité relative (> 70%)",
+            '<strong>Éviter:</strong> La sur-fertilisation azotée qui favorise les acariens',
+            '<strong>Monitoring:</strong> Surveiller hebdomadairement avec des loupes',
+            '<strong>Prévention:</strong> Éliminer les mauvaises herbes environnantes',
+        ),
+    ),
+    'Rust Level 1': _frozen(
+        color='#ffd93d',
+        icon='🟡',
+        title='Rouille Niveau 1 - Intervention Précoce',
+        actions=(
+            '<strong>Chance de contrôle:</strong> Excellent! Intervention au stade précoce',
+            '<strong>Fongicide systémique:</strong> Appliquer triazole ou strobilurine',
+            '<strong>Action rapide:</strong> Traiter sous 48h pour éviter la progression',
+            '<strong>Élimination:</strong> Retirer et brûler les feuilles légèrement affectées',
+            "<strong>Espacement:</strong> Améliorer la circulation d'air entre les plants",
+            '<strong>Nutrition:</strong> Renforcer avec potassium et micronutriments',
+            '<strong>Surveillance:</strong> Inspections quotidiennes pendant 2 semaines',
+        ),
+    ),
+    'Rust Level 2': _frozen(
+        color='#ff9800',
+        icon='🟠',
+        title='Rouille Niveau 2 - Action Urgente Requise',
+        actions=(
+            '<strong>Urgence:</strong> Traitement fongicide dans les 24h',
+            '<strong>Protocole intensif:</strong> Fongicide à base de cuivre + triazole',
+            '<strong>Double application:</strong> Répéter le traitement après 10-14 jours',
+            '<strong>Défoliation ciblée:</strong> Enlever les feuilles moyennement à fortement infectées',
+            '<strong>Quarantaine:</strong> Isoler immédiatement la zone affectée',
+            "<strong>Réduire humidité:</strong> Éviter l'irrigation par aspersion",
+            '<strong>Consultation:</strong> Faire appel à un phytopathologiste',
+            '<strong>Traçabilité:</strong> Cartographier les zones infectées',
+        ),
+    ),
+    'Rust Level 3': _frozen(
+        color='#ff5722',
+        icon='🔴',
+        title='Rouille Niveau 3 - Situation Critique',
+        actions=(
+            "<strong>⚠️ ALERTE CRITIQUE:</strong> Intervention d'urgence requise",
+            '<strong>Traitement agressif:</strong> Fongicide systémique à dose maximale',
+            '<strong>Applications fréquentes:</strong> Traiter tous les 7 jours pendant 1 mois',
+            "<strong>Défoliation majeure:</strong> Retirer jusqu'à 60% des feuilles infectées",
+            '<strong>Tailler:</strong> Élaguer les branches fortement atteintes',
+            '<strong>Zone tampon:</strong> Traiter aussi les plants dans un rayon de 10m',
+            "<strong>Mesures drastiques:</strong> Envisager l'arrachage des plants les plus atteints",
+            "<strong>Expert obligatoire:</strong> Consultation immédiate d'un agronome",
+            '<strong>Perte de rendement:</strong> Prévoir 30-50% de baisse de production',
+        ),
+    ),
+    'Rust Level 4': _frozen(
+        color='#d32f2f',
+        icon='🚨',
+        title='Rouille Niveau 4 - URGENCE MAXIMALE',
+        actions=(
+            '<strong>🚨 DANGER IMMINENT:</strong> Risque de perte totale du plant',
+            '<strong>Décision urgente:</strong> Évaluer viabilité du plant (< 30% feuilles saines = arracher)',
+            '<strong>Si maintien:</strong> Traitement fongicide + nutritionnel intensif',
+            '<strong>Défoliation complète:</strong> Retirer TOUTES les feuilles infectées',
+            '<strong>Taille sévère:</strong> Rabattre au niveau du tronc si nécessaire',
+            '<strong>Quarantaine stricte:</strong> Isoler avec barrière physique',
+            '<strong>Protection zone saine:</strong> Traiter préventivement tous les plants dans 20m',
+            '<strong>Désinfection:</strong> Désinfecter tous les outils après usage',
+            "<strong>Arrachage possible:</strong> Détruire le plant si l'infection progresse",
+            '<strong>Réglementation:</strong> Déclarer aux autorités phytosanitaires si requis',
+            '<strong>Perte économique:</strong> Anticiper perte de 70-100% du rendement',
+        ),
+    ),
+})
+
+# Recommandations d'une pathologie absente de RECOMMENDATIONS
+DEFAULT_RECOMMENDATION = _frozen(
+    color='#f45c43',
+    icon='⚠️',
+    title='Feuille Malade Détectée',
+    actions=(
+        '<strong>Action immédiate:</strong> Isoler les plants affectés',
+        'Consulter un agronome spécialisé',
+        'Analyser les conditions environnementales',
+        'Surveiller la propagation',
+    ),
+)
+
+# Couleur du diagnostic principal (barre de confiance)
+STATUS_COLORS = MappingProxyType({True: "#38ef7d", False: "#f45c43"})
+
+
+def _compact(fragment):
+    """
+    Supprime l'indentation d'un fragment HTML (évite les blocs de code Markdown).
+
+    Les lignes sont jointes par une espace, comme le navigateur le fait du
+    saut de ligne : le texte de deux éléments en ligne voisins reste séparé.
+    """
+    return " ".join(line.strip() for line in fragment.splitlines() if line.strip())
+
+
+def _diagnostic_card(is_healthy):
+    if is_healthy:
+        badge_class, icon, status_text = "healthy-badge", "✅", "FEUILLE SAINE"
+        message = "La feuille analysée est en bonne santé. Aucune pathologie détectée."
+    else:
+        badge_class, icon, status_text = "unhealthy-badge", "⚠️", "FEUILLE MALADE"
+        message = "La feuille présente des signes de maladie."
+    return _compact(f"""
+        <div class="result-card">
+            <h2 style="text-align: center; margin-bottom: 1rem;">{icon} Diagnostic Principal</h2>
+            <div style="text-align: center;">
+                <span class="status-badge {badge_class}">{status_text}</span>
+            </div>
+            <p style="text-align: center; font-size: 1.1rem; color: #666; margin-top: 1rem;">
+                {message}
+            </p>
+        </div>
+    """)
+
+
+def _pathology_card(name, info):
+    return _compact(f"""
+        <div class="result-card" style="border-left: 5px solid {info['color']};">
+            <h3 style="color: {info['color']}; margin-top: 0;">
+                {info['icon']} Pathologie Identifiée
+            </h3>
+            <div style="background: rgba(255,255,255,0.5); padding: 1.5rem; border-radius: 12px; margin: 1rem 0;">
+                <h4 style="color: #333; margin-top: 0;">{html.escape(name)}</h4>
+                <p style="color: #666; margin: 0.5rem 0;">
+                    <strong>Description:</strong> {info['description']}
+                </p>
+                <p style="color: #666; margin: 0.5rem 0;">
+                    <strong>Symptômes:</strong> {info['symptoms']}
+                </p>
+                <p style="color: #666; margin: 0.5rem 0;">
+                    <strong>Niveau de sévérité:</strong>
+                    <span style="background: {info['color']}; color: white; padding: 0.2rem 0.8rem; border-radius: 20px; font-weight: 600;">
+                        {info['severity']}
+                    </span>
+                </p>
+            </div>
+        </div>
+    """)
+
+
+def _recommendation_card(reco, border=True):
+    style = f' style="border-left: 5px solid {reco["color"]};"' if border else ""
+    actions_html = "".join(f"<li>{action}</li>" for action in reco["actions"])
+    return _compact(f"""
+        <div class="instruction-card"{style}>
+            <h4 style="color: {reco['color']}; margin-top: 0;">{reco['icon']} {reco['title']}</h4>
+            <ul>{actions_html}</ul>
+        </div>
+    """)
+
+
+# Fragments précompilés
+DIAGNOSTIC_CARDS = MappingProxyType({is_healthy: _diagnostic_card(is_healthy) for is_healthy in (True, False)})
+PATHOLOGY_CARDS = MappingProxyType({name: _pathology_card(name, info) for name, info in PATHOLOGY_INFO.items()})
+RECOMMENDATION_CARDS = MappingProxyType({
+    name: _recommendation_card(reco, border=name != 'Healthy') for name, reco in RECOMMENDATIONS.items()
+})
+_DEFAULT_RECOMMENDATION_CARD = _recommendation_card(DEFAULT_RECOMMENDATION)
+
+_CONFIDENCE_CARD = _compact("""
+    <div class="result-card">
+        <h3>🎯 Niveau de Confiance</h3>
+        <div class="confidence-bar">
+            <div class="confidence-fill" style="width: {confidence}%; background: linear-gradient(90deg, {color} 0%, {color} 100%);">
+                {confidence:.1f}%
+            </div>
+        </div>
+        <p style="text-align: center; color: #666; margin-top: 0.5rem;">
+            Le modèle est confiant à <strong>{confidence:.1f}%</strong> dans ce diagnostic.
+        </p>
+    </div>
+""")
+
+
+def pathology_card(name):
+    """Carte HTML « Pathologie Identifiée » d'une pathologie."""
+    card = PATHOLOGY_CARDS.get(name)
+    return card if card is not None else _pathology_card(name, DEFAULT_PATHOLOGY)
+
+
+def recommendation_card(name):
+    """
+    Carte HTML des recommandations d'actions.
+
+    Args:
+        name: 'Healthy' ou nom de la pathologie identifiée
+
+    Returns:
+        str: Fragment HTML précompilé
+    """
+    return RECOMMENDATION_CARDS.get(name, _DEFAULT_RECOMMENDATION_CARD)
+
+
+def confidence_card(confidence, is_healthy):
+    """Carte HTML de la barre de confiance (confiance entre 0 et 100)."""
+    return _CONFIDENCE_CARD.format(confidence=confidence, color=STATUS_COLORS[is_healthy])
+
+
+# Cellules du rapport par lot, précompilées par statut et par pathologie
+_STATUS_CELLS = MappingProxyType({
+    "Healthy": '<td><span class="report-badge" style="background: #38ef7d;">✅ Saine</span></td>',
+    "Unhealthy": '<td><span class="report-badge" style="background: #f45c43;">⚠️ Malade</span></td>',
+    OUT_OF_DISTRIBUTION: f'<td><span class="report-badge" style="background: #888;">🚫 {OUT_OF_DISTRIBUTION}</span></td>',
+})
+_ERROR_CELL = '<td><span class="report-badge" style="background: #555;">❌ Erreur</span></td>'
+_PATHOLOGY_CELLS = MappingProxyType({
+    name: f'<td style="color: {info["color"]}; font-weight: 600;">{info["icon"]} {html.escape(name)}</td>'
+    for name, info in PATHOLOGY_INFO.items()
+})
+_EMPTY_CELL = "<td>-</td>"
+_REPORT_HEADER = (
+    '<div class="batch-report"><table>'
+    "<thead><tr><th>Image</th><th>Statut</th><th>Pathologie</th><th>Confiance (%)</th></tr></thead><tbody>"
+)
+_REPORT_FOOTER = "</tbody></table></div>"
+
+
+def batch_report_html(file_names, results):
+    """
+    Rapport d'une analyse par lot en un seul tableau HTML.
+
+    Args:
+        file_names: Noms des fichiers analysés
+        results: Tuples (statut_principal, pathologie_specifique, confiance, ...) renvoyés par predict_diseases
+
+    Returns:
+        str: Tableau HTML (une ligne par image) pour un unique st.markdown
+    """
+    rows = []
+    for file_name, (statut_principal, pathologie_specifique, confidence, _, _) in zip(file_names, results):
+        pathology = _PATHOLOGY_CELLS.get(pathologie_specifique) if pathologie_specifique else _EMPTY_CELL
+        rows.append(
+            f"<tr><td>{html.escape(file_name)}</td>"
+            f"{_STATUS_CELLS.get(statut_principal, _ERROR_CELL)}"
+            f"{pathology or f'<td>{html.escape(pathologie_specifique)}</td>'}"
+            f"<td>{'-' if confidence is None else f'{float(confidence):.1f}'}</td></tr>"
+        )
+    return _REPORT_HEADER + "".join(rows) + _REPORT_FOOTER
+
+
+def _minify_css(css):
+    """Retire commentaires et espaces superflus d'une feuille de style."""
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.DOTALL)
+    css = re.sub(r"\s+", " ", css)
+    return re.sub(r"\s*([{};,>])\s*", r"\1", css).strip()
+
+
+def load_app_style(path=STYLE_PATH):
+    """
+    Feuille de style de l'interface, compactée, prête pour st.markdown.
+
+    Args:
+        path: Chemin du fichier CSS
+
+    Returns:
+        str: Balise <style> à injecter à chaque exécution du script
+    """
+    with open(path, encoding="utf-8") as f:
+        return f"<style>{_minify_css(f.read())}</style>"
+
+
+# Balise <style> de l'interface, lue une fois par processus
+APP_STYLE = load_app_style()
@@ -0,0 +1,468 @@
+"""
+Analyse en Masse - Feuilles de Café
+===================================
+Outil en ligne de commande qui parcourt un dossier, une archive zip ou une
+archive tar de photos de feuilles et écrit une ligne JSONL ou CSV par image
+(probabilités des 6 classes, classe prédite, confiance).
+
+Le décodage/redimensionnement (pool de threads) et l'inférence (par lots)
+sont pipelinés à travers une file de préchargement bornée : la mémoire reste
+constante quel que soit le nombre d'images.
+
+Avec --processes, l'inférence est répartie entre plusieurs processus qui
+reçoivent les pixels par mémoire partagée (voir process_pool.py).
+
+Avec --save-store, les pixels décodés sont aussi conservés dans un magasin
+de tenseurs (voir tensor_store.py) ; --from-store réanalyse ensuite ce
+magasin (par exemple avec un nouveau modèle) sans décoder aucun JPEG.
+
+Usage:
+    python score_bulk.py photos/ -o resultats.jsonl
+    python score_bulk.py parcelle_12.zip -o resultats.csv --batch-size 64 --decode-threads 8
+    python score_bulk.py photos/ -o resultats.jsonl --processes 8 --cpu-affinity auto --decode-threads 16
+    python score_bulk.py archive/ -o resultats.csv --save-store magasin/
+    python score_bulk.py --from-store magasin/ -o resultats_v2.csv --model nouveau_modele.keras
+
+Auteur: Groupe 8
+Projet: Deep Learning - Classification des maladies des feuilles de café
+"""
+
+import argparse
+import csv
+import json
+import os
+import queue
+import sys
+import tarfile
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from inference import MODEL_PATH, CoffeeLeafClassifier
+from preprocessing import allocate_batch, normalize_into, open_image, resize_to_array
+from process_pool import CPU_AFFINITY, INFERENCE_PROCESSES, ProcessInferencePool
+from tensor_store import DEFAULT_SHARD_SIZE, TensorStore
+
+# Extensions d'images acceptées (identiques à l'interface Streamlit)
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+# Marqueur de fin de flux dans la file de préchargement
+_END = object()
+
+
+def is_image_name(name):
+    """Indique si un nom de fichier correspond à une image supportée."""
+    return name.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def iter_sources(path):
+    """
+    Énumère les images d'un dossier, d'un zip ou d'un tar.
+
+    Les membres d'archive sont lus ici, séquentiellement (zipfile et tarfile
+    ne supportent pas les lectures concurrentes) ; les fichiers d'un dossier
+    sont lus plus tard par le pool de décodage.
+
+    Args:
+        path: Dossier, fichier .zip ou archive tar (.tar, .tar.gz, .tgz, ...)
+
+    Yields:
+        tuple: (nom, source) où source est un chemin ou des octets
+    """
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for file_name in sorted(files):
+                if is_image_name(file_name):
+                    yield os.path.join(root, file_name), os.path.join(root, file_name)
+    elif zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and is_image_name(info.filename):
+                    yield info.filename, archive.read(info)
+    elif tarfile.is_tarfile(path):
+        # Mode flux : l'archive n'est jamais chargée entièrement en mémoire
+        with tarfile.open(path, mode="r|*") as archive:
+            for member in archive:
+                if member.isfile() and is_image_name(member.name):
+                    yield member.name, archive.extractfile(member).read()
+    else:
+        raise ValueError(f"Source non supportée (dossier, zip ou tar attendu) : {path}")
+
+
+def decode_and_resize(source, target_size, draft=True):
+    """
+    Décode une image et la redimensionne à la taille du modèle.
+
+    La normalisation float32 est faite plus tard, directement dans le tampon
+    de lot : la file de préchargement ne contient que des pixels uint8.
+
+    Args:
+        source: Chemin du fichier ou octets de l'image
+        target_size: Tuple (hauteur, largeur) du modèle
+        draft: Décodage JPEG réduit (Image.draft) pour les grandes photos
+
+    Returns:
+        numpy.ndarray: Pixels uint8 de forme (hauteur, largeur, 3)
+    """
+    image = open_image(source, target_size if draft else None)
+    return resize_to_array(image, target_size)
+
+
+class JsonlWriter:
+    """Écrit une ligne JSON par image."""
+
+    def __init__(self, stream, class_names):
+        self.stream = stream
+        self.class_names = class_names
+
+    def write(self, row):
+        self.stream.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+    def flush(self):
+        self.stream.flush()
+
+
+class CsvWriter:
+    """Écrit une ligne CSV par image, une colonne par probabilité de classe."""
+
+    def __init__(self, stream, class_names, write_header=True):
+        self.stream = stream
+        self.class_names = class_names
+        self.fieldnames = ["path", "predicted_class_idx", "class_name", "confidence", "error"]
+        self.fieldnames += [f"p_{name}" for name in class_names]
+        self._writer = csv.DictWriter(stream, fieldnames=self.fieldnames)
+        if write_header:
+            self._writer.writeheader()
+
+    def write(self, row):
+        flat = {key: row.get(key) for key in ("path", "predicted_class_idx", "class_name", "confidence", "error")}
+        for name, p in zip(self.class_names, row.get("probabilities") or []):
+            flat[f"p_{name}"] = p
+        self._writer.writerow(flat)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def open_writer(output, class_names, output_format=None, append=False):
+    """
+    Ouvre le flux de sortie et le writer correspondant au format.
+
+    Args:
+        output: Chemin du fichier de sortie, ou '-' pour la sortie standard
+        class_names: Table des noms de classes
+        output_format: 'jsonl' ou 'csv' ; déduit de l'extension si None
+        append: Ajouter à la fin du fichier existant au lieu de l'écraser
+
+    Returns:
+        tuple: (writer, stream)
+    """
+    if output_format is None:
+        output_format = "csv" if output.lower().endswith(".csv") else "jsonl"
+
+    if output == "-":
+        stream = sys.stdout
+        write_header = True
+    else:
+        write_header = not (append and os.path.exists(output) and os.path.getsize(output) > 0)
+        stream = open(output, "a" if append else "w", encoding="utf-8", newline="")
+
+    if output_format == "csv":
+        return CsvWriter(stream, class_names, write_header=write_header), stream
+    return JsonlWriter(stream, class_names), stream
+
+
+def make_row(name, probabilities, class_names):
+    """
+    Construit la ligne de sortie d'une image analysée.
+
+    Args:
+        name: Chemin ou nom de l'image
+        probabilities: Vecteur de probabilités des classes
+        class_names: Table des noms de classes
+
+    Returns:
+        dict: Ligne prête à être écrite
+    """
+    predicted_class_idx = int(np.argmax(probabilities))
+    return {
+        "path": name,
+        "predicted_class_idx": predicted_class_idx,
+        "class_name": class_names[predicted_class_idx],
+        "confidence": float(probabilities[predicted_class_idx] * 100),
+        "probabilities": [float(p) for p in probabilities],
+        "error": None,
+    }
+
+
+def make_error_row(name, error):
+    """Construit la ligne de sortie d'une image illisible."""
+    return {
+        "path": name,
+        "predicted_class_idx": None,
+        "class_name": None,
+        "confidence": None,
+        "probabilities": None,
+        "error": str(error),
+    }
+
+
+def iter_decoded(sources, target_size, decode_threads=4, prefetch=64, draft=True):
+    """
+    Décode les images en parallèle en conservant l'ordre d'entrée.
+
+    Au plus `prefetch` images sont en cours de décodage ou en attente
+    d'inférence à un instant donné.
+
+    Args:
+        sources: Itérable de (nom, source) produit par iter_sources
+        target_size: Tuple (hauteur, largeur) du modèle
+        decode_threads: Nombre de threads de décodage
+        prefetch: Taille de la file de préchargement
+        draft: Décodage JPEG réduit (Image.draft) pour les grandes photos
+
+    Yields:
+        tuple: (nom, pixels uint8 ou None, erreur ou None)
+    """
+    pending = queue.Queue(maxsize=prefetch)
+    stop = threading.Event()
+    failures = []
+
+    with ThreadPoolExecutor(max_workers=decode_threads, thread_name_prefix="decode") as pool:
+        def produce():
+            try:
+                for name, source in sources:
+                    if stop.is_set():
+                        return
+                    pending.put((name, pool.submit(decode_and_resize, source, target_size, draft)))
+            except Exception as e:
+                failures.append(e)
+            finally:
+                pending.put(_END)
+
+        producer = threading.Thread(target=produce, name="bulk-producer", daemon=True)
+        producer.start()
+        try:
+            while True:
+                item = pending.get()
+                if item is _END:
+                    break
+                name, future = item
+                try:
+                    yield name, future.result(), None
+                except Exception as e:
+                    yield name, None, e
+            if failures:
+                # Erreur d'énumération de la source : on la propage
+                raise failures[0]
+        finally:
+            stop.set()
+            # Débloquer le producteur s'il attend une place dans la file
+            while producer.is_alive():
+                try:
+                    pending.get_nowait()
+                except queue.Empty:
+                    producer.join(0.05)
+
+
+def save_decoded(decoded, store):
+    """
+    Conserve les pixels décodés dans un magasin de tenseurs au passage.
+
+    Les images déjà présentes dans le magasin (même nom) ne sont pas ajoutées
+    de nouveau : relancer un remplissage interrompu ne crée pas de doublons.
+
+    Args:
+        decoded: Itérable de (nom, pixels, erreur) produit par iter_decoded
+        store: TensorStore ouvert en ajout
+
+    Yields:
+        tuple: Les éléments de `decoded`, inchangés
+    """
+    for name, pixels, error in decoded:
+        if error is None:
+            store.append(name, pixels)
+        yield name, pixels, error
+
+
+def iter_store(store):
+    """
+    Relit un magasin de tenseurs comme un flux décodé, sans décodage JPEG.
+
+    Args:
+        store: TensorStore
+
+    Yields:
+        tuple: (nom, pixels uint8 lus par projection mémoire, None)
+    """
+    for name, pixels in store:
+        yield name, pixels, None
+
+
+def score_stream(classifier, decoded, writer, batch_size=32):
+    """
+    Regroupe les images décodées en lots, les analyse et écrit les résultats.
+
+    Args:
+        classifier: CoffeeLeafClassifier chargé
+        decoded: Itérable de (nom, pixels, erreur) produit par iter_decoded
+        writer: Writer de sortie (JsonlWriter ou CsvWriter)
+        batch_size: Nombre maximal d'images par passe du modèle
+
+    Returns:
+        tuple: (nombre d'images analysées, nombre d'erreurs)
+    """
+    buffer = allocate_batch(batch_size, classifier.target_size)
+    names = []
+    scored = 0
+    errors = 0
+
+    def flush_batch():
+        probabilities = classifier.predict_proba(buffer[:len(names)])
+        for name, p in zip(names, probabilities):
+            writer.write(make_row(name, p, classifier.class_names))
+        writer.flush()
+        names.clear()
+
+    for name, pixels, error in decoded:
+        if error is not None:
+            writer.write(make_error_row(name, error))
+            errors += 1
+            continue
+        normalize_into(pixels, buffer[len(names)])
+        names.append(name)
+        scored += 1
+        if len(names) == batch_size:
+            flush_batch()
+
+    if names:
+        flush_batch()
+
+    return scored, errors
+
+
+def score_stream_pooled(pool, decoded, writer, batch_size=32):
+    """
+    Variante de score_stream pour un pool de processus d'inférence.
+
+    Les pixels uint8 sont copiés dans l'anneau de mémoire partagée du pool,
+    sans normalisation dans ce processus ; plusieurs lots sont en vol à la
+    fois et leurs résultats sont écrits dans l'ordre d'envoi.
+
+    Args:
+        pool: ProcessInferencePool prêt
+        decoded: Itérable de (nom, pixels, erreur) produit par iter_decoded
+        writer: Writer de sortie (JsonlWriter ou CsvWriter)
+        batch_size: Nombre maximal d'images par lot (au plus pool.batch_size)
+
+    Returns:
+        tuple: (nombre d'images analysées, nombre d'erreurs)
+    """
+    staging = np.empty((batch_size, *pool.target_size, 3), dtype=np.uint8)
+    names = []
+    in_flight = deque()
+    scored = 0
+    errors = 0
+
+    def write_oldest():
+        batch_names, future = in_flight.popleft()
+        for name, p in zip(batch_names, future.result()):
+            writer.write(make_row(name, p, pool.class_names))
+        writer.flush()
+
+    def flush_batch():
+        # submit copie le lot dans l'anneau : le tampon de transit est aussitôt réutilisable
+        in_flight.append((list(names), pool.submit(staging[:len(names)])))
+        names.clear()
+        while in_flight and (in_flight[0][1].done() or len(in_flight) >= pool.slots):
+            write_oldest()
+
+    for name, pixels, error in decoded:
+        if error is not None:
+            writer.write(make_error_row(name, error))
+            errors += 1
+            continue
+        staging[len(names)] = pixels
+        names.append(name)
+        scored += 1
+        if len(names) == batch_size:
+            flush_batch()
+
+    if names:
+        flush_batch()
+    while in_flight:
+        write_oldest()
+
+    return scored, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyse en masse de photos de feuilles de café")
+    parser.add_argument("source", nargs="?", help="Dossier, archive zip ou archive tar de photos")
+    parser.add_argument("-o", "--output", default="-", help="Fichier de sortie (.jsonl ou .csv), '-' pour stdout")
+    parser.add_argument("--format", choices=["jsonl", "csv"], default=None, help="Format de sortie (déduit de l'extension par défaut)")
+    parser.add_argument("--model", default=MODEL_PATH, help="Chemin du modèle .keras")
+    parser.add_argument("--batch-size", type=int, default=32, help="Images par passe du modèle")
+    parser.add_argument("--decode-threads", type=int, default=4, help="Threads de décodage JPEG/PNG")
+    parser.add_argument("--prefetch", type=int, default=128, help="Taille de la file de préchargement")
+    parser.add_argument("--full-decode", action="store_true", help="Décoder les JPEG en pleine résolution (désactive Image.draft)")
+    parser.add_argument("--processes", type=int, default=INFERENCE_PROCESSES,
+                        help="Processus d'inférence (0 = inférence dans ce processus)")
+    parser.add_argument("--cpu-affinity", choices=["auto"], default=CPU_AFFINITY,
+                        help="Épingler chaque processus d'inférence sur une tranche des cœurs")
+    parser.add_argument("--save-store", default=None, help="Conserver aussi les pixels décodés dans ce magasin de tenseurs")
+    parser.add_argument("--from-store", default=None, help="Réanalyser un magasin de tenseurs au lieu de décoder une source")
+    parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE, help="Images par fragment d'un nouveau magasin")
+    args = parser.parse_args(argv)
+
+    if (args.source is None) == (args.from_store is None):
+        parser.error("indiquer une source ou --from-store (un seul des deux)")
+    if args.from_store and args.save_store:
+        parser.error("--save-store ne s'utilise pas avec --from-store")
+
+    if args.processes:
+        classifier = ProcessInferencePool(args.model, args.processes, args.batch_size, args.cpu_affinity).start()
+        try:
+            classifier.wait_ready()
+        except Exception:
+            classifier.close()
+            raise
+    else:
+        classifier = CoffeeLeafClassifier.from_path(args.model)
+    writer, stream = open_writer(args.output, classifier.class_names, args.format)
+    store = None
+    try:
+        if args.from_store:
+            store = TensorStore(args.from_store)
+            if store.target_size != tuple(classifier.target_size):
+                raise ValueError(
+                    f"Magasin en {store.target_size}, le modèle attend {tuple(classifier.target_size)}"
+                )
+            decoded = iter_store(store)
+        else:
+            decoded = iter_decoded(iter_sources(args.source), classifier.target_size, args.decode_threads, args.prefetch, not args.full_decode)
+            if args.save_store:
+                store = TensorStore(args.save_store, mode="a", target_size=classifier.target_size, shard_size=args.shard_size)
+                decoded = save_decoded(decoded, store)
+        if args.processes:
+            scored, errors = score_stream_pooled(classifier, decoded, writer, args.batch_size)
+        else:
+            scored, errors = score_stream(classifier, decoded, writer, args.batch_size)
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+        if store is not None:
+            store.close()
+        if args.processes:
+            classifier.close()
+
+    print(f"{scored} image(s) analysée(s), {errors} erreur(s)", file=sys.stderr)
+    return 0 if scored or not errors else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
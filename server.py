@@ -0,0 +1,237 @@
+"""
+Serveur HTTP d'Inférence - Feuilles de Café
+===========================================
+Point d'entrée autonome (sans Streamlit) qui expose le classifieur en REST.
+
+Routes:
+    POST /predict   Corps = octets bruts de l'image (JPG, JPEG, PNG)
+                    Réponse = diagnostic hiérarchique + probabilités des 6 classes
+    GET  /health    Sonde de vie : le processus répond (état du modèle en détail)
+    GET  /ready     Sonde de disponibilité : 200 une fois le modèle chargé et
+                    chauffé, 503 pendant le chargement ou après un échec
+    GET  /metrics   Métriques au format texte Prometheus (durées par étape,
+                    requêtes, erreurs, cache, tailles de lot)
+
+Le socket est ouvert immédiatement et le modèle est chargé en arrière-plan :
+un répartiteur de charge n'envoie du trafic qu'après /ready = 200, et
+/predict répond 503 tant que le modèle n'est pas prêt.
+
+Les requêtes concurrentes sont regroupées en micro-lots (voir batching.py).
+Avec --processes, les micro-lots sont répartis entre plusieurs processus
+d'inférence par mémoire partagée (voir process_pool.py).
+
+Usage:
+    python server.py --port 8000 --max-batch-size 32 --max-wait-ms 10
+    python server.py --processes 8 --cpu-affinity auto
+    curl --data-binary @feuille.jpg http://127.0.0.1:8000/predict
+
+Auteur: Groupe 8
+Projet: Deep Learning - Classification des maladies des feuilles de café
+"""
+
+import argparse
+import io
+import json
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from PIL import Image
+
+from batching import DynamicBatcher
+from inference import MODEL_PATH, ClassifierLoader, load_classifier_in_background
+from metrics import REGISTRY, span, start_request
+from process_pool import CPU_AFFINITY, INFERENCE_PROCESSES, ProcessInferencePool
+
+logger = logging.getLogger("coffee_leaf.server")
+
+# Taille maximale acceptée pour une image (identique à l'interface Streamlit)
+MAX_UPLOAD_BYTES = 200 * 1024 * 1024
+
+
+def result_to_json(classifier, result):
+    """
+    Convertit un tuple de diagnostic en dictionnaire sérialisable.
+
+    Args:
+        classifier: CoffeeLeafClassifier utilisé pour la prédiction
+        result: Tuple (statut_principal, pathologie_specifique, confiance, all_predictions, predicted_class_idx)
+
+    Returns:
+        dict: Diagnostic prêt pour json.dumps
+    """
+    statut_principal, pathologie_specifique, confidence, all_predictions, predicted_class_idx = result
+    return {
+        "statut_principal": statut_principal,
+        "pathologie_specifique": pathologie_specifique,
+        "confidence": float(confidence),
+        "predicted_class_idx": int(predicted_class_idx),
+        "class_names": list(classifier.class_names),
+        "probabilities": [float(p) for p in all_predictions],
+    }
+
+
+class _LoadedClassifier:
+    """Adapte un classifieur déjà chargé à l'interface de ClassifierLoader."""
+
+    def __init__(self, classifier):
+        self.classifier = classifier
+        self.readiness = classifier.readiness
+
+    def result(self, timeout=None):
+        return self.classifier
+
+    def health(self):
+        return {**self.readiness.snapshot(), "model_path": self.classifier.model_path}
+
+
+class InferenceRequestHandler(BaseHTTPRequestHandler):
+    """Gestionnaire HTTP : une instance par requête, un thread par connexion."""
+
+    # Renseignés par make_server
+    loader = None
+    batcher = None
+
+    @property
+    def classifier(self):
+        """Classifieur prêt, ou None pendant le chargement."""
+        if not self.loader.readiness.is_ready():
+            return None
+        return self.loader.result()
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok", "model": self.loader.health()})
+        elif self.path == "/metrics":
+            body = REGISTRY.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif self.path == "/ready":
+            health = self.loader.health()
+            self._send_json(200 if health["ready"] else 503, health)
+        else:
+            self._send_json(404, {"error": "Route inconnue"})
+
+    def do_POST(self):
+        if self.path != "/predict":
+            self._send_json(404, {"error": "Route inconnue"})
+            return
+
+        start_request("http")
+        classifier = self.classifier
+        if classifier is None:
+            self._send_json(503, {"error": "Modèle en cours de chargement", "model": self.loader.health()})
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0:
+            self._send_json(400, {"error": "Corps de requête vide : envoyez les octets de l'image"})
+            return
+        if length > MAX_UPLOAD_BYTES:
+            self._send_json(413, {"error": "Image trop volumineuse"})
+            return
+
+        try:
+            with span("upload"):
+                data = self.rfile.read(length)
+            with span("decode"):
+                image = Image.open(io.BytesIO(data)).convert('RGB')
+            with span("preprocess"):
+                tensor = classifier.preprocess(image)
+        except Exception as e:
+            self._send_json(400, {"error": f"Image illisible : {e}"})
+            return
+
+        try:
+            with span("inference"):
+                probabilities = self.batcher.submit(tensor).result()
+            result = classifier.interpret(probabilities)
+        except Exception as e:
+            logger.exception("Erreur lors de la prédiction")
+            self._send_json(500, {"error": f"Erreur lors de la prédiction : {e}"})
+            return
+
+        self._send_json(200, result_to_json(classifier, result))
+
+    def log_message(self, format, *args):
+        logger.info("%s - %s", self.address_string(), format % args)
+
+
+def make_server(classifier, host="127.0.0.1", port=8000, max_batch_size=32, max_wait_ms=10.0):
+    """
+    Construit le serveur HTTP et démarre son batcher.
+
+    Args:
+        classifier: CoffeeLeafClassifier chargé, ClassifierLoader en cours de chargement,
+            ou ProcessInferencePool démarré
+        host: Adresse d'écoute
+        port: Port d'écoute
+        max_batch_size: Nombre maximal d'images par micro-lot
+        max_wait_ms: Attente maximale (ms) pour compléter un micro-lot
+
+    Returns:
+        ThreadingHTTPServer: Serveur prêt pour serve_forever()
+    """
+    loader = classifier if isinstance(classifier, ClassifierLoader) else _LoadedClassifier(classifier)
+    # Pool de processus : un micro-lot en vol par créneau de mémoire partagée
+    threads = classifier.slots if isinstance(classifier, ProcessInferencePool) else 1
+    # Le batcher n'est sollicité qu'une fois le modèle prêt (voir do_POST)
+    batcher = DynamicBatcher(
+        lambda batch: loader.result().predict_proba(batch), max_batch_size, max_wait_ms, threads
+    ).start()
+    handler = type("BoundInferenceRequestHandler", (InferenceRequestHandler,), {
+        "loader": loader,
+        "batcher": batcher,
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.batcher = batcher
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serveur HTTP d'inférence des feuilles de café")
+    parser.add_argument("--host", default="127.0.0.1", help="Adresse d'écoute")
+    parser.add_argument("--port", type=int, default=8000, help="Port d'écoute")
+    parser.add_argument("--model", default=MODEL_PATH, help="Chemin du modèle .keras")
+    parser.add_argument("--max-batch-size", type=int, default=32, help="Images maximum par micro-lot")
+    parser.add_argument("--max-wait-ms", type=float, default=10.0, help="Attente maximale pour compléter un micro-lot")
+    parser.add_argument("--processes", type=int, default=INFERENCE_PROCESSES,
+                        help="Processus d'inférence (0 = inférence dans le processus du serveur)")
+    parser.add_argument("--cpu-affinity", choices=["auto"], default=CPU_AFFINITY,
+                        help="Épingler chaque processus d'inférence sur une tranche des cœurs")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    pool = None
+    if args.processes:
+        pool = ProcessInferencePool(args.model, args.processes, args.max_batch_size, args.cpu_affinity).start()
+        server = make_server(pool, args.host, args.port, args.max_batch_size, args.max_wait_ms)
+    else:
+        loader = load_classifier_in_background(args.model)
+        server = make_server(loader, args.host, args.port, args.max_batch_size, args.max_wait_ms)
+    logger.info("Serveur à l'écoute sur http://%s:%d (modèle en cours de chargement)", args.host, args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.batcher.stop()
+        if pool is not None:
+            pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Magasin de Tenseurs Prétraités - Feuilles de Café
+=================================================
+Conserve les pixels déjà décodés et redimensionnés (uint8, 224x224x3) d'une
+archive de photos dans des fragments `.npy` lus par projection mémoire
+(mmap). Après une mise à jour du modèle, la réanalyse de toute l'archive
+lit les lots directement dans ces fragments : aucun JPEG n'est décodé.
+
+Structure d'un magasin :
+    magasin/
+        index.json            taille des images, capacité et liste des fragments
+        shard-00000.npy       (capacité, hauteur, largeur, 3) uint8
+        shard-00000.json      noms des images du fragment, dans l'ordre des lignes
+        shard-00001.npy       ...
+
+- Un fragment est créé à sa capacité complète (fichier creux) ; un nouveau
+  fragment est ouvert dès que le précédent est plein.
+- Seules les lignes comptées dans index.json sont valides : les pixels sont
+  écrits et vidés sur disque avant la mise à jour atomique de l'index
+  (fichier temporaire + os.replace), toutes les `flush_every` images. Un
+  ajout interrompu laisse un magasin valide où manquent au plus les
+  `flush_every` dernières images, et un nouvel ajout reprend après la
+  dernière ligne validée.
+- Un nom déjà présent dans le magasin n'est pas ajouté une seconde fois :
+  relancer un remplissage interrompu complète le magasin sans doublons.
+
+Auteur: Groupe 8
+Projet: Deep Learning - Classification des maladies des feuilles de café
+"""
+
+import json
+import os
+
+import numpy as np
+
+from preprocessing import INPUT_SIZE
+
+# Nombre d'images par fragment (224x224x3 uint8 : ~600 Mo par fragment)
+DEFAULT_SHARD_SIZE = 4096
+
+# Images ajoutées entre deux validations de l'index
+DEFAULT_FLUSH_EVERY = 256
+
+# Nom du fichier d'index à la racine du magasin
+INDEX_FILE = "index.json"
+
+
+class TensorStore:
+    """
+    Magasin de pixels uint8 réparti en fragments `.npy` projetés en mémoire.
+
+    Exemple:
+        with TensorStore("magasin/", mode="a") as store:
+            store.append("feuille_001.jpg", pixels)
+        for name, pixels in TensorStore("magasin/"):
+            ...
+    """
+
+    def __init__(self, directory, mode="r", target_size=INPUT_SIZE, shard_size=DEFAULT_SHARD_SIZE,
+                 flush_every=DEFAULT_FLUSH_EVERY):
+        """
+        Args:
+            directory: Dossier du magasin (créé en mode 'a' s'il n'existe pas)
+            mode: 'r' (lecture seule) ou 'a' (lecture et ajout)
+            target_size: Tuple (hauteur, largeur) des images d'un nouveau magasin
+            shard_size: Capacité (images) des fragments d'un nouveau magasin
+            flush_every: Images ajoutées entre deux validations de l'index
+        """
+        if mode not in ("r", "a"):
+            raise ValueError("mode doit valoir 'r' ou 'a'")
+        self.directory = directory
+        self.mode = mode
+        self.flush_every = flush_every
+        index_path = os.path.join(directory, INDEX_FILE)
+        if os.path.exists(index_path):
+            with open(index_path, encoding="utf-8") as f:
+                index = json.load(f)
+            self.target_size = tuple(index["target_size"])
+            self.shard_size = index["shard_size"]
+            self.shards = index["shards"]
+        elif mode == "a":
+            os.makedirs(directory, exist_ok=True)
+            self.target_size = tuple(target_size)
+            self.shard_size = shard_size
+            self.shards = []
+            self._write_index()
+        else:
+            raise FileNotFoundError(f"Magasin de tenseurs introuvable : {index_path}")
+
+        # Noms des fragments (chargés à la demande) et fragments ouverts
+        self._names = {}
+        self._arrays = {}
+        # Fragment en cours d'ajout et lignes écrites mais pas encore validées
+        self._pending = []
+        # Noms déjà stockés (validés ou en attente), pour écarter les doublons en ajout
+        self._stored = set()
+        if mode == "a":
+            for number in range(len(self.shards)):
+                self._stored.update(self.names(number))
+
+    def __len__(self):
+        return sum(shard["count"] for shard in self.shards)
+
+    def __contains__(self, name):
+        """Indique si une image est déjà stockée (magasin ouvert en ajout)."""
+        return name in self._stored
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _shard_path(self, number, extension):
+        return os.path.join(self.directory, f"shard-{number:05d}.{extension}")
+
+    def _write_index(self):
+        """Remplace index.json de façon atomique."""
+        index_path = os.path.join(self.directory, INDEX_FILE)
+        temp_path = index_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"target_size": list(self.target_size), "shard_size": self.shard_size, "shards": self.shards}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, index_path)
+
+    def shard(self, number):
+        """
+        Pixels d'un fragment, projetés en mémoire (aucune lecture avant accès).
+
+        Args:
+            number: Numéro du fragment
+
+        Returns:
+            numpy.memmap: uint8 (capacité, hauteur, largeur, 3) ; seules les
+            `self.shards[number]['count']` premières lignes sont valides
+        """
+        if number not in self._arrays:
+            path = self._shard_path(number, "npy")
+            self._arrays[number] = np.load(path, mmap_mode="r+" if self.mode == "a" else "r")
+        return self._arrays[number]
+
+    def names(self, number):
+        """Noms des images validées d'un fragment."""
+        if number not in self._names:
+            with open(self._shard_path(number, "json"), encoding="utf-8") as f:
+                self._names[number] = json.load(f)
+        return self._names[number][:self.shards[number]["count"]]
+
+    def _open_tail(self):
+        """Fragment qui reçoit le prochain ajout (créé si le dernier est plein)."""
+        if self.shards and self.shards[-1]["count"] < self.shard_size:
+            number = len(self.shards) - 1
+            self.shard(number)
+            self._names[number] = self.names(number)
+            return number
+
+        number = len(self.shards)
+        height, width = self.target_size
+        self._arrays[number] = np.lib.format.open_memmap(
+            self._shard_path(number, "npy"), mode="w+", dtype=np.uint8, shape=(self.shard_size, height, width, 3)
+        )
+        self._names[number] = []
+        self.shards.append({"file": os.path.basename(self._shard_path(number, "npy")), "count": 0})
+        return number
+
+    def append(self, name, pixels):
+        """
+        Ajoute une image prétraitée (validée au prochain flush).
+
+        Args:
+            name: Nom ou chemin de l'image
+            pixels: numpy.ndarray uint8 de forme (hauteur, largeur, 3)
+
+        Returns:
+            bool: False si une image de même nom est déjà stockée (rien n'est ajouté)
+        """
+        if self.mode != "a":
+            raise RuntimeError("Magasin ouvert en lecture seule")
+        if pixels.shape != (*self.target_size, 3):
+            raise ValueError(f"Image de forme {pixels.shape}, attendu {(*self.target_size, 3)}")
+        if name in self._stored:
+            return False
+
+        number = len(self.shards) - 1 if self._pending else self._open_tail()
+        row = self.shards[number]["count"] + len(self._pending)
+        self._arrays[number][row] = pixels
+        self._pending.append(name)
+        self._stored.add(name)
+        if row + 1 == self.shard_size or len(self._pending) >= self.flush_every:
+            # Fragment plein (validé avant d'ouvrir le suivant) ou validation périodique
+            self.flush()
+        return True
+
+    def flush(self):
+        """Vide les pixels ajoutés sur disque puis valide leurs lignes dans l'index."""
+        if not self._pending:
+            return
+        number = len(self.shards) - 1
+        self._arrays[number].flush()
+        names = self._names[number][:self.shards[number]["count"]] + self._pending
+        temp_path = self._shard_path(number, "json.tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(names, f, ensure_ascii=False)
+        os.replace(temp_path, self._shard_path(number, "json"))
+        self._names[number] = names
+        self.shards[number]["count"] = len(names)
+        self._pending = []
+        self._write_index()
+
+    def close(self):
+        """Valide les derniers ajouts et libère les projections."""
+        if self.mode == "a":
+            self.flush()
+        self._arrays.clear()
+
+    def batches(self, batch_size=32):
+        """
+        Parcourt le magasin par lots de lignes contiguës, sans copie.
+
+        Args:
+            batch_size: Nombre maximal d'images par lot
+
+        Yields:
+            tuple: (noms, pixels uint8 (N, hauteur, largeur, 3) en vue sur le fragment)
+        """
+        for number, shard in enumerate(self.shards):
+            names = self.names(number)
+            pixels = self.shard(number)
+            for start in range(0, shard["count"], batch_size):
+                stop = min(start + batch_size, shard["count"])
+                yield names[start:stop], pixels[start:stop]
+
+    def __iter__(self):
+        """Parcourt les images une à une : (nom, pixels uint8)."""
+        for names, pixels in self.batches(self.shard_size):
+            yield from zip(names, pixels)
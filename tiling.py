@@ -0,0 +1,311 @@
+"""
+Inférence par Tuiles - Feuilles de Café
+=======================================
+Analyse d'une photo de branche ou de canopée : au lieu d'écraser toute la
+photo en 224x224 (et de perdre les lésions qui distinguent la rouille de
+niveau 1 du niveau 2), l'image est découpée en tuiles 224x224 qui se
+chevauchent, chaque tuile est classée, et les résultats sont agrégés en une
+carte de sévérité et une synthèse.
+
+- Les tuiles sont des vues NumPy (`sliding_window_view`) sur les pixels
+  uint8 de l'image : aucune copie n'est faite avant la normalisation, qui
+  écrit directement dans le tampon de lot float32.
+- Les tuiles de fond (ciel, sol, flou uniforme) sont écartées par un test
+  bon marché de couleur et de variance, calculé sur une vue sous-échantillonnée.
+- Les tuiles restantes passent par le modèle par lots de `batch_size`.
+
+Auteur: Groupe 8
+Projet: Deep Learning - Classification des maladies des feuilles de café
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from preprocessing import INPUT_SIZE, allocate_batch, normalize_into, open_image
+
+# Côté maximal (pixels) de l'image de travail : au-delà, l'image est réduite
+MAX_SIDE = 2048
+
+# Chevauchement par défaut entre deux tuiles voisines (fraction de la tuile)
+DEFAULT_OVERLAP = 0.25
+
+# Pas du sous-échantillonnage utilisé par le test de fond
+_BACKGROUND_STEP = 8
+
+
+def severity_weights(class_names):
+    """
+    Niveau de sévérité associé à chaque classe (0 hors rouille, k pour 'Rust Level k').
+
+    Args:
+        class_names: Table des noms de classes
+
+    Returns:
+        numpy.ndarray: Poids float32, un par classe
+    """
+    weights = np.zeros(len(class_names), dtype=np.float32)
+    for idx, name in enumerate(class_names):
+        parts = name.split()
+        if name.lower().startswith("rust") and parts[-1].isdigit():
+            weights[idx] = int(parts[-1])
+    return weights
+
+
+def grid_dimension(length, tile, stride):
+    """
+    Plus grande taille de travail alignée sur la grille de tuiles sans dépasser `length`.
+
+    Les tuiles couvrent alors exactement l'image, bords compris, sans
+    remplissage ni copie. Arrondir vers le bas garantit que l'image de
+    travail ne dépasse jamais la taille demandée (et donc max_side) ; une
+    image plus petite qu'une tuile en reçoit une seule.
+
+    Args:
+        length: Taille d'origine (pixels)
+        tile: Taille d'une tuile
+        stride: Pas entre deux tuiles
+
+    Returns:
+        tuple: (taille alignée, nombre de tuiles)
+    """
+    count = max(1, (length - tile) // stride + 1)
+    return tile + (count - 1) * stride, count
+
+
+def load_canopy_image(source, tile_size=INPUT_SIZE, overlap=DEFAULT_OVERLAP, max_side=MAX_SIDE):
+    """
+    Décode une photo et la redimensionne sur une grille de tuiles exacte.
+
+    Args:
+        source: Chemin, octets ou objet fichier de l'image
+        tile_size: Tuple (hauteur, largeur) d'une tuile (taille d'entrée du modèle)
+        overlap: Chevauchement entre tuiles voisines (0 à 0.9)
+        max_side: Côté maximal de l'image de travail
+
+    Returns:
+        tuple: (pixels uint8 (H, W, 3), pas vertical, pas horizontal)
+    """
+    tile_h, tile_w = tile_size
+    stride_h = max(1, int(round(tile_h * (1 - overlap))))
+    stride_w = max(1, int(round(tile_w * (1 - overlap))))
+
+    # Décodage JPEG réduit (Image.draft) au plus près de la taille de travail
+    image = open_image(source, (max_side, max_side))
+    scale = min(1.0, max_side / max(image.size))
+    height = max(tile_h, int(image.height * scale))
+    width = max(tile_w, int(image.width * scale))
+
+    height, _ = grid_dimension(height, tile_h, stride_h)
+    width, _ = grid_dimension(width, tile_w, stride_w)
+    if image.size != (width, height):
+        image = image.resize((width, height))
+    return np.asarray(image, dtype=np.uint8), stride_h, stride_w
+
+
+def extract_tiles(pixels, tile_size=INPUT_SIZE, stride=None):
+    """
+    Vue (sans copie) des tuiles d'une image.
+
+    Args:
+        pixels: Pixels uint8 (H, W, 3)
+        tile_size: Tuple (hauteur, largeur) d'une tuile
+        stride: Tuple (pas vertical, pas horizontal), par défaut sans chevauchement
+
+    Returns:
+        numpy.ndarray: Vue de forme (lignes, colonnes, hauteur, largeur, 3)
+    """
+    tile_h, tile_w = tile_size
+    stride_h, stride_w = stride or tile_size
+    windows = sliding_window_view(pixels, (tile_h, tile_w, 3))
+    return windows[::stride_h, ::stride_w, 0]
+
+
+def foreground_mask(tiles, min_std=12.0, min_leaf_fraction=0.3):
+    """
+    Repère les tuiles qui contiennent du feuillage (test bon marché).
+
+    Sur une vue sous-échantillonnée de chaque tuile : la variance de
+    luminance écarte les zones uniformes, et la part de pixels verts ou
+    couleur rouille écarte le ciel, le sol et les fonds neutres.
+
+    Args:
+        tiles: Vue (lignes, colonnes, hauteur, largeur, 3) uint8 (voir extract_tiles)
+        min_std: Écart-type minimal de luminance d'une tuile de feuillage
+        min_leaf_fraction: Part minimale de pixels verts ou rouille
+
+    Returns:
+        numpy.ndarray: Masque booléen (lignes, colonnes)
+    """
+    sample = tiles[:, :, ::_BACKGROUND_STEP, ::_BACKGROUND_STEP].astype(np.int16)
+    red, green, blue = sample[..., 0], sample[..., 1], sample[..., 2]
+
+    luminance_std = (0.299 * red + 0.587 * green + 0.114 * blue).std(axis=(2, 3))
+    green_leaf = (green > red) & (green > blue)
+    rust = (red > green) & (green > blue) & (red - blue > 40)
+    leaf_fraction = (green_leaf | rust).mean(axis=(2, 3))
+    return (luminance_std >= min_std) & (leaf_fraction >= min_leaf_fraction)
+
+
+class TileAnalysis:
+    """Résultat d'une analyse par tuiles : probabilités par tuile et synthèse."""
+
+    def __init__(self, probabilities, foreground, tile_size, stride, class_names):
+        """
+        Args:
+            probabilities: float32 (lignes, colonnes, classes), NaN pour les tuiles de fond
+            foreground: Masque booléen (lignes, colonnes) des tuiles analysées
+            tile_size: Tuple (hauteur, largeur) d'une tuile
+            stride: Tuple (pas vertical, pas horizontal)
+            class_names: Table des noms de classes
+        """
+        self.probabilities = probabilities
+        self.foreground = foreground
+        self.tile_size = tuple(tile_size)
+        self.stride = tuple(stride)
+        self.class_names = tuple(class_names)
+        # Sévérité attendue de la rouille par tuile (0 à 4), NaN pour le fond
+        self.severity = probabilities @ severity_weights(class_names)
+
+    @property
+    def tile_count(self):
+        return self.foreground.size
+
+    @property
+    def scored_count(self):
+        return int(np.count_nonzero(self.foreground))
+
+    @property
+    def mean_probabilities(self):
+        """Probabilités moyennes des tuiles de feuillage (diagnostic global)."""
+        if not self.scored_count:
+            return None
+        return self.probabilities[self.foreground].mean(axis=0)
+
+    def tile_classes(self):
+        """Classe prédite par tuile, -1 pour le fond."""
+        classes = np.full(self.foreground.shape, -1, dtype=np.int64)
+        classes[self.foreground] = self.probabilities[self.foreground].argmax(axis=1)
+        return classes
+
+    def summary(self):
+        """
+        Synthèse de l'image.
+
+        Returns:
+            dict: Tuiles analysées / écartées, nombre de tuiles par classe,
+            part de tuiles malades, sévérité moyenne et maximale, classe et
+            position de la tuile la plus sévère
+        """
+        summary = {
+            "tiles": self.tile_count,
+            "tiles_scored": self.scored_count,
+            "tiles_skipped": self.tile_count - self.scored_count,
+        }
+        if not self.scored_count:
+            return summary
+
+        classes = self.tile_classes()[self.foreground]
+        counts = np.bincount(classes, minlength=len(self.class_names))
+        severity = self.severity[self.foreground]
+        worst = np.unravel_index(np.nanargmax(self.severity), self.severity.shape)
+        summary.update({
+            "class_counts": {name: int(count) for name, count in zip(self.class_names, counts)},
+            "diseased_fraction": float(np.mean(classes != 0)),
+            "mean_severity": float(severity.mean()),
+            "max_severity": float(severity.max()),
+            "worst_tile": {
+                "row": int(worst[0]),
+                "col": int(worst[1]),
+                "y": int(worst[0] * self.stride[0]),
+                "x": int(worst[1] * self.stride[1]),
+                "class": self.class_names[int(self.probabilities[worst].argmax())],
+            },
+        })
+        return summary
+
+
+def analyze_tiles(classifier, source, overlap=DEFAULT_OVERLAP, batch_size=32, max_side=MAX_SIDE,
+                  min_std=12.0, min_leaf_fraction=0.3):
+    """
+    Analyse par tuiles d'une photo de branche ou de canopée.
+
+    Args:
+        classifier: CoffeeLeafClassifier (predict_proba, target_size, class_names)
+        source: Chemin, octets ou objet fichier de l'image
+        overlap: Chevauchement entre tuiles voisines
+        batch_size: Tuiles par passe du modèle
+        max_side: Côté maximal de l'image de travail
+        min_std: Voir foreground_mask
+        min_leaf_fraction: Voir foreground_mask
+
+    Returns:
+        tuple: (TileAnalysis, pixels uint8 de l'image de travail)
+    """
+    pixels, stride_h, stride_w = load_canopy_image(source, classifier.target_size, overlap, max_side)
+    return analyze_pixels(classifier, pixels, (stride_h, stride_w), batch_size, min_std, min_leaf_fraction), pixels
+
+
+def analyze_pixels(classifier, pixels, stride, batch_size=32, min_std=12.0, min_leaf_fraction=0.3):
+    """
+    Analyse par tuiles de pixels déjà décodés.
+
+    Args:
+        classifier: CoffeeLeafClassifier (predict_proba, target_size, class_names)
+        pixels: Pixels uint8 (H, W, 3)
+        stride: Tuple (pas vertical, pas horizontal)
+        batch_size: Tuiles par passe du modèle
+        min_std: Voir foreground_mask
+        min_leaf_fraction: Voir foreground_mask
+
+    Returns:
+        TileAnalysis: Probabilités par tuile et synthèse
+    """
+    tiles = extract_tiles(pixels, classifier.target_size, stride)
+    foreground = foreground_mask(tiles, min_std, min_leaf_fraction)
+    rows, cols = np.nonzero(foreground)
+
+    probabilities = np.full(foreground.shape + (len(classifier.class_names),), np.nan, dtype=np.float32)
+    buffer = allocate_batch(min(batch_size, len(rows)) or 1, classifier.target_size)
+    for start in range(0, len(rows), batch_size):
+        chunk_rows = rows[start:start + batch_size]
+        chunk_cols = cols[start:start + batch_size]
+        # Normalisation directe de chaque vue dans le tampon (pas de copie intermédiaire)
+        for j, (row, col) in enumerate(zip(chunk_rows, chunk_cols)):
+            normalize_into(tiles[row, col], buffer[j])
+        probabilities[chunk_rows, chunk_cols] = classifier.predict_proba(buffer[:len(chunk_rows)])
+
+    return TileAnalysis(probabilities, foreground, classifier.target_size, stride, classifier.class_names)
+
+
+def severity_overlay(analysis, pixels, alpha=0.45):
+    """
+    Superpose la carte de sévérité à l'image (vert = sain, rouge = rouille niveau 4).
+
+    Chaque pixel prend la sévérité moyenne des tuiles qui le couvrent ; le
+    fond reste tel quel.
+
+    Args:
+        analysis: TileAnalysis
+        pixels: Pixels uint8 (H, W, 3) de l'image de travail
+        alpha: Opacité de la carte
+
+    Returns:
+        numpy.ndarray: Image uint8 (H, W, 3)
+    """
+    height, width = pixels.shape[:2]
+    tile_h, tile_w = analysis.tile_size
+    stride_h, stride_w = analysis.stride
+    total = np.zeros((height, width), dtype=np.float32)
+    weight = np.zeros((height, width), dtype=np.float32)
+    for row, col in zip(*np.nonzero(analysis.foreground)):
+        y, x = row * stride_h, col * stride_w
+        total[y:y + tile_h, x:x + tile_w] += analysis.severity[row, col]
+        weight[y:y + tile_h, x:x + tile_w] += 1
+
+    covered = weight > 0
+    level = np.divide(total, weight, out=np.zeros_like(total), where=covered) / 4.0
+    colors = np.stack([level * 255, (1 - level) * 255, np.zeros_like(level)], axis=-1)
+
+    overlay = pixels.astype(np.float32)
+    overlay[covered] = (1 - alpha) * overlay[covered] + alpha * colors[covered]
+    return overlay.astype(np.uint8)
@@ -0,0 +1,117 @@
+"""
+Augmentation au Moment du Test (TTA) - Feuilles de Café
+=======================================================
+Prédiction moyennée sur plusieurs vues d'une même feuille (retournements,
+rotations de 90°, recadrages légers) pour stabiliser les diagnostics
+limites entre deux niveaux de rouille.
+
+Toutes les vues sont écrites dans un seul tenseur de lot : le modèle ne fait
+qu'une passe, au lieu d'un `model.predict` par vue.
+
+Auteur: Groupe 8
+Projet: Deep Learning - Classification des maladies des feuilles de café
+"""
+
+import numpy as np
+
+from preprocessing import INPUT_SIZE, allocate_batch, normalize_into, resize_to_array
+
+# Vues disponibles, dans l'ordre où elles sont ajoutées quand le nombre de vues augmente
+TTA_VIEWS = (
+    "identity",
+    "flip_lr",
+    "flip_ud",
+    "rot90",
+    "rot180",
+    "rot270",
+    "crop_center",
+    "crop_top_left",
+    "crop_top_right",
+    "crop_bottom_left",
+    "crop_bottom_right",
+)
+
+# Part de l'image conservée par les recadrages
+CROP_FRACTION = 0.9
+
+# Transformations géométriques de la photo redimensionnée (vues NumPy, sans copie)
+_GEOMETRIC = {
+    "identity": lambda pixels: pixels,
+    "flip_lr": lambda pixels: pixels[:, ::-1],
+    "flip_ud": lambda pixels: pixels[::-1],
+    "rot90": lambda pixels: np.rot90(pixels, 1),
+    "rot180": lambda pixels: np.rot90(pixels, 2),
+    "rot270": lambda pixels: np.rot90(pixels, 3),
+}
+
+
+def available_views(target_size=INPUT_SIZE):
+    """
+    Vues utilisables pour une taille d'entrée (les rotations de 90° exigent une entrée carrée).
+
+    Args:
+        target_size: Tuple (hauteur, largeur) du modèle
+
+    Returns:
+        tuple: Noms des vues, dans l'ordre de TTA_VIEWS
+    """
+    height, width = target_size
+    if height == width:
+        return TTA_VIEWS
+    return tuple(view for view in TTA_VIEWS if view not in ("rot90", "rot270"))
+
+
+def _crop_box(view, size, fraction=CROP_FRACTION):
+    width, height = size
+    crop_w, crop_h = int(width * fraction), int(height * fraction)
+    left = {"crop_center": (width - crop_w) // 2, "crop_top_left": 0, "crop_bottom_left": 0}.get(view, width - crop_w)
+    top = {"crop_center": (height - crop_h) // 2, "crop_top_left": 0, "crop_top_right": 0}.get(view, height - crop_h)
+    return left, top, left + crop_w, top + crop_h
+
+
+def build_views(image, n_views, target_size=INPUT_SIZE, out=None):
+    """
+    Construit les vues augmentées d'une image dans un seul tenseur de lot.
+
+    La photo n'est redimensionnée qu'une fois pour les retournements et les
+    rotations ; seuls les recadrages relisent l'image d'origine.
+
+    Args:
+        image: Image PIL RGB
+        n_views: Nombre de vues (1 = image seule, au plus len(TTA_VIEWS))
+        target_size: Tuple (hauteur, largeur) du modèle
+        out: Tampon float32 préalloué d'au moins n_views images (None = allocation)
+
+    Returns:
+        numpy.ndarray: Tenseur float32 (n_views, hauteur, largeur, 3)
+    """
+    views = available_views(target_size)
+    if not 1 <= n_views <= len(views):
+        raise ValueError(f"Nombre de vues TTA invalide : {n_views} (entre 1 et {len(views)})")
+    if out is None:
+        out = allocate_batch(n_views, target_size)
+
+    pixels = resize_to_array(image, target_size)
+    for j, view in enumerate(views[:n_views]):
+        if view in _GEOMETRIC:
+            normalize_into(_GEOMETRIC[view](pixels), out[j])
+        else:
+            normalize_into(resize_to_array(image.crop(_crop_box(view, image.size)), target_size), out[j])
+    return out[:n_views]
+
+
+def predict_proba_tta(classifier, image, n_views=8, out=None):
+    """
+    Probabilités moyennées sur `n_views` vues, en une seule passe du modèle.
+
+    Args:
+        classifier: CoffeeLeafClassifier (predict_proba, target_size)
+        image: Image PIL RGB
+        n_views: Nombre de vues
+        out: Tampon float32 préalloué (None = allocation)
+
+    Returns:
+        numpy.ndarray: Probabilités moyennes de forme (classes,)
+    """
+    batch = build_views(image, n_views, classifier.target_size, out)
+    return np.asarray(classifier.predict_proba(batch), dtype=np.float32).mean(axis=0)
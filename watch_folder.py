@@ -0,0 +1,401 @@
+"""
+Surveillance d'un Dossier - Feuilles de Café
+============================================
+Mode veille pour un dossier partagé alimenté au fil de la journée (drones,
+téléphones) : à chaque passage, seules les images nouvelles ou modifiées
+sont analysées, par lots, et leurs lignes sont ajoutées au fichier de
+résultats (mêmes colonnes que score_bulk.py).
+
+Un index SQLite persistant conserve, pour chaque fichier déjà traité, sa
+date de modification, sa taille, l'empreinte SHA-256 de son contenu et ses
+probabilités, ainsi que la date de modification de chaque dossier :
+- un dossier dont la date n'a pas changé n'est pas relu (un ajout, une
+  suppression ou un renommage modifie la date du dossier) ;
+- un dossier modifié est relu sans `stat` de ses fichiers : les nouveaux
+  noms et les noms disparus sont la différence entre la liste du dossier
+  et les noms indexés, et seuls les nouveaux fichiers sont examinés ;
+- un fichier encore en cours de copie (modifié depuis moins de --settle
+  secondes) est mis en attente individuellement et réexaminé aux passages
+  suivants, sans relire son dossier ;
+- un fichier dont le contenu est déjà connu (copie, `touch`) reprend les
+  probabilités de l'index sans repasser par le modèle ;
+- un redémarrage reprend l'index : l'archive n'est pas réanalysée ;
+- les fichiers supprimés sont retirés de l'index.
+
+Un passage coûte donc un `stat` par dossier, la liste des noms (sans `stat`)
+des dossiers modifiés, et un `stat` par fichier nouveau ou en attente ;
+aucun travail n'est fait par fichier déjà indexé. Une réécriture sur place
+(même nom, dossier inchangé) n'est vue que par un parcours complet
+(--full-scan-every), qui examine tous les fichiers.
+
+Usage:
+    python watch_folder.py televersements/ -o resultats.csv --index index.sqlite
+    python watch_folder.py televersements/ -o resultats.jsonl --interval 30 --processes 4
+    python watch_folder.py televersements/ -o resultats.csv --once
+
+Auteur: Groupe 8
+Projet: Deep Learning - Classification des maladies des feuilles de café
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+import numpy as np
+
+from cache import file_fingerprint
+from inference import MODEL_PATH, CoffeeLeafClassifier
+from process_pool import CPU_AFFINITY, INFERENCE_PROCESSES, ProcessInferencePool
+from score_bulk import (
+    is_image_name, iter_decoded, make_error_row, make_row, open_writer, score_stream, score_stream_pooled,
+)
+
+# Index par défaut, à côté du fichier de résultats
+DEFAULT_INDEX = "watch_index.sqlite"
+
+# Âge minimal (ns) de la date d'un dossier pour qu'elle soit fiable : en deçà,
+# un ajout pendant la même unité de temps ne la modifierait pas
+_MTIME_RESOLUTION_NS = 2_000_000_000
+
+
+class ScoreIndex:
+    """
+    Index persistant des fichiers déjà analysés et des dossiers déjà lus.
+
+    Exemple:
+        index = ScoreIndex("index.sqlite", model_fingerprint)
+        changes = index.scan("televersements/")
+    """
+
+    def __init__(self, db_path, model_fingerprint):
+        """
+        Args:
+            db_path: Chemin de la base SQLite
+            model_fingerprint: Empreinte du modèle ; les résultats d'un autre modèle sont réanalysés
+        """
+        self.model_fingerprint = model_fingerprint
+        # Dates des dossiers relus, enregistrées une fois leurs fichiers traités (voir commit_scan)
+        self._scanned_dirs = []
+        self._scanned_pending = []
+        self._db = sqlite3.connect(db_path)
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "path TEXT PRIMARY KEY, dir TEXT NOT NULL, mtime_ns INTEGER NOT NULL, size INTEGER NOT NULL, "
+            "digest TEXT, model TEXT, probabilities BLOB, error TEXT);"
+            "CREATE INDEX IF NOT EXISTS files_dir ON files (dir);"
+            "CREATE INDEX IF NOT EXISTS files_digest ON files (digest, model);"
+            "CREATE TABLE IF NOT EXISTS dirs (path TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS pending (path TEXT PRIMARY KEY);"
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);"
+        )
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'model'").fetchone()
+        if row is not None and row[0] != model_fingerprint:
+            # Nouveau modèle : tous les dossiers sont relus et leurs fichiers réanalysés
+            self._db.execute("DELETE FROM dirs")
+        self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('model', ?)", (model_fingerprint,))
+        self._db.commit()
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def scan(self, root, settle=2.0, full=False):
+        """
+        Repère les fichiers nouveaux ou modifiés sous `root`.
+
+        Seuls les dossiers dont la date de modification a changé sont relus,
+        et seuls leurs nouveaux noms sont examinés. Un dossier jamais lu (ou
+        tous si `full`) est parcouru complètement : chaque fichier est comparé
+        à l'index (date, taille, modèle). Les fichiers disparus sont retirés de
+        l'index. La date des dossiers relus et la sortie des fichiers en
+        attente ne sont enregistrées que par commit_scan, une fois les
+        fichiers renvoyés traités : après une interruption, ils sont repris.
+
+        Args:
+            root: Dossier surveillé
+            settle: Âge minimal (secondes) d'un fichier pour être pris en compte
+            full: Parcourir complètement tous les dossiers (détecte les réécritures sur place)
+
+        Returns:
+            list: (chemin, mtime_ns, taille) des images à traiter
+        """
+        known_dirs = dict(self._db.execute("SELECT path, mtime_ns FROM dirs"))
+        children = {}
+        for path in known_dirs:
+            children.setdefault(os.path.dirname(path), []).append(path)
+        now = time.time_ns()
+        horizon = now - int(settle * 1e9)
+        changes = []
+        pending = set()
+
+        # Fichiers en attente : examinés un par un, quel que soit l'état de leur dossier
+        for (path,) in self._db.execute("SELECT path FROM pending").fetchall():
+            pending.add(path)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                self._scanned_pending.append(path)
+                continue
+            if stat.st_mtime_ns <= horizon:
+                self._scanned_pending.append(path)
+                if self._is_stale(path, stat):
+                    changes.append((path, stat.st_mtime_ns, stat.st_size))
+
+        stack = [root]
+        while stack:
+            directory = stack.pop()
+            try:
+                mtime_ns = os.stat(directory).st_mtime_ns
+            except FileNotFoundError:
+                self._forget_dir(directory)
+                continue
+
+            known_mtime = known_dirs.get(directory)
+            if not full and known_mtime == mtime_ns:
+                # Dossier inchangé : on ne descend que dans ses sous-dossiers connus
+                stack.extend(children.get(directory, ()))
+                continue
+
+            listed = {}
+            subdirs = set()
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.add(entry.path)
+                    elif is_image_name(entry.name) and entry.is_file():
+                        listed[entry.path] = entry
+
+            indexed = {
+                path: (mtime, size, model) for path, mtime, size, model in self._db.execute(
+                    "SELECT path, mtime_ns, size, model FROM files WHERE dir = ?", (directory,)
+                )
+            }
+            # Dossier déjà lu : seuls les nouveaux noms sont examinés ; sinon tous
+            examined = listed.keys() - pending
+            if not (full or known_mtime is None):
+                examined -= indexed.keys()
+            for path in sorted(examined):
+                stat = listed[path].stat()
+                if stat.st_mtime_ns > horizon:
+                    # Copie peut-être en cours : fichier réexaminé seul aux passages suivants
+                    self._db.execute("INSERT OR IGNORE INTO pending (path) VALUES (?)", (path,))
+                elif indexed.get(path) != (stat.st_mtime_ns, stat.st_size, self.model_fingerprint):
+                    changes.append((path, stat.st_mtime_ns, stat.st_size))
+
+            # Fichiers et sous-dossiers disparus depuis la dernière lecture
+            self._db.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in indexed.keys() - listed.keys()])
+            for path in set(children.get(directory, ())) - subdirs:
+                self._forget_dir(path)
+
+            stack.extend(sorted(subdirs, reverse=True))
+            # Date trop récente pour être sûre (résolution grossière de certains
+            # systèmes de fichiers) : le dossier sera relu au prochain passage
+            self._scanned_dirs.append((directory, mtime_ns if now - mtime_ns > _MTIME_RESOLUTION_NS else -1))
+        self._db.commit()
+        return changes
+
+    def commit_scan(self):
+        """Enregistre la date des dossiers relus et retire les fichiers sortis d'attente."""
+        self._db.executemany("INSERT OR REPLACE INTO dirs (path, mtime_ns) VALUES (?, ?)", self._scanned_dirs)
+        self._db.executemany("DELETE FROM pending WHERE path = ?", [(path,) for path in self._scanned_pending])
+        self._scanned_dirs = []
+        self._scanned_pending = []
+        self._db.commit()
+
+    def _forget_dir(self, directory):
+        """Retire un dossier disparu, ses sous-dossiers et leurs fichiers."""
+        pattern = os.path.join(directory, "").replace("%", r"\%").replace("_", r"\_") + "%"
+        for table, column in (("files", "dir"), ("dirs", "path"), ("pending", "path")):
+            self._db.execute(
+                f"DELETE FROM {table} WHERE {column} = ? OR {column} LIKE ? ESCAPE '\\'", (directory, pattern)
+            )
+
+    def _is_stale(self, path, stat):
+        """Indique si un fichier est absent de l'index, modifié, ou analysé par un autre modèle."""
+        row = self._db.execute("SELECT mtime_ns, size, model FROM files WHERE path = ?", (path,)).fetchone()
+        return row is None or row != (stat.st_mtime_ns, stat.st_size, self.model_fingerprint)
+
+    def lookup(self, path, digest):
+        """
+        Résultat déjà connu pour ce contenu avec le modèle courant.
+
+        Args:
+            path: Chemin du fichier
+            digest: Empreinte du contenu
+
+        Returns:
+            tuple: (probabilités ou None, même chemin déjà indexé avec ce contenu)
+        """
+        rows = self._db.execute(
+            "SELECT path, probabilities FROM files WHERE digest = ? AND model = ? AND probabilities IS NOT NULL",
+            (digest, self.model_fingerprint),
+        ).fetchall()
+        for indexed_path, blob in rows:
+            if indexed_path == path:
+                return np.frombuffer(blob, dtype=np.float32), True
+        if rows:
+            return np.frombuffer(rows[0][1], dtype=np.float32), False
+        return None, False
+
+    def record(self, path, mtime_ns, size, digest, probabilities=None, error=None):
+        """Enregistre le résultat d'un fichier (validé au prochain commit)."""
+        blob = np.asarray(probabilities, dtype=np.float32).tobytes() if probabilities is not None else None
+        self._db.execute(
+            "INSERT OR REPLACE INTO files (path, dir, mtime_ns, size, digest, model, probabilities, error) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (path, os.path.dirname(path), mtime_ns, size, digest, self.model_fingerprint, blob,
+             str(error) if error is not None else None),
+        )
+
+    def commit(self):
+        self._db.commit()
+
+    def close(self):
+        self._db.close()
+
+
+class IndexingWriter:
+    """Writer de score_bulk qui enregistre aussi chaque ligne dans l'index."""
+
+    def __init__(self, writer, index, files):
+        """
+        Args:
+            writer: Writer de sortie (JsonlWriter ou CsvWriter)
+            index: ScoreIndex
+            files: Chemin -> (mtime_ns, taille, empreinte) des fichiers en cours d'analyse
+        """
+        self.writer = writer
+        self.index = index
+        self.files = files
+
+    def write(self, row):
+        self.index.record(row["path"], *self.files[row["path"]], row["probabilities"], row["error"])
+        self.writer.write(row)
+
+    def flush(self):
+        self.writer.flush()
+        self.index.commit()
+
+
+def poll(classifier, index, root, writer, batch_size=32, decode_threads=4, settle=2.0, full=False):
+    """
+    Un passage : analyse les images nouvelles ou modifiées et ajoute leurs lignes.
+
+    Args:
+        classifier: CoffeeLeafClassifier ou ProcessInferencePool prêt
+        index: ScoreIndex
+        root: Dossier surveillé
+        writer: Writer de sortie (JsonlWriter ou CsvWriter)
+        batch_size: Nombre maximal d'images par passe du modèle
+        decode_threads: Threads de décodage JPEG/PNG
+        settle: Âge minimal (secondes) d'un fichier pour être analysé
+        full: Relire tous les dossiers
+
+    Returns:
+        dict: Fichiers modifiés, analysés, repris de l'index et en erreur
+    """
+    changes = index.scan(root, settle, full)
+    files = {}
+    reused = 0
+    errors = 0
+    for path, mtime_ns, size in changes:
+        try:
+            # Empreinte calculée en flux : seuls (chemin, empreinte) restent en mémoire
+            digest = file_fingerprint(path)
+        except OSError as e:
+            # Fichier supprimé ou illisible entre le scan et la lecture : réessayé s'il réapparaît
+            writer.write(make_error_row(path, e))
+            index.record(path, mtime_ns, size, None, error=e)
+            errors += 1
+            continue
+
+        probabilities, unchanged = index.lookup(path, digest)
+        if probabilities is not None:
+            # Contenu déjà analysé : une copie reçoit sa ligne, un simple `touch` non
+            index.record(path, mtime_ns, size, digest, probabilities)
+            if not unchanged:
+                writer.write(make_row(path, probabilities, classifier.class_names))
+            reused += 1
+            continue
+        files[path] = (mtime_ns, size, digest)
+
+    scored = 0
+    if files:
+        # Les fichiers sont relus par le pool de décodage : la file de préchargement borne la mémoire
+        decoded = iter_decoded(((path, path) for path in files), classifier.target_size, decode_threads)
+        indexing = IndexingWriter(writer, index, files)
+        if isinstance(classifier, ProcessInferencePool):
+            scored, failed = score_stream_pooled(classifier, decoded, indexing, batch_size)
+        else:
+            scored, failed = score_stream(classifier, decoded, indexing, batch_size)
+        errors += failed
+    writer.flush()
+    index.commit_scan()
+    return {"changed": len(changes), "scored": scored, "reused": reused, "errors": errors}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyse continue des nouvelles photos d'un dossier")
+    parser.add_argument("folder", help="Dossier surveillé")
+    parser.add_argument("-o", "--output", required=True, help="Fichier de résultats (.jsonl ou .csv), complété à chaque passage")
+    parser.add_argument("--format", choices=["jsonl", "csv"], default=None, help="Format de sortie (déduit de l'extension par défaut)")
+    parser.add_argument("--index", default=DEFAULT_INDEX, help="Base SQLite des fichiers déjà analysés")
+    parser.add_argument("--model", default=MODEL_PATH, help="Chemin du modèle .keras")
+    parser.add_argument("--interval", type=float, default=10.0, help="Secondes entre deux passages")
+    parser.add_argument("--settle", type=float, default=2.0, help="Âge minimal (secondes) d'un fichier avant analyse")
+    parser.add_argument("--full-scan-every", type=int, default=0,
+                        help="Relire tous les dossiers tous les N passages (0 = jamais)")
+    parser.add_argument("--once", action="store_true", help="Un seul passage puis arrêt")
+    parser.add_argument("--batch-size", type=int, default=32, help="Images par passe du modèle")
+    parser.add_argument("--decode-threads", type=int, default=4, help="Threads de décodage JPEG/PNG")
+    parser.add_argument("--processes", type=int, default=INFERENCE_PROCESSES,
+                        help="Processus d'inférence (0 = inférence dans ce processus)")
+    parser.add_argument("--cpu-affinity", choices=["auto"], default=CPU_AFFINITY,
+                        help="Épingler chaque processus d'inférence sur une tranche des cœurs")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.folder):
+        parser.error(f"Dossier introuvable : {args.folder}")
+
+    if args.processes:
+        classifier = ProcessInferencePool(args.model, args.processes, args.batch_size, args.cpu_affinity).start()
+        try:
+            classifier.wait_ready()
+        except Exception:
+            classifier.close()
+            raise
+    else:
+        classifier = CoffeeLeafClassifier.from_path(args.model)
+    index = ScoreIndex(args.index, file_fingerprint(args.model))
+    writer, stream = open_writer(args.output, classifier.class_names, args.format, append=True)
+    root = os.path.abspath(args.folder)
+    try:
+        passes = 0
+        while True:
+            start = time.perf_counter()
+            full = bool(args.full_scan_every) and passes % args.full_scan_every == 0 and passes > 0
+            counts = poll(classifier, index, root, writer, args.batch_size, args.decode_threads, args.settle, full)
+            passes += 1
+            if counts["changed"] or args.once:
+                print(
+                    f"{counts['scored']} analysée(s), {counts['reused']} reprise(s) de l'index, "
+                    f"{counts['errors']} erreur(s) — {len(index)} fichier(s) indexé(s), "
+                    f"{time.perf_counter() - start:.2f} s",
+                    file=sys.stderr,
+                )
+            if args.once:
+                break
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stream.close()
+        index.close()
+        if args.processes:
+            classifier.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+"""
+Worker d'Inférence Partagé - Feuilles de Café
+=============================================
+Exécute les passes des modèles de toutes les sessions Streamlit dans un
+seul worker, au lieu d'un appel TensorFlow par thread de script.
+
+Chaque modèle (classifieur, autoencodeur du filtre...) dispose de sa file
+`DynamicBatcher` : les images envoyées par les sessions concurrentes sont
+regroupées en micro-lots. Les passes de tous les modèles sont sérialisées
+(une seule à la fois dans le processus) : chacune dispose de
+WORKER_INTRA_OP_THREADS threads, et le processus n'en utilise jamais plus,
+de sorte que le débit suit le nombre de cœurs au lieu de s'effondrer quand
+plusieurs utilisateurs analysent en même temps.
+
+Exemple:
+    worker = InferenceWorker().start()
+    futures = worker.submit(classifier, batch)      # un Future par image
+    probabilities = collect(futures)                # (N, classes)
+
+Auteur: Groupe 8
+Projet: Deep Learning - Classification des maladies des feuilles de café
+"""
+
+import os
+import threading
+from functools import partial
+from collections import OrderedDict
+
+import numpy as np
+
+from backends import DEFAULT_INTER_OP_THREADS, DEFAULT_INTRA_OP_THREADS
+from batching import DynamicBatcher
+
+# Threads TensorFlow de tout le processus. Le plafond est réel car une seule
+# passe (tous modèles confondus) s'exécute à la fois dans le worker ; un
+# parallélisme inter-opérations réduit suffit alors
+WORKER_INTRA_OP_THREADS = DEFAULT_INTRA_OP_THREADS or os.cpu_count() or 1
+WORKER_INTER_OP_THREADS = DEFAULT_INTER_OP_THREADS or 2
+
+# Taille maximale des micro-lots et attente maximale pour les compléter
+WORKER_BATCH_SIZE = int(os.environ.get("COFFEE_WORKER_BATCH_SIZE", "32"))
+WORKER_MAX_WAIT_MS = float(os.environ.get("COFFEE_WORKER_WAIT_MS", "5"))
+
+# Nombre de modèles servis simultanément (au-delà, la file la plus ancienne est fermée)
+WORKER_MAX_MODELS = 4
+
+
+def collect(futures, timeout=None):
+    """
+    Attend les résultats d'une liste de Futures et les empile.
+
+    Args:
+        futures: Futures renvoyés par InferenceWorker.submit
+        timeout: Attente maximale (secondes) par Future, None = illimitée
+
+    Returns:
+        numpy.ndarray: Sorties empilées dans l'ordre des Futures
+    """
+    return np.stack([future.result(timeout) for future in futures])
+
+
+class InferenceWorker:
+    """
+    Files d'inférence partagées, une par modèle.
+
+    Les tenseurs soumis ne sont pas copiés : ils doivent rester intacts
+    jusqu'à la résolution de leurs Futures.
+    """
+
+    def __init__(self, max_batch_size=WORKER_BATCH_SIZE, max_wait_ms=WORKER_MAX_WAIT_MS,
+                 max_models=WORKER_MAX_MODELS):
+        """
+        Args:
+            max_batch_size: Nombre maximal d'images par passe d'un modèle
+            max_wait_ms: Attente maximale (ms) pour compléter un micro-lot
+            max_models: Nombre de modèles servis simultanément
+        """
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.max_models = max_models
+        # id(modèle) -> (modèle, DynamicBatcher), du moins au plus récemment utilisé
+        self._batchers = OrderedDict()
+        self._lock = threading.Lock()
+        # Sérialise les passes de tous les modèles (voir WORKER_INTRA_OP_THREADS)
+        self._pass_lock = threading.Lock()
+        self._submitted = 0
+        self._stopped = False
+
+    def start(self):
+        """Rend le worker disponible (les files sont créées à la première soumission)."""
+        with self._lock:
+            self._stopped = False
+        return self
+
+    def stop(self, timeout=None):
+        """Ferme toutes les files après avoir traité les images déjà soumises."""
+        with self._lock:
+            self._stopped = True
+            batchers = [batcher for _, batcher in self._batchers.values()]
+            self._batchers.clear()
+        for batcher in batchers:
+            batcher.stop(timeout)
+
+    def _run_pass(self, model, batch):
+        """Passe d'un modèle, jamais en même temps qu'une autre passe du worker."""
+        with self._pass_lock:
+            return model.predict_proba(batch)
+
+    def _batcher(self, model, evicted):
+        """
+        File du modèle, créée au besoin (à appeler sous self._lock).
+
+        Au-delà de max_models, la file la moins récemment utilisée est retirée
+        et ajoutée à `evicted`, pour être fermée une fois le verrou relâché.
+        """
+        if self._stopped:
+            raise RuntimeError("Le worker d'inférence est arrêté")
+        key = id(model)
+        entry = self._batchers.get(key)
+        if entry is None:
+            batcher = DynamicBatcher(partial(self._run_pass, model), self.max_batch_size, self.max_wait_ms).start()
+            # Le modèle reste référencé tant que sa file existe : son id ne peut pas être réutilisé
+            entry = self._batchers[key] = (model, batcher)
+            while len(self._batchers) > self.max_models:
+                evicted.append(self._batchers.popitem(last=False)[1][1])
+        self._batchers.move_to_end(key)
+        return entry[1]
+
+    def submit(self, model, batch):
+        """
+        Met un lot d'images en file pour un modèle.
+
+        Args:
+            model: Objet exposant predict_proba (classifieur, backend...)
+            batch: Tenseur prétraité (N, hauteur, largeur, 3)
+
+        Returns:
+            list: Un concurrent.futures.Future par image, résolu avec sa sortie
+        """
+        evicted = []
+        # Mise en file sous le verrou : une autre session ne peut pas fermer la
+        # file entre sa sélection et l'envoi des images
+        with self._lock:
+            batcher = self._batcher(model, evicted)
+            futures = [batcher.submit(tensor) for tensor in batch]
+            self._submitted += len(futures)
+        for old in evicted:
+            # Sans attente : la file termine ses demandes en cours puis s'arrête
+            old.stop(timeout=0)
+        return futures
+
+    def predict_proba(self, model, batch):
+        """Sorties du modèle pour un lot, via les files partagées (bloquant)."""
+        return collect(self.submit(model, batch))
+
+    def bind(self, model):
+        """
+        Modèle dont les passes passent par le worker.
+
+        Args:
+            model: Classifieur ou backend à servir
+
+        Returns:
+            WorkerModel: Même interface que `model`
+        """
+        return WorkerModel(self, model)
+
+    def stats(self):
+        """
+        État du worker.
+
+        Returns:
+            dict: Modèles servis, images soumises, images en attente et plafonds de threads
+        """
+        with self._lock:
+            batchers = [batcher for _, batcher in self._batchers.values()]
+            submitted = self._submitted
+        return {
+            "models": len(batchers),
+            "submitted": submitted,
+            "pending": sum(batcher.pending() for batcher in batchers),
+            "intra_op_threads": WORKER_INTRA_OP_THREADS,
+            "inter_op_threads": WORKER_INTER_OP_THREADS,
+        }
+
+
+class WorkerModel:
+    """
+    Modèle servi par un InferenceWorker.
+
+    `predict_proba` passe par la file partagée ; les autres attributs
+    (interpret, target_size, fingerprint...) sont ceux du modèle d'origine.
+    """
+
+    def __init__(self, worker, model):
+        self.worker = worker
+        self.model = model
+
+    def submit(self, batch):
+        """Met un lot en file ; renvoie un Future par image (voir InferenceWorker.submit)."""
+        return self.worker.submit(self.model, batch)
+
+    def predict_proba(self, batch):
+        return self.worker.predict_proba(self.model, batch)
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)